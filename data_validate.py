@@ -1,74 +1,110 @@
 from __future__ import annotations
-import argparse, json, sys
+import argparse, hashlib, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import glob
 
 try:
-    from jsonschema import validate
+    import jsonschema  # noqa: F401  (needed by ndtools.validation for anything off the fast path)
 except ImportError:
     print("Please install jsonschema: pip install jsonschema", file=sys.stderr)
     sys.exit(1)
 
+from ndtools import __version__
+from ndtools.io import SIDECAR_DIR, load_json as _load_json, sha256_file
+from ndtools.validation import check_dataset
+
+CACHE_NAME = "data_validate.json"
+_CACHE_FORMAT = 1
+
 def load_json(p: Path):
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        return _load_json(p)
     except FileNotFoundError:
         raise
     except Exception as e:
         raise RuntimeError(f"Failed to parse JSON: {p} ({e})") from e
 
 def validate_dataset(root: Path, dataset_path: str, schemas_dir: Path) -> list[str]:
-    """Validate nodes/edges/probs for a single dataset. Returns list of problems."""
-    problems: list[str] = []
+    """
+    Validate nodes/edges/probs for a single dataset (schemas, plus edge endpoints,
+    probability ids and sums). Returns list of problems.
+    """
     ds_root = (root / dataset_path).resolve()
-
-    nodes_p = ds_root / "data" / "nodes.json"
-    edges_p = ds_root / "data" / "edges.json"
-    probs_p = ds_root / "data" / "probs.json"
-
-    nodes_schema = load_json(schemas_dir / "nodes.schema.json")
-    edges_schema = load_json(schemas_dir / "edges.schema.json")
-    probs_schema = load_json(schemas_dir / "probs.schema.json")
-
-    # nodes.json
+    problems: list[str] = []
+    # probs variants like probs_*.json and .json.gz / .json.zst are all checked
+    for path, err in check_dataset(ds_root / "data", schemas_dir):
+        if isinstance(err, FileNotFoundError):
+            problems.append(f"Missing: {path}" if path.name.startswith(("nodes", "edges")) else f"Missing: {err}")
+        else:
+            problems.append(f"{path.name} invalid: {err}")
+    return problems
+
+def dataset_roots(root: Path, dataset_path: str) -> list[Path]:
+    """
+    Dataset folders behind a registry path: the path itself if it has data/,
+    else every folder below it that does (e.g. datasets/generated/<name>/v1).
+    """
+    ds = (root / dataset_path).resolve()
+    if (ds / "data").is_dir():
+        return [ds]
+    found = sorted(d.parent for d in ds.glob("**/data") if d.is_dir())
+    return found or [ds]
+
+# ---------- cache of validated content ----------
+
+def _load_cache(path: Path) -> dict:
     try:
-        nodes = load_json(nodes_p)
-        validate(nodes, nodes_schema)
-    except FileNotFoundError:
-        problems.append(f"Missing: {nodes_p}")
-    except Exception as e:
-        problems.append(f"nodes.json invalid: {e}")
-
-    # edges.json
+        cache = json.loads(path.read_text())
+        if cache.get("format") == _CACHE_FORMAT:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"format": _CACHE_FORMAT, "files": {}, "datasets": {}}
+
+def _save_cache(path: Path, cache: dict) -> None:
+    tmp = path.with_name(f".tmp{os.getpid()}.{path.name}")
     try:
-        edges = load_json(edges_p)
-        validate(edges, edges_schema)
-    except FileNotFoundError:
-        problems.append(f"Missing: {edges_p}")
-    except Exception as e:
-        problems.append(f"edges.json invalid: {e}")
-
-    # probs.json (allow variants like probs_*.json)
-    probs_candidates = list((ds_root / "data").glob("probs*.json"))
-
-    if not probs_candidates:
-        problems.append(f"Missing: no probs*.json found in {ds_root/'data'}")
-    else:
-        for probs_p in probs_candidates:
-            try:
-                probs = load_json(probs_p)
-                validate(probs, probs_schema)
-            except Exception as e:
-                problems.append(f"{probs_p.name} invalid: {e}")
-
-        return problems
-
-def main():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(cache, indent=1))
+        os.replace(tmp, path)
+    except OSError as e:  # read-only checkout: validation results are still printed
+        tmp.unlink(missing_ok=True)
+        print(f"[warn] could not write {path}: {e}", file=sys.stderr)
+
+def _file_hash(p: Path, files: dict) -> str:
+    """sha256 of a file, re-hashed only when its mtime or size changed."""
+    st = p.stat()
+    rec = files.get(str(p))
+    if rec and rec["mtime_ns"] == st.st_mtime_ns and rec["size"] == st.st_size:
+        return rec["sha256"]
+    digest = sha256_file(p)
+    files[str(p)] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest}
+    return digest
+
+def dataset_digest(ds_root: Path, schema_dir: Path, files: dict) -> str:
+    """Hash of a dataset's JSON data files, the schemas and the ndtools version."""
+    h = hashlib.sha256(__version__.encode())
+    inputs = sorted((ds_root / "data").glob("*.json*")) + sorted(schema_dir.glob("*.json"))
+    for p in inputs:
+        h.update(f"{p.name}\0{_file_hash(p, files)}\0".encode())
+    return h.hexdigest()
+
+def _validate_timed(root: Path, ds_root: Path, schema_dir: Path) -> tuple[list[str], float]:
+    t0 = time.perf_counter()
+    problems = validate_dataset(root, str(ds_root), schema_dir)
+    return problems, time.perf_counter() - t0
+
+def main(argv: list[str] | None = None):
     ap = argparse.ArgumentParser(description="Validate datasets against JSON Schemas.")
     ap.add_argument("--root", type=Path, default=Path("."), help="Repo root containing registry.json and schema/")
     ap.add_argument("--dataset", type=str, default=None,
                     help="Optional dataset name to validate (matches 'name' in registry.json).")
-    args = ap.parse_args()
+    ap.add_argument("--force", action="store_true",
+                    help=f"Revalidate datasets even if unchanged since the last successful run "
+                         f"(cache: {SIDECAR_DIR}/{CACHE_NAME}).")
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+    args = ap.parse_args(argv)
 
     root = args.root.resolve()
     reg_path = root / "registry.json"
@@ -90,18 +126,51 @@ def main():
             print(f"No dataset named '{args.dataset}' in registry.json", file=sys.stderr)
             sys.exit(3)
 
+    jobs = [(rec.get("name"), ds_root) for rec in entries for ds_root in dataset_roots(root, rec.get("path"))]
+
+    cache_path = root / SIDECAR_DIR / CACHE_NAME
+    cache = _load_cache(cache_path)
+    digests = {ds_root: dataset_digest(ds_root, schema_dir, cache["files"]) for _, ds_root in jobs}
+    key = lambda ds_root: ds_root.relative_to(root).as_posix() if ds_root.is_relative_to(root) else str(ds_root)
+    todo = [ds_root for _, ds_root in jobs
+            if args.force or cache["datasets"].get(key(ds_root)) != digests[ds_root]]
+
+    results: dict[Path, tuple[list[str], float]] = {}
+    if args.workers == 1 or len(todo) <= 1:
+        for ds_root in todo:
+            results[ds_root] = _validate_timed(root, ds_root, schema_dir)
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {ds_root: pool.submit(_validate_timed, root, ds_root, schema_dir) for ds_root in todo}
+            results = {ds_root: fut.result() for ds_root, fut in futures.items()}
+
     any_errors = False
-    for rec in entries:
-        name = rec.get("name")
-        path = rec.get("path")
-        print(f"Validating: {name} @ {path}")
-        problems = validate_dataset(root, path, schema_dir)
+    summary = []
+    for name, ds_root in jobs:
+        print(f"Validating: {name} @ {key(ds_root)}")
+        if ds_root not in results:
+            print("  ✓ OK (unchanged)")
+            summary.append((key(ds_root), "cached", 0.0))
+            continue
+        problems, seconds = results[ds_root]
         if problems:
             any_errors = True
+            cache["datasets"].pop(key(ds_root), None)
             for msg in problems:
                 print(f"  - {msg}")
         else:
+            cache["datasets"][key(ds_root)] = digests[ds_root]
             print("  ✓ OK")
+        summary.append((key(ds_root), "FAIL" if problems else "ok", seconds))
+
+    _save_cache(cache_path, cache)
+
+    width = max([len(k) for k, _, _ in summary] + [7])
+    print(f"\n{'dataset':<{width}}  {'status':<6}  {'time [s]':>8}")
+    for k, status, seconds in summary:
+        print(f"{k:<{width}}  {status:<6}  {seconds:>8.3f}")
+    print(f"{len(results)} validated, {len(jobs) - len(results)} unchanged, "
+          f"{sum(t for _, _, t in summary):.3f} s total")
 
     sys.exit(1 if any_errors else 0)
 
@@ -1,2 +1,2 @@
 # ndtools/__init__.py
-__version__ = "0.1.5"
+__version__ = "0.2.0"
@@ -0,0 +1,172 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import math
+
+import numpy as np
+
+
+@dataclass
+class CompiledDataset:
+    """
+    Array form of a dataset (nodes, edges and optionally one probs file).
+
+    Node/edge ids are kept as fixed-width string arrays; edge endpoints are
+    integer positions into `node_ids`. Attributes that are uniformly numeric,
+    boolean or string are stored as one array per attribute (null -> nan for
+    numeric columns); mixed-type attributes are left out.
+
+    Probabilities are a dense (n_components, n_states) matrix: row i belongs to
+    component `prob_ids[i]`, column j to state label `states[j]`. States missing
+    for a component get probability 0.
+    """
+    node_ids: np.ndarray
+    edge_ids: np.ndarray
+    src: np.ndarray
+    dst: np.ndarray
+    directed: np.ndarray
+    node_attrs: Dict[str, np.ndarray] = field(default_factory=dict)
+    edge_attrs: Dict[str, np.ndarray] = field(default_factory=dict)
+    prob_ids: Optional[np.ndarray] = None
+    states: Optional[np.ndarray] = None
+    probs: Optional[np.ndarray] = None
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.edge_ids)
+
+    def node_index(self) -> Dict[str, int]:
+        """{node_id: position}"""
+        return {nid: i for i, nid in enumerate(self.node_ids.tolist())}
+
+    def edge_index(self) -> Dict[str, int]:
+        """{edge_id: position}"""
+        return {eid: i for i, eid in enumerate(self.edge_ids.tolist())}
+
+    def edge_probs(self) -> np.ndarray:
+        """
+        Probability matrix re-ordered to follow `edge_ids`
+        (rows for edges absent from the probs file are all-zero).
+        """
+        if self.probs is None:
+            raise ValueError("dataset was compiled without probabilities")
+        pos = {cid: i for i, cid in enumerate(self.prob_ids.tolist())}
+        out = np.zeros((self.n_edges, self.probs.shape[1]), dtype=float)
+        for i, eid in enumerate(self.edge_ids.tolist()):
+            j = pos.get(eid)
+            if j is not None:
+                out[i] = self.probs[j]
+        return out
+
+
+def _is_num(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _column(values: List[Any]) -> Optional[np.ndarray]:
+    """Turn a list of attribute values into one typed array, or None if mixed."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return np.full(len(values), np.nan)
+    if all(isinstance(v, bool) for v in present):
+        if len(present) != len(values):
+            return None
+        return np.asarray(values, dtype=bool)
+    if all(_is_num(v) for v in present):
+        if len(present) == len(values) and all(isinstance(v, int) for v in present):
+            return np.asarray(values, dtype=np.int64)
+        return np.asarray([math.nan if v is None else float(v) for v in values], dtype=float)
+    if all(isinstance(v, str) for v in present) and len(present) == len(values):
+        return np.asarray(values, dtype=str)
+    return None
+
+
+def _columns(records: List[Mapping[str, Any]], skip: Iterable[str] = ()) -> Dict[str, np.ndarray]:
+    skip = set(skip)
+    keys: List[str] = []
+    for r in records:
+        for k in r:
+            if k not in skip and k not in keys:
+                keys.append(k)
+    cols: Dict[str, np.ndarray] = {}
+    for k in keys:
+        col = _column([r.get(k) for r in records])
+        if col is not None:
+            cols[k] = col
+    return cols
+
+
+def compile_graph(
+    nodes: Mapping[str, Mapping[str, Any]],
+    edges: Mapping[str, Mapping[str, Any]],
+) -> CompiledDataset:
+    """Compile nodes/edges dicts into a CompiledDataset (without probabilities)."""
+    node_ids = list(nodes.keys())
+    index = {nid: i for i, nid in enumerate(node_ids)}
+    # endpoints that are missing from nodes.json are appended, as build_graph would do
+    for e in edges.values():
+        for k in ("from", "to"):
+            if e[k] not in index:
+                index[e[k]] = len(node_ids)
+                node_ids.append(e[k])
+
+    node_records = [nodes.get(nid, {}) for nid in node_ids]
+    edge_records = list(edges.values())
+    return CompiledDataset(
+        node_ids=np.asarray(node_ids, dtype=str),
+        edge_ids=np.asarray(list(edges.keys()), dtype=str),
+        src=np.asarray([index[e["from"]] for e in edge_records], dtype=np.int64),
+        dst=np.asarray([index[e["to"]] for e in edge_records], dtype=np.int64),
+        directed=np.asarray([bool(e.get("directed", False)) for e in edge_records], dtype=bool),
+        node_attrs=_columns(node_records),
+        edge_attrs=_columns(edge_records, skip=("from", "to", "directed")),
+    )
+
+
+def compile_probs(probs: Mapping[str, Mapping[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compile {comp_id: {"<state>": {"p": float}}} into (prob_ids, states, matrix).
+    """
+    labels = sorted({int(s) for row in probs.values() for s in row})
+    col = {s: j for j, s in enumerate(labels)}
+    mat = np.zeros((len(probs), len(labels)), dtype=float)
+    for i, row in enumerate(probs.values()):
+        for s, rec in row.items():
+            mat[i, col[int(s)]] = float(rec["p"])
+    return (
+        np.asarray(list(probs.keys()), dtype=str),
+        np.asarray(labels, dtype=np.int64),
+        mat,
+    )
+
+
+def compile_dataset(
+    nodes: Mapping[str, Mapping[str, Any]],
+    edges: Mapping[str, Mapping[str, Any]],
+    probs: Optional[Mapping[str, Mapping[str, Any]]] = None,
+) -> CompiledDataset:
+    """Compile nodes/edges[/probs] dicts into a CompiledDataset."""
+    ds = compile_graph(nodes, edges)
+    if probs is not None:
+        ds.prob_ids, ds.states, ds.probs = compile_probs(probs)
+    return ds
+
+
+def csr_adjacency(ds: CompiledDataset) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Outgoing adjacency in CSR form: (indptr, indices, edge_pos). The neighbours
+    of node i are indices[indptr[i]:indptr[i + 1]], reached over edges
+    edge_pos[...]; undirected edges appear in both directions.
+    """
+    und = ~ds.directed.astype(bool)
+    tails = np.concatenate([ds.src, ds.dst[und]])
+    heads = np.concatenate([ds.dst, ds.src[und]])
+    pos = np.concatenate([np.arange(ds.n_edges, dtype=np.int64), np.flatnonzero(und).astype(np.int64)])
+    order = np.argsort(tails, kind="stable")
+    indptr = np.zeros(ds.n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=ds.n_nodes), out=indptr[1:])
+    return indptr, heads[order].astype(np.int64), pos[order]
@@ -0,0 +1,129 @@
+# ndtools/fragility.py
+"""
+Fragility-based component probabilities for many hazard intensities at once.
+
+Each edge is a macrocomponent made of equipment items with lognormal
+fragilities (median `mu`, dispersion `beta`). An edge survives if all its
+items survive, so
+
+    log P(edge survives | pga) = sum_k count[edge, k] * log(1 - Phi((ln pga - ln mu_k) / beta_k))
+
+which is one (n_pga, n_equipment) x (n_equipment, n_edges) matrix product.
+Working in log space keeps tiny survival probabilities exact instead of
+underflowing in a product of powers.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+import math
+from typing import Any, Dict, Mapping
+
+import numpy as np
+
+from ndtools.io import load_json
+
+def _log_ndtr_fallback(x: np.ndarray) -> np.ndarray:
+    """
+    log Phi(x) without scipy: log(erfc(-x / sqrt 2) / 2) for x <= 0,
+    log1p(-erfc(x / sqrt 2) / 2) for x > 0, asymptotic series in the far left
+    tail. NaN stays NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    out = np.full_like(x, np.nan)
+    erfc = np.frompyfunc(math.erfc, 1, 1)
+    tail = x < -30.0
+    left = (x <= 0.0) & ~tail
+    right = x > 0.0
+    out[left] = np.log(0.5 * erfc(-x[left] / math.sqrt(2.0)).astype(float))
+    out[right] = np.log1p(-0.5 * erfc(x[right] / math.sqrt(2.0)).astype(float))
+    # Phi(x) ~ phi(x) / |x| * (1 - 1/x^2 + 3/x^4) for x -> -inf
+    xt = x[tail]
+    out[tail] = (-0.5 * xt * xt - 0.5 * math.log(2.0 * math.pi) - np.log(-xt)
+                 + np.log1p(-1.0 / xt**2 + 3.0 / xt**4))
+    return out
+
+def log_ndtr(x: np.ndarray) -> np.ndarray:
+    """log of the standard normal CDF, accurate in both tails (scipy if installed)."""
+    try:
+        from scipy.special import log_ndtr as _log_ndtr
+    except ImportError:
+        return _log_ndtr_fallback(x)
+    return _log_ndtr(np.asarray(x, dtype=float))
+
+@dataclass
+class FragilityModel:
+    """
+    Compiled fragility tables: equipment medians/dispersions and the
+    equipment count matrix of every edge (rows follow `edge_ids`).
+    """
+    edge_ids: np.ndarray
+    equipment_ids: np.ndarray
+    mu: np.ndarray
+    beta: np.ndarray
+    counts: np.ndarray  # (n_edges, n_equipment)
+
+    @classmethod
+    def from_tables(
+        cls,
+        edges: Mapping[str, Mapping[str, Any]],
+        macrocomponents: Mapping[str, Mapping[str, Any]],
+        equipment: Mapping[str, Mapping[str, Any]],
+    ) -> "FragilityModel":
+        """
+        edges: {eid: {"macrocomponent_type": ...}}, macrocomponents:
+        {type: {"equipment_number": {equip: count}}}, equipment:
+        {equip: {"fragility": {"mu": ..., "beta": ...}}}.
+        """
+        equip_ids = list(equipment)
+        col = {k: j for j, k in enumerate(equip_ids)}
+        counts = np.zeros((len(edges), len(equip_ids)), dtype=float)
+        for i, (eid, e) in enumerate(edges.items()):
+            mtype = e.get("macrocomponent_type")
+            if mtype not in macrocomponents:
+                raise KeyError(f"edge {eid!r}: unknown macrocomponent_type {mtype!r}")
+            for k, n in macrocomponents[mtype]["equipment_number"].items():
+                if k not in col:
+                    raise KeyError(f"macrocomponent {mtype!r}: unknown equipment {k!r}")
+                counts[i, col[k]] += n
+        return cls(
+            edge_ids=np.asarray(list(edges), dtype=str),
+            equipment_ids=np.asarray(equip_ids, dtype=str),
+            mu=np.asarray([float(equipment[k]["fragility"]["mu"]) for k in equip_ids]),
+            beta=np.asarray([float(equipment[k]["fragility"]["beta"]) for k in equip_ids]),
+            counts=counts,
+        )
+
+    @classmethod
+    def from_dataset(cls, data_dir: Path) -> "FragilityModel":
+        """Load edges.json, macrocomponents.json and equipment.json from `data_dir` (once)."""
+        data_dir = Path(data_dir)
+        return cls.from_tables(
+            load_json(data_dir / "edges.json"),
+            load_json(data_dir / "macrocomponents.json"),
+            load_json(data_dir / "equipment.json"),
+        )
+
+    def equipment_log_survival(self, pga: np.ndarray) -> np.ndarray:
+        """log P(item survives) for every pga value, shape (n_pga, n_equipment)."""
+        pga = np.atleast_1d(np.asarray(pga, dtype=float))
+        with np.errstate(divide="ignore"):  # pga == 0 -> log 0 = -inf -> sure survival
+            z = (np.log(pga)[:, None] - np.log(self.mu)[None, :]) / self.beta[None, :]
+        return log_ndtr(-z)
+
+    def log_survival(self, pga: np.ndarray) -> np.ndarray:
+        """log P(edge survives), shape (n_pga, n_edges)."""
+        return self.equipment_log_survival(pga) @ self.counts.T
+
+    def survival(self, pga: np.ndarray) -> np.ndarray:
+        """P(edge survives), shape (n_pga, n_edges)."""
+        return np.exp(self.log_survival(pga))
+
+    def failure(self, pga: np.ndarray) -> np.ndarray:
+        """P(edge fails) = 1 - survival, accurate when survival is close to 1."""
+        return -np.expm1(self.log_survival(pga))
+
+    def probs(self, pga: float) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Probabilities at one pga in probs.json form: {eid: {"0": {"p": pf}, "1": {"p": ps}}}."""
+        pf = self.failure([pga])[0]
+        return {eid: {"0": {"p": float(f)}, "1": {"p": float(1.0 - f)}}
+                for eid, f in zip(self.edge_ids.tolist(), pf)}
@@ -131,6 +131,15 @@ def _node_edge_chain(G: nx.Graph, node_path: Optional[List[str]]) -> Optional[Li
         chain.append(v)
     return chain
 
+def _snap_points(items: List[Any], spatial_index) -> List[Any]:
+    """Replace (x, y) points among `items` by the nearest indexed node id, in one batched query."""
+    at = [i for i, it in enumerate(items) if isinstance(it, (tuple, list))]
+    if at:
+        _, ids = spatial_index.nearest_ids([items[i] for i in at], k=1)
+        for i, row in zip(at, ids):
+            items[i] = row[0]
+    return items
+
 def eval_travel_time_to_nearest(
     comps_state: Dict[str, int],
     G_base: nx.Graph,
@@ -140,7 +149,16 @@ def eval_travel_time_to_nearest(
     avg_speed: float = 60.0,        # distance units per hour (e.g., km/h)
     target_max: float = 0.5,        # allowed extra time over baseline, in HOURS
     length_attr: str = "length",    # edge length attribute (e.g., km)
+    spatial_index=None,             # ndtools.spatial.SpatialIndex over G_base's nodes
 ) -> Tuple[Optional[float], str, Dict[str, Any]]:
+    """
+    With `spatial_index`, the origin and any destination may be given as
+    coordinate points (tuples/lists); they are snapped to their nearest
+    indexed node before routing (build the index once, e.g.
+    SpatialIndex.from_graph(G_base), and reuse it across calls).
+    """
+    if spatial_index is not None:
+        origin, *destinations = _snap_points([origin, *destinations], spatial_index)
     dest_set = set(destinations)
     if not dest_set:
         return None, 0, {"reason": "no destinations provided"}
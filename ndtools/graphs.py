@@ -1,21 +1,30 @@
+from __future__ import annotations
 import networkx as nx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Mapping, Optional, Tuple
+from itertools import chain
 
-import json
-import matplotlib.pyplot as plt
-import networkx as nx
 from pathlib import Path
 import math
 
+from ndtools.io import find_data_file, iter_json_items
+
+def _items(records: Mapping[str, Any] | Iterable[Tuple[str, Any]]) -> Iterable[Tuple[str, Any]]:
+    """(id, record) pairs from a dict or from a stream such as `ndtools.io.iter_json_items`."""
+    return records.items() if isinstance(records, Mapping) else records
+
 def build_graph(
-    nodes: Dict[str, Dict[str, Any]],
-    edges: Dict[str, Dict[str, Any]],
+    nodes: Mapping[str, Dict[str, Any]] | Iterable[Tuple[str, Dict[str, Any]]],
+    edges: Mapping[str, Dict[str, Any]] | Iterable[Tuple[str, Dict[str, Any]]],
     probs: Optional[Dict[str, Any]] = None,
 ) -> nx.Graph:
+    """
+    Build an undirected graph. `nodes`/`edges` may be dicts or streams of
+    (id, record) pairs, e.g. `build_graph(iter_json_items(nodes_p), iter_json_items(edges_p))`.
+    """
     G = nx.Graph()
-    for nid, attrs in nodes.items():
+    for nid, attrs in _items(nodes):
         G.add_node(nid, **attrs)
-    for eid, e in edges.items():
+    for eid, e in _items(edges):
         u, v = e["from"], e["to"]
         attr = {"eid": eid, **{k: v for k, v in e.items() if k not in ("from","to")}}
         if probs is not None:
@@ -23,6 +32,45 @@ def build_graph(
         G.add_edge(u, v, **attr)
     return G
 
+def _records(attrs: Mapping[str, Any], n: int) -> Iterable[Dict[str, Any]]:
+    cols = {}
+    for k, col in attrs.items():
+        vals = col.tolist()
+        if col.dtype.kind == "f":  # compiled numeric columns hold JSON null as nan
+            vals = [None if math.isnan(x) else x for x in vals]
+        cols[k] = vals
+    if not cols:
+        return ({} for _ in range(n))
+    keys = list(cols)
+    return (dict(zip(keys, row)) for row in zip(*cols.values()))
+
+def build_graph_compiled(ds) -> nx.Graph:
+    """
+    `build_graph` from a `ndtools.compiled.CompiledDataset` (e.g. the views of
+    an attached `ndtools.shared.SharedDataset`) instead of the JSON dicts.
+    Every edge gets "directed", and "p_active" (the probability of state 1)
+    when the dataset was compiled with probabilities. NaN in a float column
+    becomes None, like the JSON null it was compiled from; mixed-type
+    attributes, which compiling leaves out, are absent.
+    """
+    G = nx.Graph()
+    node_ids = ds.node_ids.tolist()
+    for nid, attrs in zip(node_ids, _records(ds.node_attrs, ds.n_nodes)):
+        G.add_node(nid, **attrs)
+    edge_ids = ds.edge_ids.tolist()
+    p_active = [None] * ds.n_edges
+    if ds.probs is not None and 1 in ds.states.tolist():
+        col = ds.probs[:, ds.states.tolist().index(1)].tolist()
+        row = {cid: i for i, cid in enumerate(ds.prob_ids.tolist())}
+        p_active = [col[row[eid]] if eid in row else None for eid in edge_ids]
+    for eid, u, v, directed, p, attrs in zip(edge_ids, ds.src.tolist(), ds.dst.tolist(), ds.directed.tolist(),
+                                             p_active, _records(ds.edge_attrs, ds.n_edges)):
+        attr = {"eid": eid, "directed": directed, **attrs}
+        if ds.probs is not None:
+            attr["p_active"] = p
+        G.add_edge(node_ids[u], node_ids[v], **attr)
+    return G
+
 def draw_graph_from_data(
     data_dir: str | Path,
     *,
@@ -38,6 +86,7 @@ def draw_graph_from_data(
 ) -> Path:
     """
     Load nodes/edges from JSON files in `data_dir`, draw the graph, and save to the same dir.
+    Compressed nodes.json.gz / edges.json.zst are read transparently.
 
     Expects (preferred, current repo format):
         - nodes.json : {"n0": {"x": null, "y": null, ...}, ...}
@@ -65,58 +114,43 @@ def draw_graph_from_data(
                 return {}
         return pos
 
-    def _normalize_edges(edges_raw):
-        """Return (edge_list, is_directed) from dict or list edges."""
-        if isinstance(edges_raw, dict):
-            items = list(edges_raw.values())
-        elif isinstance(edges_raw, list):
-            items = edges_raw
-        else:
-            raise TypeError(f"edges.json must be list or dict, got {type(edges_raw)}")
-
-        is_directed = False
-        if items:
-            is_directed = bool(items[0].get("directed", False))
-        edge_list = []
-        for ev in items:
+    def _edge_records(edges_items):
+        """(u, v, attrs) per edge from (eid, record) pairs, or (index, record) pairs of a list."""
+        for _, ev in edges_items:
             u, v = ev.get("from"), ev.get("to")
             if u is None or v is None:
                 raise ValueError("Each edge must have 'from' and 'to' keys.")
             attrs = {k: val for k, val in ev.items() if k not in ("from", "to")}
-            edge_list.append((u, v, attrs))
-        return edge_list, is_directed
+            yield u, v, attrs
+
+    import matplotlib.pyplot as plt  # imported here: slow, and only needed for drawing
 
     data_dir = Path(data_dir)
     layout_kwargs = layout_kwargs or {}
 
-    # --- Load nodes & edges ---
-    nodes_path = data_dir / "nodes.json"
-    edges_path = data_dir / "edges.json"
-
-    with open(nodes_path, "r", encoding="utf-8") as f:
-        nodes = json.load(f)  # expect dict {node_id: {x,y,...}}
+    # --- Stream nodes & edges (edges.json may be a list or a dict) ---
+    nodes_path = find_data_file(data_dir / "nodes.json")
+    edges_path = find_data_file(data_dir / "edges.json")
 
-    with open(edges_path, "r", encoding="utf-8") as f:
-        edges_raw = json.load(f)  # list[dict] or dict[str, dict]
-
-    # --- Build graph ---
-    edge_list, is_directed = _normalize_edges(edges_raw)
+    edge_iter = _edge_records(iter_json_items(edges_path))
+    first = next(edge_iter, None)
+    is_directed = bool(first[2].get("directed", False)) if first else False
     G = nx.DiGraph() if is_directed else nx.Graph()
 
-    if isinstance(nodes, dict):
-        for nid, nv in nodes.items():
-            G.add_node(nid, **(nv if isinstance(nv, dict) else {}))
-    else:
-        # fallback if nodes came as a list of {"id":..., ...}
-        for nd in nodes:
-            nid = nd.get("id")
+    for key, nv in iter_json_items(nodes_path):
+        if isinstance(key, str):
+            G.add_node(key, **(nv if isinstance(nv, dict) else {}))
+        else:
+            # fallback if nodes came as a list of {"id":..., ...}
+            nid = nv.get("id")
             if nid is None:
                 raise ValueError("Node entries must have an 'id' when given as a list.")
-            attrs = {k: v for k, v in nd.items() if k != "id"}
+            attrs = {k: v for k, v in nv.items() if k != "id"}
             G.add_node(nid, **attrs)
 
-    for u, v, attrs in edge_list:
-        G.add_edge(u, v, **attrs)
+    if first is not None:
+        for u, v, attrs in chain([first], edge_iter):
+            G.add_edge(u, v, **attrs)
 
     # --- Determine positions ---
     pos = _extract_positions(G)  # only returns non-empty if ALL nodes have numeric x,y
@@ -1,12 +1,216 @@
+from __future__ import annotations
 from pathlib import Path
-import json, yaml
-from typing import Dict, Any, Tuple
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from io import TextIOWrapper
+import gzip, hashlib, json, os, shutil
+from typing import Dict, Any, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+# ---------- (optionally compressed) JSON files ----------
+
+COMPRESSIONS = {"gz": ".gz", "zst": ".zst"}
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("Reading/writing .zst files requires zstandard. `pip install zstandard`") from e
+    return zstandard
+
+def open_text(path: Path, mode: str = "r"):
+    """
+    Open a text file for reading ('r') or writing ('w'), transparently
+    (de)compressing `.gz` (gzip) and `.zst` (zstandard) files as a stream.
+    """
+    path = Path(path)
+    if mode not in ("r", "w"):
+        raise ValueError(f"mode must be 'r' or 'w', got {mode!r}")
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.suffix == ".zst":
+        zstd = _zstandard()
+        if mode == "r":
+            stream = zstd.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+        else:
+            stream = zstd.ZstdCompressor(level=10).stream_writer(path.open("wb"), closefd=True)
+        return TextIOWrapper(stream, encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+def find_data_file(path: Path) -> Path:
+    """
+    Return `path` if it exists, else its first existing compressed variant
+    (`<path>.gz`, `<path>.zst`). Falls back to `path` when none exists.
+    """
+    path = Path(path)
+    if path.exists():
+        return path
+    for suffix in COMPRESSIONS.values():
+        cand = path.with_name(path.name + suffix)
+        if cand.exists():
+            return cand
+    return path
+
+def data_file_variants(path: Path) -> List[Path]:
+    """`path` and all its compressed variants (existing or not)."""
+    path = Path(path)
+    return [path] + [path.with_name(path.name + sfx) for sfx in COMPRESSIONS.values()]
+
+def json_stem(path: Path) -> str:
+    """'probs_bin.json.gz' -> 'probs_bin'"""
+    name = Path(path).name
+    for sfx in list(COMPRESSIONS.values()) + [".json"]:
+        if name.endswith(sfx):
+            name = name[: -len(sfx)]
+    return name
+
+def _decompress(path: Path, raw: bytes) -> bytes:
+    if path.suffix == ".gz":
+        return gzip.decompress(raw)
+    if path.suffix == ".zst":
+        return _zstandard().ZstdDecompressor().decompressobj().decompress(raw)
+    return raw
 
 def load_json(path: Path) -> Dict[str, Any]:
-    with path.open("r", encoding="utf-8") as f:
+    """Load a JSON file; `x.json` also finds `x.json.gz` / `x.json.zst`."""
+    with open_text(find_data_file(path)) as f:
         return json.load(f)
 
+def iter_json_items(
+    path: Path,
+    *,
+    chunk_size: int = 1 << 16,
+    expect: Optional[str] = None,
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    Stream the top-level container of a JSON file without loading the whole document.
+
+    Yields (key, record) for a top-level object, e.g. ('e0001', {...}) for
+    edges.json/nodes.json/probs.json, or (index, item) for a top-level array.
+    Only one record (plus a read buffer) is held in memory at a time.
+    Pass expect='object' or 'array' to reject the other container type.
+    """
+    decoder = json.JSONDecoder()
+    ws = " \t\n\r"
+    delims = ws + ",:]}"
+    with open_text(find_data_file(path)) as f:
+        buf, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            # read at least as much as is buffered, so huge records cost O(size) overall
+            data = f.read(max(chunk_size, len(buf) - pos))
+            if not data:
+                eof = True
+                return False
+            buf = buf[pos:] + data
+            pos = 0
+            return True
+
+        def skip_ws() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ws:
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    raise ValueError(f"{path}: unexpected end of JSON document")
+
+        def value() -> Any:
+            nonlocal pos
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    # a value must be followed by a delimiter; otherwise it may be a
+                    # number cut at the chunk boundary (e.g. "12." of "12.5e1")
+                    if eof or (end < len(buf) and buf[end] in delims):
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    obj, pos = decoder.raw_decode(buf, pos)
+                    return obj
+
+        head = skip_ws()
+        if head not in "{[":
+            raise ValueError(f"{path}: top-level JSON value must be an object or array")
+        is_obj = head == "{"
+        if expect is not None and expect != ("object" if is_obj else "array"):
+            raise ValueError(f"{path}: expected a top-level JSON {expect}")
+        close = "}" if is_obj else "]"
+        pos += 1
+
+        index = 0
+        while True:
+            c = skip_ws()
+            if c == close:
+                return
+            if index > 0:
+                if c != ",":
+                    raise ValueError(f"{path}: expected ',' or '{close}' at offset {pos}")
+                pos += 1
+                skip_ws()
+            if is_obj:
+                key = value()
+                if skip_ws() != ":":
+                    raise ValueError(f"{path}: expected ':' after key {key!r}")
+                pos += 1
+                skip_ws()
+                yield key, value()
+            else:
+                yield index, value()
+            index += 1
+
+def write_json_items(
+    path: Path,
+    items: Mapping[str, Any] | Iterable[Tuple[str, Any]],
+    *,
+    indent: Optional[int] = 2,
+) -> Path:
+    """
+    Stream a top-level JSON object to `path` one record at a time (the inverse
+    of `iter_json_items`); `items` is a mapping or an iterable of (key, value) pairs.
+
+    indent=2 gives the same bytes as json.dump(obj, f, indent=2); indent=None
+    writes compact JSON. Output goes to a temporary file in the same directory
+    that is renamed over `path` only once complete, so `path` is never left
+    half-written. `.gz` / `.zst` paths are compressed as in `open_text`.
+    """
+    path = Path(path)
+    if isinstance(items, Mapping):
+        items = items.items()
+    if indent is None:
+        sep, head, tail, kv = ",", "{", "}", ":"
+        dump = lambda v: json.dumps(v, separators=(",", ":"))
+    else:
+        pad = " " * indent
+        sep, head, tail, kv = ",\n" + pad, "{\n" + pad, "\n}", ": "
+        # JSON strings never contain raw newlines, so re-indenting is a plain replace
+        dump = lambda v: json.dumps(v, indent=indent).replace("\n", "\n" + pad)
+
+    tmp = path.with_name(f".tmp{os.getpid()}.{path.name}")
+    try:
+        with open_text(tmp, "w") as f:
+            first = True
+            for key, value in items:
+                f.write(head if first else sep)
+                f.write(json.dumps(str(key)) + kv + dump(value))
+                first = False
+            f.write("{}" if first else tail)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path
+
 def load_yaml(path: Path) -> Any:
+    import yaml
+
     with path.open("r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
@@ -20,3 +224,418 @@ def dataset_paths(repo_root: Path, dataset: str, version: str = "v1") -> Tuple[P
     """
     base = repo_root / dataset / version / "data"
     return base/"nodes.json", base/"edges.json", base/"probs.json"
+
+# ---------- high-level dataset loading ----------
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+@dataclass
+class Dataset:
+    """Parsed dataset returned by `load_dataset` (treat as read-only: results are cached)."""
+    name: str
+    version: str
+    root: Path
+    nodes: Dict[str, Dict[str, Any]]
+    edges: Dict[str, Dict[str, Any]]
+    probs: Dict[str, Any]
+    probs_path: Optional[Path] = None
+    graph: Any = None
+    all_probs: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # every probs variant, by file stem (load_datasets)
+
+def _norm_name(name: str) -> str:
+    return name.strip().lower().replace("-", "_")
+
+def load_registry(repo_root: Path = REPO_ROOT) -> List[Dict[str, Any]]:
+    """Return registry.json entries (accepts a bare list or {"datasets": [...]})."""
+    reg_path = Path(repo_root) / "registry.json"
+    if not reg_path.exists():
+        return []
+    reg = load_json(reg_path)
+    return reg.get("datasets", []) if isinstance(reg, dict) else reg
+
+def resolve_dataset(name: str | Path, version: str = "v1", repo_root: Path = REPO_ROOT) -> Path:
+    """
+    Resolve a dataset name (or path) to its version folder, i.e. the folder holding data/.
+
+    Lookup order:
+      1) an existing directory path (either the version folder or its parent)
+      2) registry.json entries by name ('-' and '_' are treated alike)
+      3) datasets/<name>/<version> and datasets/generated/<name>/<version>
+    """
+    repo_root = Path(repo_root)
+    p = Path(name)
+    for cand in (p, repo_root / p):
+        if (cand / "data").is_dir():
+            return cand
+        if (cand / version / "data").is_dir():
+            return cand / version
+
+    key = _norm_name(str(name))
+    for entry in load_registry(repo_root):
+        if _norm_name(entry.get("name", "")) != key or not entry.get("path"):
+            continue
+        path = repo_root / entry["path"]
+        if path.name != version and (path.parent / version / "data").is_dir():
+            path = path.parent / version
+        if (path / "data").is_dir():
+            return path
+        if (path / version / "data").is_dir():
+            return path / version
+
+    for base in (repo_root / "datasets", repo_root / "datasets" / "generated"):
+        for cand in (base / str(name), base / key, base / key.replace("_", "-")):
+            if (cand / version / "data").is_dir():
+                return cand / version
+
+    raise FileNotFoundError(f"Dataset '{name}' ({version}) not found in registry.json or under {repo_root / 'datasets'}")
+
+@lru_cache(maxsize=64)
+def _load_yaml_cached(path: Path, mtime_ns: int) -> Any:
+    return load_yaml(path)
+
+def _dataset_files(root: Path) -> Dict[str, Path]:
+    """`files:` entries from dataset.yaml (next to or above the version folder), else data/*.json."""
+    for yml in (root / "dataset.yaml", root.parent / "dataset.yaml"):
+        if yml.exists():
+            files = (_load_yaml_cached(yml, yml.stat().st_mtime_ns) or {}).get("files") or {}
+            if files:
+                return {k: root / v for k, v in files.items()}
+    files = {"nodes": root / "data" / "nodes.json", "edges": root / "data" / "edges.json"}
+    for pp in sorted((root / "data").glob("probs*.json*")):
+        files.setdefault(json_stem(pp), pp)
+    return files
+
+def _select_probs(files: Dict[str, Path], probs: Optional[str]) -> Optional[Path]:
+    """
+    Pick a probs file. `probs=None` takes the 'probs' entry (or the first probs
+    entry); otherwise 'bin', 'mult', 'probs_bin', 'probs_binary', 'probs_mult.json', ...
+    """
+    cands = {k: v for k, v in files.items() if k.startswith("probs")}
+    if not cands:
+        return None
+    if probs is None:
+        return cands.get("probs", next(iter(cands.values())))
+    want = probs.lower()
+    for k, v in cands.items():
+        labels = {k.lower(), v.name.lower(), json_stem(v).lower()}
+        if want in labels or f"probs_{want}" in labels:
+            return v
+    for k, v in cands.items():
+        if k.lower().startswith(f"probs_{want}") or json_stem(v).lower().startswith(f"probs_{want}"):
+            return v
+    raise KeyError(f"No probs variant '{probs}'; available: {sorted(cands)}")
+
+def _normalise_nodes(nodes_raw: Any) -> Dict[str, Dict[str, Any]]:
+    """Accept {id: attrs} or [{"id": ..., ...}, ...]."""
+    if isinstance(nodes_raw, dict):
+        return nodes_raw
+    if isinstance(nodes_raw, list):
+        return {n["id"]: {k: v for k, v in n.items() if k != "id"} for n in nodes_raw}
+    raise TypeError("nodes.json must be dict or list")
+
+def _normalise_edges(edges_raw: Any) -> Dict[str, Dict[str, Any]]:
+    """Accept {eid: {from, to, ...}} or [{"eid": ..., source/target or from/to, ...}, ...]."""
+    if isinstance(edges_raw, dict):
+        items = list(edges_raw.items())
+    elif isinstance(edges_raw, list):
+        items = []
+        for e in edges_raw:
+            eid = e.get("eid", e.get("id"))
+            if not eid:
+                raise KeyError("Edge entry in list missing 'eid'")
+            items.append((eid, {k: v for k, v in e.items() if k not in ("eid", "id")}))
+    else:
+        raise TypeError("edges.json must be dict or list")
+
+    edges: Dict[str, Dict[str, Any]] = {}
+    for eid, e in items:
+        if "from" in e and "to" in e:
+            edges[eid] = e
+        elif "source" in e and "target" in e:
+            edges[eid] = {"from": e["source"], "to": e["target"],
+                          **{k: v for k, v in e.items() if k not in ("source", "target")}}
+        else:
+            raise KeyError(f"Edge {eid} missing 'from'/'to' or 'source'/'target'")
+    return edges
+
+@lru_cache(maxsize=16)
+def _load_dataset_cached(name: str, version: str, root: Path, nodes_p: Path, edges_p: Path,
+                         probs_p: Optional[Path], stamps: Tuple, build_graph: bool) -> Dataset:
+    # `stamps` (file mtimes/sizes) is part of the cache key so edited files are reloaded.
+    nodes = _normalise_nodes(load_json(nodes_p))
+    edges = _normalise_edges(load_json(edges_p))
+    probs = load_json(probs_p) if probs_p is not None else {}
+    ds = Dataset(name=name, version=version, root=root, nodes=nodes, edges=edges,
+                 probs=probs, probs_path=probs_p)
+    if build_graph:
+        from ndtools.graphs import build_graph as _build_graph
+        ds.graph = _build_graph(nodes, edges, probs or None)
+    return ds
+
+def load_dataset(
+    name: str | Path,
+    version: str = "v1",
+    probs: Optional[str] = None,
+    *,
+    build_graph: bool = False,
+    repo_root: Path = REPO_ROOT,
+) -> Dataset:
+    """
+    Load a dataset by name (resolved via registry.json / dataset.yaml) or path.
+
+    Args:
+      name: registry name (e.g. 'ema-highway'), folder name or path.
+      version: version folder, default 'v1'.
+      probs: probs variant, e.g. 'bin' or 'mult' (None -> default probs file).
+      build_graph: also build a NetworkX graph with `ndtools.graphs.build_graph`.
+
+    Results are kept in a bounded in-process LRU cache keyed by the resolved file
+    paths and their mtimes, so repeated loads are free. Do not mutate them;
+    call `clear_dataset_cache()` to drop the cache.
+
+    This loader always parses the JSON files: it returns the full attribute
+    dicts, which the binary sidecar of `load_compiled` does not hold (mixed-type
+    attributes are left out of it). Array consumers that want startup without
+    JSON parsing should call `load_compiled` instead.
+
+    Example:
+      ds = load_dataset('ema-highway', probs='mult', build_graph=True)
+      ds.nodes, ds.edges, ds.probs, ds.graph
+    """
+    root = resolve_dataset(name, version, repo_root)
+    files = _dataset_files(root)
+    nodes_p = find_data_file(files.get("nodes", root / "data" / "nodes.json"))
+    edges_p = find_data_file(files.get("edges", root / "data" / "edges.json"))
+    probs_p = _select_probs(files, probs)
+    if probs_p is not None:
+        probs_p = find_data_file(probs_p)
+    stamps = tuple((st.st_mtime_ns, st.st_size) for st in
+                   (pp.stat() for pp in (nodes_p, edges_p, probs_p) if pp is not None))
+    return _load_dataset_cached(str(name), version, root, nodes_p, edges_p, probs_p, stamps, build_graph)
+
+def clear_dataset_cache() -> None:
+    """Empty the in-process cache used by `load_dataset`."""
+    _load_dataset_cached.cache_clear()
+
+def list_datasets(repo_root: Path = REPO_ROOT, version: str = "v1") -> List[Path]:
+    """All dataset version folders (holding data/) under datasets/ and datasets/generated/."""
+    base = Path(repo_root) / "datasets"
+    roots = [p.parent for p in sorted(base.glob(f"*/{version}/data")) + sorted(base.glob(f"generated/*/{version}/data"))]
+    return [r for r in roots if r.is_dir()]
+
+def load_datasets(
+    names: Iterable[str | Path],
+    version: str = "v1",
+    *,
+    max_workers: Optional[int] = None,
+    repo_root: Path = REPO_ROOT,
+) -> Iterator[Tuple[str | Path, Dataset]]:
+    """
+    Load many datasets concurrently and yield (name, Dataset) as each one completes.
+
+    Every file (nodes, edges and each probs*.json variant) is read and parsed on a
+    bounded thread pool, so I/O latency (e.g. on network filesystems) overlaps.
+    `Dataset.probs` holds the default variant and `Dataset.all_probs` all of them.
+
+    Example:
+      for name, ds in load_datasets(list_datasets(), max_workers=8):
+          ...
+    """
+    plans = []
+    for name in names:
+        root = resolve_dataset(name, version, repo_root)
+        files = _dataset_files(root)
+        probs_files = {json_stem(p): find_data_file(p) for k, p in files.items() if k.startswith("probs")}
+        default = _select_probs(files, None)
+        plans.append({
+            "name": name, "root": root,
+            "files": {"nodes": find_data_file(files.get("nodes", root / "data" / "nodes.json")),
+                      "edges": find_data_file(files.get("edges", root / "data" / "edges.json")),
+                      **{f"probs:{stem}": p for stem, p in probs_files.items()}},
+            "default": json_stem(default) if default is not None else None,
+            "parsed": {},
+        })
+
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(load_json, path): (plan, key)
+                   for plan in plans for key, path in plan["files"].items()}
+        for fut in as_completed(futures):
+            plan, key = futures[fut]
+            plan["parsed"][key] = fut.result()
+            if len(plan["parsed"]) < len(plan["files"]):
+                continue
+            parsed = plan["parsed"]
+            all_probs = {k[len("probs:"):]: v for k, v in parsed.items() if k.startswith("probs:")}
+            default = plan["default"]
+            yield plan["name"], Dataset(
+                name=str(plan["name"]), version=version, root=plan["root"],
+                nodes=_normalise_nodes(parsed["nodes"]), edges=_normalise_edges(parsed["edges"]),
+                probs=all_probs.get(default, {}) if default else {},
+                probs_path=plan["files"].get(f"probs:{default}"),
+                all_probs=all_probs,
+            )
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+# ---------- compiled datasets with a cached binary sidecar ----------
+
+SIDECAR_DIR = ".ndcache"
+_SIDECAR_FORMAT = 1
+
+def _file_stamp(path: Path) -> Dict[str, int]:
+    st = path.stat()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def sha256_file(path: Path) -> str:
+    """Hex sha256 of a file's bytes, read in 1 MiB chunks."""
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _read_source(path: Path) -> Tuple[Any, Dict[str, Any]]:
+    """Parse a JSON source file and return it with its stamp (mtime, size, sha256)."""
+    # stat before reading: a write in between then leaves an outdated stamp,
+    # which only forces a rebuild, never a stale sidecar under a fresh stamp
+    stamp = _file_stamp(path)
+    raw = path.read_bytes()
+    meta = {**stamp, "sha256": hashlib.sha256(raw).hexdigest()}
+    return json.loads(_decompress(path, raw)), meta
+
+def _sidecar_manifest(part_dir: Path, sources: Dict[str, Path]) -> Optional[Dict[str, Any]]:
+    """
+    Return the sidecar manifest if it is still valid for `sources`, else None.
+    A source whose mtime/size changed is re-hashed; if the content is identical
+    the stored stamp is refreshed instead of rebuilding.
+    """
+    man_path = part_dir / "manifest.json"
+    try:
+        manifest = json.loads(man_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != _SIDECAR_FORMAT:
+        return None
+
+    refreshed = False
+    for name, path in sources.items():
+        rec = manifest.get("sources", {}).get(name)
+        if rec is None or not path.exists():
+            return None
+        stamp = _file_stamp(path)
+        if stamp["mtime_ns"] == rec.get("mtime_ns") and stamp["size"] == rec.get("size"):
+            continue
+        if sha256_file(path) != rec.get("sha256"):
+            return None
+        rec.update(stamp)
+        refreshed = True
+
+    if refreshed:
+        try:
+            man_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        except OSError:
+            pass
+    return manifest
+
+def _write_sidecar(part_dir: Path, sources: Dict[str, Dict[str, Any]], arrays: Dict[str, Any]) -> None:
+    """Write arrays + manifest into a temp dir and swap it in. Failures are non-fatal."""
+    import numpy as np
+
+    tmp = part_dir.with_name(f"{part_dir.name}.tmp{os.getpid()}")
+    try:
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        files = {}
+        for i, (key, arr) in enumerate(arrays.items()):
+            fn = f"a{i}.npy"
+            np.save(tmp / fn, np.asarray(arr), allow_pickle=False)
+            files[key] = fn
+        manifest = {"format": _SIDECAR_FORMAT, "sources": sources, "arrays": files}
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        if part_dir.exists():
+            shutil.rmtree(part_dir)
+        os.replace(tmp, part_dir)
+    except OSError:
+        # read-only location or a concurrent writer won the race; the in-memory result is still valid
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _read_sidecar(part_dir: Path, manifest: Dict[str, Any], mmap: bool) -> Dict[str, Any]:
+    import numpy as np
+
+    mode = "r" if mmap else None
+    return {key: np.load(part_dir / fn, mmap_mode=mode, allow_pickle=False)
+            for key, fn in manifest["arrays"].items()}
+
+def load_compiled(
+    data_dir: Path,
+    probs: Optional[str] = "probs.json",
+    *,
+    use_cache: bool = True,
+    mmap: bool = True,
+):
+    """
+    Load a dataset's data folder as an `ndtools.compiled.CompiledDataset`.
+
+    The first load parses nodes.json/edges.json (and `probs`, a file name inside
+    `data_dir`, or None to skip) and writes a binary sidecar to
+    `data_dir/.ndcache/`. Later loads memory-map the sidecar arrays and skip JSON
+    parsing. The sidecar is rebuilt automatically when a source file's content
+    changes (detected by mtime/size, confirmed by sha256).
+
+    Only this entry point uses the sidecar; `load_dataset`/`load_datasets`
+    return attribute dicts and keep parsing JSON (with an in-process cache).
+
+    Example:
+      ds = load_compiled(Path('datasets/ema_highway/v1/data'), 'probs_mult.json')
+      ds.src, ds.dst, ds.probs
+    """
+    from ndtools.compiled import CompiledDataset, compile_graph, compile_probs
+
+    data_dir = Path(data_dir)
+    cache_root = data_dir / SIDECAR_DIR
+
+    # --- graph part: nodes.json + edges.json ---
+    graph_sources = {"nodes": find_data_file(data_dir / "nodes.json"),
+                     "edges": find_data_file(data_dir / "edges.json")}
+    graph_dir = cache_root / "graph"
+    manifest = _sidecar_manifest(graph_dir, graph_sources) if use_cache else None
+    if manifest is not None:
+        arrs = _read_sidecar(graph_dir, manifest, mmap)
+        ds = CompiledDataset(
+            node_ids=arrs["node_ids"], edge_ids=arrs["edge_ids"],
+            src=arrs["src"], dst=arrs["dst"], directed=arrs["directed"],
+            node_attrs={k[len("node:"):]: v for k, v in arrs.items() if k.startswith("node:")},
+            edge_attrs={k[len("edge:"):]: v for k, v in arrs.items() if k.startswith("edge:")},
+        )
+    else:
+        nodes, nodes_meta = _read_source(graph_sources["nodes"])
+        edges, edges_meta = _read_source(graph_sources["edges"])
+        ds = compile_graph(nodes, edges)
+        if use_cache:
+            arrs = {"node_ids": ds.node_ids, "edge_ids": ds.edge_ids,
+                    "src": ds.src, "dst": ds.dst, "directed": ds.directed}
+            arrs.update({f"node:{k}": v for k, v in ds.node_attrs.items()})
+            arrs.update({f"edge:{k}": v for k, v in ds.edge_attrs.items()})
+            _write_sidecar(graph_dir, {"nodes": nodes_meta, "edges": edges_meta}, arrs)
+
+    if probs is None:
+        return ds
+
+    # --- probs part: one sidecar per probs variant ---
+    probs_path = find_data_file(data_dir / probs)
+    probs_sources = {"probs": probs_path}
+    probs_dir = cache_root / json_stem(probs_path)
+    manifest = _sidecar_manifest(probs_dir, probs_sources) if use_cache else None
+    if manifest is not None:
+        arrs = _read_sidecar(probs_dir, manifest, mmap)
+        ds.prob_ids, ds.states, ds.probs = arrs["prob_ids"], arrs["states"], arrs["probs"]
+    else:
+        raw, meta = _read_source(probs_path)
+        ds.prob_ids, ds.states, ds.probs = compile_probs(raw)
+        if use_cache:
+            _write_sidecar(probs_dir, {"probs": meta},
+                           {"prob_ids": ds.prob_ids, "states": ds.states, "probs": ds.probs})
+    return ds
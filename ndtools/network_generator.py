@@ -1,19 +1,32 @@
 # ndtools/network_generator.py
 from __future__ import annotations
+import atexit
+import hashlib
+import heapq
+import itertools
 import json
-import random
+import os
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Dict, List, Tuple, Literal, Optional, Any
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple, Literal, Optional, Any
 import math
 import networkx as nx
+import numpy as np
 
-from ndtools.graphs import draw_graph_from_data
-
-try:
-    import jsonschema  # used in validate()
-except Exception:
-    jsonschema = None
+from ndtools import __version__
+from ndtools.io import (
+    COMPRESSIONS, data_file_variants, find_data_file, json_stem, load_json,
+    sha256_file, write_json_items,
+)
+from ndtools.registry import upsert_entries
+from ndtools.spatial import SpatialIndex
+from ndtools.validation import check_dataset
 
 DatasetVersion = Literal["v1"]
 
@@ -26,79 +39,252 @@ class GenConfig:
     generator: str = ""         # "grid" | "erdos_renyi" | ...
     generator_params: Dict = None
 
-def _rng(seed: Optional[int]):
-    r = random.Random()
-    if seed is not None:
-        r.seed(seed)
-    return r
+@dataclass
+class GraphArrays:
+    """
+    Compact generator output: endpoint index arrays instead of per-edge dicts.
+
+    Node i is written as "n<i>", edge k as "e<k>" with endpoints src[k] -> dst[k].
+    `coords` is an (n_nodes, 2|3) array written as x/y[/z] (None -> null x/y).
+    `edge_attrs` holds per-edge arrays such as {"length": ...}.
+    Conversion to the JSON dict form only happens in `iter_nodes`/`iter_edges`/`to_dicts`.
+    """
+    n_nodes: int
+    src: np.ndarray
+    dst: np.ndarray
+    directed: bool = False
+    coords: Optional[np.ndarray] = None
+    edge_attrs: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.src)
+
+    def iter_nodes(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if self.coords is None:
+            for i in range(self.n_nodes):
+                yield f"n{i}", {"x": None, "y": None}
+            return
+        keys = ("x", "y", "z")[: self.coords.shape[1]]
+        for i, row in enumerate(self.coords.tolist()):
+            yield f"n{i}", dict(zip(keys, row))
+
+    def edge_ids(self) -> Iterator[str]:
+        return (f"e{k}" for k in range(self.n_edges))
+
+    def iter_edges(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        directed = bool(self.directed)
+        attrs = {name: arr.tolist() for name, arr in self.edge_attrs.items()}
+        for k, (u, v) in enumerate(zip(self.src.tolist(), self.dst.tolist())):
+            rec = {"from": f"n{u}", "to": f"n{v}", "directed": directed}
+            for name, vals in attrs.items():
+                rec[name] = vals[k]
+            yield f"e{k}", rec
+
+    def to_dicts(self) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        return dict(self.iter_nodes()), dict(self.iter_edges())
+
+def _arrays_from_nx(G: nx.Graph | nx.DiGraph, coords: Optional[np.ndarray] = None) -> GraphArrays:
+    """Convert a NetworkX graph on nodes 0..n-1 to GraphArrays."""
+    e = np.asarray(list(G.edges()), dtype=np.int64).reshape(-1, 2)
+    return GraphArrays(G.number_of_nodes(), e[:, 0], e[:, 1], bool(G.is_directed()), coords)
+
+def _out(graph: GraphArrays, as_arrays: bool):
+    return graph if as_arrays else graph.to_dicts()
 
 # Generators
-def generate_grid(rows: int, cols: int) -> Tuple[List[Dict], List[Dict]]:
+def generate_grid(rows: int, cols: int, *, as_arrays: bool = False) -> Tuple[Dict, Dict] | GraphArrays:
     """
     nodes: {"n0": {"x": int, "y": int}, ...}
     edges: {"e0": {"from": "n0", "to": "n1"}, ...}
+    Fully vectorised; as_arrays=True returns GraphArrays instead of dicts.
+    """
+    n = rows * cols
+    u = np.arange(n, dtype=np.int64)
+    x, y = u % cols, u // cols
+    # per node: right neighbour, then down neighbour (same order as the original loop)
+    src = np.repeat(u, 2)
+    dst = np.stack([u + 1, u + cols], axis=1).ravel()
+    ok = np.stack([x + 1 < cols, y + 1 < rows], axis=1).ravel()
+    graph = GraphArrays(n, src[ok], dst[ok], False, np.stack([x, y], axis=1))
+    return _out(graph, as_arrays)
+
+def _erdos_renyi_pairs(
+    n_nodes: int,
+    p: float,
+    seed: Optional[int] = 42,
+    *,
+    directed: bool = False,
+    batch_size: int = 1 << 20,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    G(n, p) edge endpoints in O(n + m) (Batagelj & Brandes, 2005).
+
+    Candidate pairs are numbered 0..N-1 and the gaps between selected pairs are
+    drawn as geometric random variables in vectorised batches, so only the
+    selected pairs are ever touched. Undirected pairs are (w, v) with w < v.
+    """
+    if not 0.0 <= p <= 1.0:
+        raise ValueError(f"p must be in [0, 1], got {p}")
+    n = int(n_nodes)
+    total = n * (n - 1) if directed else n * (n - 1) // 2
+    rng = np.random.default_rng(seed)
+
+    if total <= 0 or p == 0.0:
+        k = np.empty(0, dtype=np.int64)
+    elif p == 1.0:
+        k = np.arange(total, dtype=np.int64)
+    else:
+        chunks = []
+        last = -1
+        while last < total:
+            remaining = total - last - 1
+            size = int(min(batch_size, remaining * p + 5.0 * math.sqrt(remaining * p + 1.0) + 16))
+            pos = last + np.cumsum(rng.geometric(p, size=size))
+            chunks.append(pos[pos < total])
+            last = int(pos[-1])
+        k = np.concatenate(chunks)
+
+    if directed:
+        # row i holds the n-1 targets j != i
+        i = k // (n - 1)
+        j = k % (n - 1)
+        j = j + (j >= i)
+        return i, j
+    # lower-triangle numbering: k = v(v-1)/2 + w, 0 <= w < v
+    v = np.floor((1.0 + np.sqrt(1.0 + 8.0 * k.astype(float))) / 2.0).astype(np.int64)
+    v -= v * (v - 1) // 2 > k          # correct float rounding
+    v += (v + 1) * v // 2 <= k
+    w = k - v * (v - 1) // 2
+    return w, v
+
+def generate_erdos_renyi(
+    n_nodes: int,
+    p: float,
+    seed: Optional[int] = 42,
+    *,
+    directed: bool = False,
+    as_arrays: bool = False,
+) -> Tuple[Dict, Dict] | GraphArrays:
+    """
+    Erdős–Rényi G(n, p) graph in O(n + m) time (geometric edge skipping).
+    directed=True samples each ordered pair (i, j), i != j, independently.
+    """
+    src, dst = _erdos_renyi_pairs(n_nodes, p, seed, directed=directed)
+    return _out(GraphArrays(n_nodes, src, dst, directed), as_arrays)
+
+class _Pool:
     """
-    nodes = {f"n{i}": {"x": i % cols, "y": i // cols} for i in range(rows * cols)}
-    def idx(i, j): return i * cols + j
-    edges = {}
-    eid = 0
-    for i in range(rows):
-        for j in range(cols):
-            u = f"n{idx(i, j)}"
-            if j + 1 < cols:
-                v = f"n{idx(i, j+1)}"
-                edges[f"e{eid}"] = {"from": u, "to": v, "directed": False}
-                eid += 1
-            if i + 1 < rows:
-                v = f"n{idx(i+1, j)}"
-                edges[f"e{eid}"] = {"from": u, "to": v, "directed": False}
-                eid += 1
-    return nodes, edges
-
-def generate_erdos_renyi(n_nodes: int, p: float, seed: Optional[int]=42) -> Tuple[List[Dict], List[Dict]]:
-    r = _rng(seed)
-    nodes = {f"n{i}": {"x": None, "y": None} for i in range(n_nodes)}
-    edges = {}
-    eid = 0
-    for i in range(n_nodes):
-        for j in range(i+1, n_nodes):
-            if r.random() < p:
-                edges[f"e{eid}"] = {"from": f"n{i}", "to": f"n{j}", "directed": False}
-                eid += 1
-    return nodes, edges
-
-def _edges_from_nx(G: nx.Graph | nx.DiGraph) -> Dict[str, Dict[str, Any]]:
-    """Convert a NetworkX graph to your edges dict format (undirected by default)."""
-    edges: Dict[str, Dict[str, Any]] = {}
-    eid = 0
-    for u, v in G.edges():
-        edges[f"e{eid}"] = {"from": f"n{u}", "to": f"n{v}", "directed": bool(G.is_directed())}
-        eid += 1
-    return edges
-
-def generate_watts_strogatz(n_nodes: int, k: int, p_rewire: float, seed: Optional[int] = 42) -> Tuple[Dict, Dict]:
+    Batched uniform integer draws in [0, high) for tight Python loops. One
+    buffer per `high`, so interleaving bounds (e.g. an edge index and a coin
+    flip) does not discard buffered draws.
+    """
+    def __init__(self, rng: np.random.Generator, size: int = 4096):
+        self.rng, self.size = rng, size
+        self.bufs: Dict[int, List[int]] = {}
+        self.refills = 0
+
+    def draw(self, high: int) -> int:
+        buf = self.bufs.get(high)
+        if not buf:
+            buf = self.bufs[high] = self.rng.integers(0, high, size=self.size).tolist()
+            self.refills += 1
+        return buf.pop()
+
+def generate_watts_strogatz(
+    n_nodes: int,
+    k: int,
+    p_rewire: float,
+    seed: Optional[int] = 42,
+    *,
+    as_arrays: bool = False,
+) -> Tuple[Dict, Dict] | GraphArrays:
     """
     Watts–Strogatz small-world graph.
     nodes: {"n<i>": {"x": None, "y": None}}
     edges: {"e<i>": {"from": "n<i>", "to": "n<j>", "directed": False}}
+    Same rewiring procedure as networkx, on endpoint arrays.
     """
     # Ensure valid k
     if k >= n_nodes:
         k = max(2, n_nodes - (n_nodes % 2) - 1)
     if k % 2 == 1:
         k += 1
-    G = nx.watts_strogatz_graph(n_nodes, k, p_rewire, seed=seed)
-    nodes = {f"n{i}": {"x": None, "y": None} for i in range(n_nodes)}
-    edges = _edges_from_nx(G)
-    return nodes, edges
-
-def generate_barabasi_albert(n_nodes: int, m: int, seed: Optional[int] = 42) -> Tuple[Dict, Dict]:
-    """Barabási–Albert preferential attachment graph."""
-    m = max(1, min(m, n_nodes - 1))
-    G = nx.barabasi_albert_graph(n_nodes, m, seed=seed)
-    nodes = {f"n{i}": {"x": None, "y": None} for i in range(n_nodes)}
-    edges = _edges_from_nx(G)
-    return nodes, edges
+    n, half = n_nodes, k // 2
+    rng = np.random.default_rng(seed)
+
+    # ring lattice, edge (j-1)*n + u joins u and u+j
+    u = np.tile(np.arange(n, dtype=np.int64), half)
+    v = (u + np.repeat(np.arange(1, half + 1), n)) % n
+
+    # rewire in the same order as networkx: neighbour distance outer, node inner
+    rewire = np.flatnonzero(rng.random(half * n) < p_rewire)
+    if len(rewire):
+        edge_set = set((np.minimum(u, v) * n + np.maximum(u, v)).tolist())
+        deg = np.full(n, k, dtype=np.int64).tolist()
+        dst = v.tolist()
+        pool = _Pool(rng)
+        for e in rewire.tolist():
+            a, b = e % n, dst[e]
+            while True:
+                w = pool.draw(n)
+                if w != a and (min(a, w) * n + max(a, w)) not in edge_set:
+                    break
+                if deg[a] >= n - 1:
+                    w = None  # skip this rewiring
+                    break
+            if w is None:
+                continue
+            edge_set.discard(min(a, b) * n + max(a, b))
+            edge_set.add(min(a, w) * n + max(a, w))
+            deg[b] -= 1
+            deg[w] += 1
+            dst[e] = w
+        v = np.asarray(dst, dtype=np.int64)
+    return _out(GraphArrays(n, u, v, False), as_arrays)
+
+def generate_barabasi_albert(
+    n_nodes: int,
+    m: int,
+    seed: Optional[int] = 42,
+    *,
+    as_arrays: bool = False,
+) -> Tuple[Dict, Dict] | GraphArrays:
+    """
+    Barabási–Albert preferential attachment graph (star on m+1 nodes as seed
+    graph, like networkx), built on preallocated endpoint arrays.
+    Raises ValueError for n_nodes < 2 or m < 1; m >= n_nodes is capped at n_nodes - 1.
+    """
+    if n_nodes < 2 or m < 1:
+        raise ValueError(f"Barabási–Albert needs n_nodes >= 2 and m >= 1, got n_nodes={n_nodes}, m={m}")
+    m = min(m, n_nodes - 1)
+    n = n_nodes
+    rng = np.random.default_rng(seed)
+    n_edges = m + m * max(0, n - m - 1)
+    src = np.empty(n_edges, dtype=np.int64)
+    dst = np.empty(n_edges, dtype=np.int64)
+    src[:m], dst[:m] = 0, np.arange(1, m + 1)
+
+    # every edge end appears once: sampling uniformly from it is degree-proportional
+    repeated = np.empty(2 * n_edges, dtype=np.int64)
+    repeated[:m], repeated[m:2 * m] = 0, np.arange(1, m + 1)
+    fill, e = 2 * m, m
+    for source in range(m + 1, n):
+        targets: List[int] = []
+        seen = set()
+        while len(targets) < m:
+            for t in repeated[rng.integers(0, fill, size=2 * m)].tolist():
+                if t not in seen:
+                    seen.add(t)
+                    targets.append(t)
+                    if len(targets) == m:
+                        break
+        src[e:e + m], dst[e:e + m] = source, targets
+        repeated[fill:fill + m] = targets
+        repeated[fill + m:fill + 2 * m] = source
+        fill += 2 * m
+        e += m
+    return _out(GraphArrays(n, src, dst, False), as_arrays)
 
 def _load_deg_seq(deg_seq_arg: Optional[str], n_nodes: int) -> List[int]:
     """
@@ -123,111 +309,247 @@ def _load_deg_seq(deg_seq_arg: Optional[str], n_nodes: int) -> List[int]:
     # comma-separated
     return [int(x.strip()) for x in deg_seq_arg.split(",") if x.strip()]
 
+def _is_graphical(degs: np.ndarray) -> bool:
+    """Erdős–Gallai test, vectorised: O(n log n)."""
+    d = np.sort(np.asarray(degs, dtype=np.int64))[::-1]
+    n = len(d)
+    if n == 0:
+        return True
+    if d[-1] < 0 or d[0] > n - 1 or d.sum() % 2:
+        return False
+    k = np.arange(1, n + 1)
+    prefix = np.concatenate(([0], np.cumsum(d)))
+    # c_k = #{i: d_i >= k}; positions > max(k, c_k) contribute d_i, the others k
+    c = n - np.searchsorted(d[::-1], k, side="left")
+    split = np.maximum(k, c)
+    rhs = k * (k - 1) + k * np.maximum(0, c - k) + (prefix[n] - prefix[split])
+    return bool(np.all(prefix[1:] <= rhs))
+
 def _synthesize_degree_sequence(
     n: int,
     avg_deg: float,
     *,
     seed: Optional[int] = 42,
-    max_tries: int = 200,
 ) -> List[int]:
     """
-    Build a simple, graphical degree sequence near a target.
+    Build a simple, graphical degree sequence near a target average, directly
+    (no resampling): Gaussian degrees around avg_deg are clipped to [0, n-1],
+    nudged by +/-1 on random nodes until the sum is the even target, and, if the
+    Erdős–Gallai test still fails, the degrees are capped in one step: the
+    largest cap that keeps the (parity-fixed) sequence graphical is found by
+    bisection, O(n log^2 n) in all.
     """
-    rng = random.Random(seed)
-
-    S = max(0, int(round(n * float(avg_deg))))
+    rng = np.random.default_rng(seed)
+    if n <= 1:
+        return [0] * max(n, 0)
 
+    S = min(max(0, int(round(n * float(avg_deg)))), n * (n - 1))
     # sum must be even
     if S % 2 == 1:
-        S += 1
+        S = S + 1 if S < n * (n - 1) else S - 1
 
-    # aim degrees around mu, clipped to [0, n-1]
     mu = min(n - 1, max(0.0, S / n))
-    for _ in range(max_tries):
-        # gaussian-ish around mu
-        degs = [max(0, min(n - 1, int(round(rng.gauss(mu, 1.5))))) for _ in range(n)]
-
-        # adjust total sum to S
-        cur = sum(degs)
-        delta = S - cur
-        # make parity even
-        if delta % 2 != 0:
-            # flip one degree by +/-1 within [0,n-1]
-            i = rng.randrange(n)
-            if degs[i] < n - 1:
-                degs[i] += 1
-            elif degs[i] > 0:
-                degs[i] -= 1
-            delta = S - sum(degs)
-
-        # distribute the remaining difference in +/-2 steps
-        step = 2 if delta > 0 else -2
-        while delta != 0:
-            i = rng.randrange(n)
-            new_d = degs[i] + step
-            if 0 <= new_d <= n - 1:
-                degs[i] = new_d
-                delta -= step
-            # safeguard to avoid infinite loops
-            if abs(delta) > 4 * n * (n - 1):
-                break
+    degs = np.clip(np.rint(rng.normal(mu, 1.5, size=n)), 0, n - 1).astype(np.int64)
+
+    delta = S - int(degs.sum())
+    while delta != 0:
+        step = 1 if delta > 0 else -1
+        room = np.flatnonzero(degs < n - 1) if step > 0 else np.flatnonzero(degs > 0)
+        pick = rng.permutation(room)[: abs(delta)]
+        degs[pick] += step
+        delta -= step * len(pick)
+
+    if _is_graphical(degs):
+        return degs.tolist()
+    lo, hi = 0, int(degs.max())  # cap 0 is graphical, the uncapped sequence is not
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if _is_graphical(_capped(degs, mid)):
+            lo = mid
+        else:
+            hi = mid
+    return _capped(degs, lo).tolist()
+
+def _capped(degs: np.ndarray, cap: int) -> np.ndarray:
+    """`degs` clipped to `cap`, with one capped degree lowered if the sum is odd."""
+    out = np.minimum(degs, cap)
+    if out.sum() % 2:
+        out[np.argmax(out)] -= 1
+    return out
+
+def _edge_keys(a: np.ndarray, b: np.ndarray, n: int) -> np.ndarray:
+    return np.minimum(a, b) * n + np.maximum(a, b)
 
-        # final guards
-        if sum(degs) != S:
-            continue
-        if any(d > n - 1 or d < 0 for d in degs):
-            continue
+class _EdgeMultiset:
+    """
+    Multiplicity of undirected edges: a sorted key array plus a small dict of
+    changes, so membership tests stay cheap without a Python set of all edges.
+    """
+    def __init__(self, a: np.ndarray, b: np.ndarray, n: int):
+        self.n = n
+        self.keys = np.sort(_edge_keys(a, b, n))
+        self.delta: Dict[int, int] = {}
+
+    def key(self, u: int, v: int) -> int:
+        return min(u, v) * self.n + max(u, v)
+
+    def count(self, u: int, v: int) -> int:
+        k = self.key(u, v)
+        base = int(np.searchsorted(self.keys, k, "right") - np.searchsorted(self.keys, k, "left"))
+        return base + self.delta.get(k, 0)
+
+    def move(self, old: Tuple[int, int], new: Tuple[int, int]) -> None:
+        ko, kn = self.key(*old), self.key(*new)
+        self.delta[ko] = self.delta.get(ko, 0) - 1
+        self.delta[kn] = self.delta.get(kn, 0) + 1
+
+def _swap(a: List[int], b: List[int], e: int, f: int, flip: bool, edges: _EdgeMultiset) -> bool:
+    """Degree-preserving swap of edges e and f; only done if both new edges are new and not loops."""
+    u, v = a[e], b[e]
+    x, y = (b[f], a[f]) if flip else (a[f], b[f])
+    if u == x or v == y or {u, x} == {v, y}:
+        return False
+    if edges.count(u, x) or edges.count(v, y):
+        return False
+    edges.move((u, v), (u, x))
+    edges.move((a[f], b[f]), (v, y))
+    a[e], b[e], a[f], b[f] = u, x, v, y
+    return True
+
+def _havel_hakimi_edges(degs: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Havel–Hakimi realisation with a heap: O(m log n). Raises ValueError if not graphical."""
+    heap = [(-d, i) for i, d in enumerate(degs) if d > 0]
+    heapq.heapify(heap)
+    src: List[int] = []
+    dst: List[int] = []
+    while heap:
+        d, u = heapq.heappop(heap)
+        d = -d
+        if d > len(heap):
+            raise ValueError("degree sequence is not graphical")
+        popped = [heapq.heappop(heap) for _ in range(d)]
+        for dv, v in popped:
+            src.append(u)
+            dst.append(v)
+            if dv + 1 < 0:
+                heapq.heappush(heap, (dv + 1, v))
+    return np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+
+_HH_SWAPS_PER_EDGE = 10
+
+def _configuration_edges(
+    degs: List[int],
+    seed: Optional[int] = 42,
+    *,
+    max_attempts_per_fix: int = 100,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simple graph with exactly the given (graphical) degrees.
+
+    Stubs are paired by one random permutation (vectorised). The few self-loops
+    and multi-edges this creates are removed with degree-preserving swaps against
+    random edges. If a fix keeps failing (very dense sequences), the graph is
+    built with Havel–Hakimi instead and randomised with _HH_SWAPS_PER_EDGE * m
+    swap attempts; Havel–Hakimi wires the high-degree nodes together first, and
+    fewer swaps leave visible traces of that ordering.
+    """
+    n = len(degs)
+    rng = np.random.default_rng(seed)
+    d = np.asarray(degs, dtype=np.int64)
+    stubs = rng.permutation(np.repeat(np.arange(n, dtype=np.int64), d))
+    a_arr, b_arr = stubs[0::2], stubs[1::2]
+    m = len(a_arr)
+    if m == 0:
+        return a_arr, b_arr
 
-        # use Erdős–Gallai test
-        if nx.is_graphical(degs, method="eg"):
-            return degs
+    keys = _edge_keys(a_arr, b_arr, n)
+    order = np.argsort(keys, kind="stable")
+    dup = np.zeros(m, dtype=bool)
+    dup[order[1:]] = keys[order[1:]] == keys[order[:-1]]
+    bad = np.flatnonzero((a_arr == b_arr) | dup).tolist()
 
-    raise RuntimeError("Failed to synthesize a graphical degree sequence")
+    edges = _EdgeMultiset(a_arr, b_arr, n)
+    a, b = a_arr.tolist(), b_arr.tolist()
+    pool = _Pool(rng)
+    for e in bad:
+        if a[e] != b[e] and edges.count(a[e], b[e]) <= 1:
+            continue  # already fixed by an earlier swap
+        for _ in range(max_attempts_per_fix):
+            f = pool.draw(m)
+            if f != e and _swap(a, b, e, f, bool(pool.draw(2)), edges):
+                break
+        else:
+            a_arr, b_arr = _havel_hakimi_edges(degs)
+            m = len(a_arr)
+            edges = _EdgeMultiset(a_arr, b_arr, n)
+            a, b = a_arr.tolist(), b_arr.tolist()
+            for _ in range(_HH_SWAPS_PER_EDGE * m):
+                e, f = pool.draw(m), pool.draw(m)
+                if e != f:
+                    _swap(a, b, e, f, bool(pool.draw(2)), edges)
+            break
+    return np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
 
 def generate_configuration(
-    n_nodes: int,
-    avg_deg: float,
+    n_nodes: Optional[int] = None,
+    avg_deg: Optional[float] = None,
     *,
     seed: Optional[int] = 42,
-) -> Tuple[Dict, Dict]:
+    deg_seq: Optional[str | List[int]] = None,
+    as_arrays: bool = False,
+) -> Tuple[Dict, Dict] | GraphArrays:
     """
-    Generate a simple configuration-model graph WITHOUT passing a long deg_seq.
-    Generate edges to follow avg_deg.
-    Produces a simple graph (no multiedges/self-loops).
+    Simple configuration-model graph (no multiedges/self-loops).
+
+    Either give `avg_deg` (a graphical sequence near it is synthesised) or an
+    explicit `deg_seq`: a list of ints or any `_load_deg_seq` string format
+    ("3,3,2,2" or "@path/to/file.txt"). The degrees are realised exactly, in
+    O(m log n), without retries.
     """
-    seq = _synthesize_degree_sequence(
-        n_nodes, avg_deg=avg_deg, seed=seed
-    )
+    if deg_seq is not None:
+        seq = _load_deg_seq(deg_seq, n_nodes or 0) if isinstance(deg_seq, str) else [int(x) for x in deg_seq]
+        if n_nodes is not None and n_nodes != len(seq):
+            raise ValueError(f"deg_seq has {len(seq)} entries but n_nodes={n_nodes}")
+        if not _is_graphical(np.asarray(seq)):
+            raise ValueError("deg_seq is not graphical (Erdős–Gallai test failed)")
+    elif n_nodes is not None and avg_deg is not None:
+        seq = _synthesize_degree_sequence(n_nodes, avg_deg=avg_deg, seed=seed)
+    else:
+        raise ValueError("generate_configuration needs n_nodes and avg_deg, or deg_seq")
 
-    # Use Havel–Hakimi simple-graph generator (no multiedges/self-loops)
-    G = nx.random_degree_sequence_graph(seq, seed=seed, tries=100)
-
-    # Build nodes/edges dicts
-    nodes = {f"n{i}": {"x": None, "y": None} for i in G.nodes()}
-    edges: Dict[str, Dict[str, Any]] = {}
-    eid = 0
-    for u, v in G.edges():
-        edges[f"e{eid}"] = {"from": f"n{u}", "to": f"n{v}", "directed": False}
-        eid += 1
-
-    return nodes, edges
-
-def generate_random_geometric(n_nodes: int, radius: float, seed: Optional[int] = 42) -> Tuple[Dict, Dict]:
-    """Random Geometric Graph in unit square; uses generator’s 'pos' if present."""
-    G = nx.random_geometric_graph(n_nodes, radius, seed=seed)
-    # Get positions; fill any missing with random
-    pos = nx.get_node_attributes(G, "pos")
-    if len(pos) < n_nodes:
-        import random as _r
-        _r.seed(seed)
-        for i in range(n_nodes):
-            pos.setdefault(i, (_r.random(), _r.random()))
-    nodes = {f"n{i}": {"x": float(pos[i][0]), "y": float(pos[i][1])} for i in range(n_nodes)}
-    edges = _edges_from_nx(G)
-    return nodes, edges
+    src, dst = _configuration_edges(seq, seed=seed)
+    return _out(GraphArrays(len(seq), src, dst, False), as_arrays)
+
+def generate_random_geometric(
+    n_nodes: int,
+    radius: float,
+    seed: Optional[int] = 42,
+    *,
+    dim: int = 2,
+    as_arrays: bool = False,
+) -> Tuple[Dict, Dict] | GraphArrays:
+    """
+    Random geometric graph in the unit square (dim=2) or cube (dim=3).
+
+    Points are binned into cells of size `radius`, so the neighbour search is
+    O(n) expected; each edge carries its Euclidean `length`.
+    """
+    if dim not in (2, 3):
+        raise ValueError(f"dim must be 2 or 3, got {dim}")
+    rng = np.random.default_rng(seed)
+    coords = rng.random((n_nodes, dim))
+    index = SpatialIndex(coords, cell_size=radius if radius > 0 else None)
+    src, dst, length = index.pairs_within(radius)
+    graph = GraphArrays(n_nodes, src, dst, False, coords, {"length": length})
+    return _out(graph, as_arrays)
 
 # Post processing
-def assign_edge_probs(edges: List[Dict], p_fail: float=0.1) -> Dict:
+def _iter_edge_probs(edge_ids: Iterable[str], p_fail: float = 0.1) -> Iterator[Tuple[str, Dict]]:
+    row = {"0": {"p": float(p_fail)}, "1": {"p": float(1.0 - p_fail)}}
+    for eid in edge_ids:
+        yield eid, row
+
+def assign_edge_probs(edges: Mapping[str, Dict] | Iterable[str] | GraphArrays, p_fail: float=0.1) -> Dict:
     """
     probs.json format example:
     {
@@ -239,15 +561,34 @@ def assign_edge_probs(edges: List[Dict], p_fail: float=0.1) -> Dict:
       }
     }
     """
-    edge_probs = {eid: { "0": {"p": float(p_fail)}, "1": {"p": float(1.0 - p_fail)} } for eid in edges.keys()}
+    if isinstance(edges, GraphArrays):
+        edges = edges.edge_ids()
+    ids = edges.keys() if isinstance(edges, Mapping) else edges
+    edge_probs = {eid: { "0": {"p": float(p_fail)}, "1": {"p": float(1.0 - p_fail)} } for eid in ids}
     return edge_probs
 
 def _dataset_root(base: Path, name: str, version: DatasetVersion) -> Path:
     return base / name / version
 
-def save_dataset(base_dir: Path, name: str, version: DatasetVersion, nodes: List[Dict], edges: List[Dict],
-                 probs: Dict, description: str="", generator: str="", generator_params: Dict|None=None) -> Path:
+def _write_json(path: Path, obj: Mapping[str, Any] | Iterable[Tuple[str, Any]], compact: bool = False) -> Path:
+    """
+    Stream JSON records to `path` (indent=2, or no whitespace if compact), compressing
+    if `path` ends in .gz/.zst; the file is replaced atomically. Drops stale variants.
     """
+    write_json_items(path, obj, indent=None if compact else 2)
+    for other in data_file_variants(path.with_name(json_stem(path) + ".json")):
+        if other != path and other.exists():
+            other.unlink()
+    return path
+
+def save_dataset(base_dir: Path, name: str, version: DatasetVersion, nodes: Mapping | Iterable[Tuple[str, Dict]],
+                 edges: Mapping | Iterable[Tuple[str, Dict]], probs: Mapping | Iterable[Tuple[str, Dict]],
+                 description: str="", generator: str="", generator_params: Dict|None=None,
+                 compress: Optional[str] = None, compact: bool = False) -> Path:
+    """
+    nodes/edges/probs are dicts or iterables of (id, record) pairs,
+    e.g. GraphArrays.iter_nodes() / iter_edges().
+
     Writes:
       <base_dir>/<name>/<version>/
         data/nodes.json
@@ -255,16 +596,30 @@ def save_dataset(base_dir: Path, name: str, version: DatasetVersion, nodes: List
         data/probs.json
         README.md
         metadata.json
+
+    compress: None, "gz" or "zst" -> data files are written as e.g. nodes.json.gz
+    (ndtools.io loaders find them transparently).
+    compact: write data files without indentation (smaller, same content).
+
+    Records are streamed to disk, so iterables are never materialised as a
+    whole; each file appears atomically once complete.
     """
+    if compress is not None and compress not in COMPRESSIONS:
+        raise ValueError(f"compress must be one of {sorted(COMPRESSIONS)} or None, got {compress!r}")
+    suffix = COMPRESSIONS.get(compress, "")
+
     root = _dataset_root(base_dir, name, version)
     data_dir = root / "data"
     data_dir.mkdir(parents=True, exist_ok=True)
 
-    (data_dir / "nodes.json").write_text(json.dumps(nodes, indent=2))
-    (data_dir / "edges.json").write_text(json.dumps(edges, indent=2))
-    (data_dir / "probs.json").write_text(json.dumps(probs, indent=2))
+    files = [
+        _write_json(data_dir / f"nodes.json{suffix}", nodes, compact),
+        _write_json(data_dir / f"edges.json{suffix}", edges, compact),
+        _write_json(data_dir / f"probs.json{suffix}", probs, compact),
+    ]
 
     # README
+    file_list = "\n".join(f"- `data/{p.name}`" for p in files)
     readme = f"""# {name}
 
 Generated dataset ({version}).
@@ -273,9 +628,7 @@ Generated dataset ({version}).
 {description}
 
 ## Files
-- `data/nodes.json`
-- `data/edges.json`
-- `data/probs.json`
+{file_list}
 
 ## Generator
 - type: `{generator}`
@@ -294,50 +647,299 @@ Generated dataset ({version}).
 
     return root
 
-def _load_schema(schema_dir: Path, schema_name: str) -> Dict:
-    with open(schema_dir / f"{schema_name}.json", "r") as f:
-        return json.load(f)
+def validate(dataset_root: Path, schema_dir: Path, *, stream: bool = False, fast: bool = True) -> None:
+    """
+    Validate nodes.json, edges.json, probs.json against repo schemas, plus
+    referential integrity and probability sums (see `ndtools.validation`).
+    With stream=True each file is read record by record (see
+    `ndtools.io.iter_json_items`), so peak memory stays at one record plus the id sets.
+    Raises jsonschema.ValidationError (schema) or ValueError (integrity) if invalid.
+    """
+    data_dir = dataset_root / "data"
+    problems = check_dataset(
+        data_dir, schema_dir, probs_files=[find_data_file(data_dir / "probs.json")], fast=fast, stream=stream,
+    )
+    if problems:
+        raise problems[0][1]
 
-def validate(dataset_root: Path, schema_dir: Path) -> None:
+def update_registry(registry_path: Path, name: str, version: DatasetVersion, rel_path: str, meta: Dict) -> None:
     """
-    Validate nodes.json, edges.json, probs.json against repo schemas.
-    Raises jsonschema.ValidationError if invalid.
+    Append/merge entry into registry.json.
     """
-    if jsonschema is None:
-        raise RuntimeError("jsonschema is not installed. `pip install jsonschema`")
+    update_registry_many(registry_path, [(name, version, rel_path, meta)])
 
-    nodes = json.loads((dataset_root / "data" / "nodes.json").read_text())
-    edges = json.loads((dataset_root / "data" / "edges.json").read_text())
-    probs = json.loads((dataset_root / "data" / "probs.json").read_text())
+def update_registry_many(
+    registry_path: Path,
+    entries: Iterable[Tuple[str, DatasetVersion, str, Dict]],
+) -> None:
+    """
+    Insert or replace several (name, version, rel_path, meta) entries in
+    registry.json in one locked, atomic update (see `ndtools.registry`).
+    """
+    upsert_entries(registry_path, (
+        {"name": name, "version": version, "path": rel_path, "metadata": meta}
+        for name, version, rel_path, meta in entries
+    ))
 
-    node_schema = _load_schema(schema_dir, "nodes.schema")
-    edge_schema = _load_schema(schema_dir, "edges.schema")
-    probs_schema = _load_schema(schema_dir, "probs.schema")
+def _registry_meta(config: GenConfig, params: Dict) -> Dict:
+    return {
+        "description": config.description,
+        "generator": {"type": config.generator, "params": params}
+    }
 
-    jsonschema.validate(nodes, node_schema)
-    jsonschema.validate(edges, edge_schema)
-    jsonschema.validate(probs, probs_schema)
+def _generate(generator: str, params: Dict, seed: Optional[int]) -> GraphArrays:
+    """Dispatch a generator name + params to the matching generator (array form)."""
+    g = generator.lower()
 
-def update_registry(registry_path: Path, name: str, version: DatasetVersion, rel_path: str, meta: Dict) -> None:
+    if g in ("grid", "lattice"):
+        gen_params = {k: v for k, v in params.items() if k in ["rows", "cols"]}
+        return generate_grid(**gen_params, as_arrays=True)
+    elif g in ("erdos_renyi", "er"):
+        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "p", "directed"]}
+        return generate_erdos_renyi(**gen_params, seed=seed, as_arrays=True)
+    elif g in ("watts_strogatz", "ws"):
+        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "k", "p_ws"]}
+        # rename p_ws -> p_rewire for function
+        gen_params = {
+            "n_nodes": gen_params["n_nodes"],
+            "k": gen_params["k"],
+            "p_rewire": gen_params["p_ws"],
+        }
+        return generate_watts_strogatz(**gen_params, seed=seed, as_arrays=True)
+    elif g in ("barabasi_albert", "ba"):
+        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "m"]}
+        return generate_barabasi_albert(**gen_params, seed=seed, as_arrays=True)
+    elif g in ("configuration", "config"):
+        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "avg_deg", "deg_seq"]}
+        return generate_configuration(**gen_params, seed=seed, as_arrays=True)
+    elif g in ("random_geometric", "rg"):
+        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "radius", "dim"]}
+        return generate_random_geometric(**gen_params, seed=seed, as_arrays=True)
+    else:
+        raise ValueError(f"Unknown generator: {generator}")
+
+def _peak_rss_mb() -> Optional[float]:
+    """Process high-water resident set size in MiB (None where `resource` is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+class StageTimer:
     """
-    Append/merge entry into registry.json.
+    Wall-clock time, CPU time and memory growth per pipeline stage.
+
+    `rss_peak_growth_mb` is how far the stage raised the process high-water
+    RSS (0 if it stayed below an earlier stage's peak); the high-water mark
+    itself never falls, so it cannot be attributed to a later stage. With
+    trace_memory=True, `peak_alloc_mb` is the peak of Python allocations made
+    during the stage (tracemalloc; accurate per stage but slows allocation-heavy code).
     """
-    if registry_path.exists():
-        reg = json.loads(registry_path.read_text())
-    else:
-        reg = {"datasets": []}
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: List[Dict[str, Any]] = []
+        self._tracing = False
 
-    # overwrite if same name+version exists
-    reg["datasets"] = [
-        d for d in reg["datasets"] if not (d.get("name")==name and d.get("version")==version)
-    ]
-    reg["datasets"].append({
-        "name": name,
-        "version": version,
-        "path": rel_path,
-        "metadata": meta,
-    })
-    registry_path.write_text(json.dumps(reg, indent=2))
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            tracemalloc.reset_peak()
+        rss0 = _peak_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            rss1 = _peak_rss_mb()
+            rec = {
+                "stage": name,
+                "wall_s": round(time.perf_counter() - wall, 6),
+                "cpu_s": round(time.process_time() - cpu, 6),
+                "rss_peak_growth_mb": None if rss1 is None else round(rss1 - rss0, 3),
+            }
+            if self.trace_memory:
+                rec["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 3)
+            self.stages.append(rec)
+
+    def stop(self) -> None:
+        """Stop tracemalloc if this timer started it."""
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "stages": self.stages,
+            "total_wall_s": round(sum(r["wall_s"] for r in self.stages), 6),
+            "total_cpu_s": round(sum(r["cpu_s"] for r in self.stages), 6),
+        }
+
+def format_timings(report: Mapping[str, Any]) -> str:
+    """Plain-text table of a StageTimer report (as stored under metadata.json "timings")."""
+    lines = [f"{'stage':<12} {'wall [s]':>10} {'cpu [s]':>10} {'peak RSS +[MiB]':>16}"]
+    for r in report.get("stages", []):
+        rss = "-" if r.get("rss_peak_growth_mb") is None else f"{r['rss_peak_growth_mb']:.1f}"
+        lines.append(f"{r['stage']:<12} {r['wall_s']:>10.3f} {r['cpu_s']:>10.3f} {rss:>16}")
+    lines.append(f"{'total':<12} {report.get('total_wall_s', 0):>10.3f} {report.get('total_cpu_s', 0):>10.3f}")
+    return "\n".join(lines)
+
+def config_hash(config: GenConfig, *, compress: Optional[str] = None, compact: bool = False) -> str:
+    """
+    sha256 of the canonical JSON of everything that determines a generated
+    dataset: the GenConfig, its generator params, the seed, the output
+    format (compression, compact) and the ndtools version. A "@file" deg_seq
+    is hashed by the file's content, so editing the file invalidates the hash.
+    """
+    params = {k: v for k, v in (config.generator_params or {}).items() if k != "seed"}
+    deg_seq = params.get("deg_seq")
+    if isinstance(deg_seq, str) and deg_seq.startswith("@") and Path(deg_seq[1:]).is_file():
+        params["deg_seq"] = {"file": deg_seq[1:], "sha256": sha256_file(Path(deg_seq[1:]))}
+    payload = {
+        "config": {
+            "name": config.name,
+            "version": config.version,
+            "description": config.description,
+            "generator": config.generator,
+        },
+        "params": params,
+        "seed": config.seed,
+        "compress": compress,
+        "compact": compact,
+        "ndtools": __version__,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def _data_files(ds_root: Path) -> List[Path]:
+    data_dir = ds_root / "data"
+    return [find_data_file(data_dir / f"{stem}.json") for stem in ("nodes", "edges", "probs")]
+
+def _update_metadata(ds_root: Path, **fields: Any) -> None:
+    meta_path = ds_root / "metadata.json"
+    meta = json.loads(meta_path.read_text())
+    meta.update(fields)
+    meta_path.write_text(json.dumps(meta, indent=2))
+
+def _stamp_metadata(ds_root: Path, digest: str, **extra: Any) -> None:
+    """Record the config hash, ndtools version and data file checksums (plus `extra` fields) in metadata.json."""
+    files = {p.relative_to(ds_root).as_posix(): sha256_file(p) for p in _data_files(ds_root)}
+    _update_metadata(ds_root, config_hash=digest, ndtools_version=__version__, files=files, **extra)
+
+def is_up_to_date(ds_root: Path, digest: str) -> bool:
+    """True if ds_root was generated from a config with this hash and its data files are unchanged."""
+    try:
+        meta = json.loads((ds_root / "metadata.json").read_text())
+        if meta.get("config_hash") != digest:
+            return False
+        recorded = meta.get("files") or {}
+        files = _data_files(ds_root)
+    except (OSError, ValueError):
+        return False
+    if {p.relative_to(ds_root).as_posix() for p in files} != set(recorded):
+        return False
+    return all(sha256_file(p) == recorded[p.relative_to(ds_root).as_posix()] for p in files)
+
+def _recorded_params(config: GenConfig) -> Dict:
+    """Generator params as written to metadata (with the seed for seeded generators)."""
+    params = dict(config.generator_params or {})
+    if config.generator.lower() not in ("grid", "lattice"):
+        params["seed"] = config.seed
+    return params
+
+def _draw(
+    ds_root: Path, config: GenConfig, graph_layout: str, graph_name: str, graph_kwargs: Optional[Dict],
+) -> Optional[Path]:
+    from ndtools.graphs import draw_graph_from_data
+
+    try:
+        return draw_graph_from_data(
+            ds_root / "data",
+            layout=graph_layout,
+            title=f"{config.name} ({config.generator})",
+            output_name=graph_name,
+            **(graph_kwargs or {})
+        )
+    except Exception as e:
+        # don't fail generation just because plotting failed
+        print(f"[warn] Failed to draw graph: {e}")
+        return None
+
+# Drawing outside the generation path
+DrawMode = Literal["sync", "background", "deferred"]
+DRAW_MAX_EDGES = 20_000  # larger graphs are not drawn unless draw_max_edges is raised/None
+DRAW_MAX_WORKERS = 2  # each worker imports matplotlib and holds a full figure
+
+_draw_pool: Optional[ProcessPoolExecutor] = None
+_draw_futures: Dict[Path, Future] = {}
+_draw_queue: List[Tuple[Path, GenConfig, str, str, Optional[Dict]]] = []
+
+def _draw_executor() -> ProcessPoolExecutor:
+    # matplotlib is not thread-safe, so figures are rendered in worker processes
+    global _draw_pool
+    if _draw_pool is None:
+        _draw_pool = ProcessPoolExecutor(max_workers=min(DRAW_MAX_WORKERS, os.cpu_count() or 1))
+    return _draw_pool
+
+@atexit.register
+def _shutdown_draw_pool() -> None:
+    global _draw_pool
+    if _draw_pool is not None:
+        _draw_pool.shutdown(wait=True)
+        _draw_pool = None
+
+def _submit_draw(job: Tuple[Path, GenConfig, str, str, Optional[Dict]]) -> Future:
+    fut = _draw_executor().submit(_draw, *job)
+    _draw_futures[job[0].resolve()] = fut
+    return fut
+
+def draw_future(ds_root: Path) -> Optional[Future]:
+    """
+    Handle of the background drawing for ds_root (None if none is pending);
+    its result is the image path, or None if drawing failed.
+    """
+    return _draw_futures.get(Path(ds_root).resolve())
+
+def render_deferred_drawings() -> List[Future]:
+    """Submit every drawing queued with draw_mode="deferred" to the background workers."""
+    futures = [_submit_draw(job) for job in _draw_queue]
+    _draw_queue.clear()
+    return futures
+
+def wait_drawings(timeout: Optional[float] = None) -> Dict[Path, Optional[Path]]:
+    """
+    Render queued (deferred) drawings and wait for all background drawings.
+    Returns {dataset root: image path or None}; finished handles are dropped
+    and the worker processes are shut down (the next drawing starts new ones).
+    """
+    render_deferred_drawings()
+    done = {root: fut.result(timeout=timeout) for root, fut in list(_draw_futures.items())}
+    for root in done:
+        _draw_futures.pop(root, None)
+    if not _draw_futures:
+        _shutdown_draw_pool()
+    return done
+
+def _dispatch_draw(
+    ds_root: Path, config: GenConfig, graph_layout: str, graph_name: str, graph_kwargs: Optional[Dict],
+    *, mode: DrawMode, n_edges: Optional[int], max_edges: Optional[int],
+) -> None:
+    if max_edges is not None and n_edges is not None and n_edges > max_edges:
+        print(f"[info] Not drawing {config.name}: {n_edges} edges > draw_max_edges={max_edges}")
+        return
+    job = (ds_root, config, graph_layout, graph_name, graph_kwargs)
+    if mode == "sync":
+        _draw(*job)
+    elif mode == "background":
+        _submit_draw(job)
+    elif mode == "deferred":
+        _draw_queue.append(job)
+    else:
+        raise ValueError(f"draw_mode must be 'sync', 'background' or 'deferred', got {mode!r}")
 
 def generate_and_save(
     out_base: Path,
@@ -349,85 +951,225 @@ def generate_and_save(
     graph_layout: str = "spring",
     graph_name: str = "graph.png",
     graph_kwargs: Optional[Dict] = None,
+    compress: Optional[str] = None,
+    compact: bool = False,
+    force: bool = False,
+    trace_memory: bool = False,
+    draw_mode: DrawMode = "sync",
+    draw_max_edges: Optional[int] = DRAW_MAX_EDGES,
 ) -> Path:
     """
     High-level: generate -> save -> validate -> registry update.
     Returns dataset root path.
+
+    If metadata.json already records the same `config_hash` and the data files
+    still match their recorded checksums, generation, saving and validation are
+    skipped (a missing graph image is still drawn). force=True always regenerates.
+
+    Wall/CPU time and memory growth of each stage (generate, save, validate, draw,
+    registry) are written to metadata.json under "timings"; see StageTimer. With
+    a background or deferred draw_mode the stage is "draw_submit" and covers
+    only handing the job over.
+    Probabilities are produced lazily while saving, so they count towards "save".
+
+    draw_mode: "sync" draws before returning; "background" renders in a worker
+    process (see draw_future / wait_drawings); "deferred" queues the figure for
+    a later batch render (render_deferred_drawings / wait_drawings). Graphs with
+    more than draw_max_edges edges are not drawn (None: no limit).
     """
-    params = config.generator_params or {}
-    g = config.generator.lower()
+    params = _recorded_params(config)
+    digest = config_hash(config, compress=compress, compact=compact)
+    ds_root = _dataset_root(out_base, config.name, config.version)
 
-    if g in ("grid", "lattice"):
-        gen_params = {k: v for k, v in params.items() if k in ["rows", "cols"]}
-        nodes, edges = generate_grid(**gen_params)
-    elif g in ("erdos_renyi", "er"):
-        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "p"]}
-        nodes, edges = generate_erdos_renyi(**gen_params, seed=config.seed)
-    elif g in ("watts_strogatz", "ws"):
-        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "k", "p_ws"]}
-        # rename p_ws -> p_rewire for function
-        gen_params = {
-            "n_nodes": gen_params["n_nodes"],
-            "k": gen_params["k"],
-            "p_rewire": gen_params["p_ws"],
-        }
-        nodes, edges = generate_watts_strogatz(**gen_params, seed=config.seed)
+    if not force and is_up_to_date(ds_root, digest):
+        if draw_graph and not (ds_root / "data" / graph_name).exists():
+            n_edges = load_json(ds_root / "metadata.json").get("n_edges")
+            _dispatch_draw(ds_root, config, graph_layout, graph_name, graph_kwargs,
+                           mode=draw_mode, n_edges=n_edges, max_edges=draw_max_edges)
+        if update_registry_flag:
+            _register(ds_root, config, params)
+        return ds_root
 
-    elif g in ("barabasi_albert", "ba"):
-        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "m"]}
-        nodes, edges = generate_barabasi_albert(**gen_params, seed=config.seed)
+    timer = StageTimer(trace_memory)
+    try:
+        with timer.stage("generate"):
+            graph = _generate(config.generator, params, config.seed)
 
-    elif g in ("configuration", "config"):
-        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "avg_deg"]}
-        nodes, edges = generate_configuration(**gen_params, seed=config.seed)
+        probs = _iter_edge_probs(graph.edge_ids(), p_fail=float(params.get("p_fail", 0.1)))
 
-    elif g in ("random_geometric", "rg"):
-        gen_params = {k: v for k, v in params.items() if k in ["n_nodes", "radius"]}
-        nodes, edges = generate_random_geometric(**gen_params, seed=config.seed)
+        with timer.stage("save"):
+            # conversion to the JSON dict form happens while writing
+            ds_root = save_dataset(
+                out_base, config.name, config.version,
+                graph.iter_nodes(), graph.iter_edges(), probs,
+                description=config.description,
+                generator=config.generator,
+                generator_params=params,
+                compress=compress,
+                compact=compact,
+            )
+        n_nodes, n_edges = graph.n_nodes, graph.n_edges
+        del graph, probs
 
-    else:
-        raise ValueError(f"Unknown generator: {config.generator}")
+        with timer.stage("validate"):
+            validate(ds_root, schema_dir, stream=True)
+            # stamped only after validation, so a failed run is never considered up to date
+            _stamp_metadata(ds_root, digest, n_nodes=n_nodes, n_edges=n_edges)
 
-    if g not in ("grid","lattice"):
-        params["seed"] = config.seed  # include seed in params for metadata
+        if draw_graph:
+            # background/deferred modes only hand the job over; rendering is not timed
+            with timer.stage("draw" if draw_mode == "sync" else "draw_submit"):
+                _dispatch_draw(ds_root, config, graph_layout, graph_name, graph_kwargs,
+                               mode=draw_mode, n_edges=n_edges, max_edges=draw_max_edges)
 
-    probs = assign_edge_probs(edges, p_fail=float(params.get("p_fail", 0.1)))
+        if update_registry_flag:
+            with timer.stage("registry"):
+                _register(ds_root, config, params)
+    finally:
+        timer.stop()
 
-    ds_root = save_dataset(
-        out_base, config.name, config.version,
-        nodes, edges, probs,
-        description=config.description,
-        generator=config.generator,
-        generator_params=params,
-    )
+    _update_metadata(ds_root, timings=timer.report())
+    return ds_root
 
-    validate(ds_root, schema_dir)
+def _register(ds_root: Path, config: GenConfig, params: Dict) -> None:
+    # Update registry.json at repo root
+    repo_root = Path(__file__).resolve().parents[1]
+    registry_path = repo_root / "registry.json"
+    rel = str(ds_root.relative_to(repo_root))
+    update_registry(registry_path, config.name, config.version, rel, _registry_meta(config, params))
 
-    if draw_graph:
-        data_dir = ds_root / "data"
-        try:
-            draw_graph_from_data(
-                data_dir,
-                layout=graph_layout,
-                title=f"{config.name} ({config.generator})",
-                output_name=graph_name,
-                **(graph_kwargs or {})
-            )
-        except Exception as e:
-            # don't fail generation just because plotting failed
-            print(f"[warn] Failed to draw graph: {e}")
+# Ensembles
+def expand_grid(grid: Mapping[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """
+    Cartesian product of a parameter grid, e.g.
+    {"n_nodes": [100, 200], "p": [0.01, 0.05]} -> 4 dicts (last key varies fastest).
+    """
+    keys = list(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(list(grid[k]) for k in keys))]
+
+def _member_name(base: str, combo: Mapping[str, Any], replicate: int) -> str:
+    parts = [base] + [f"{k}-{v}" for k, v in combo.items()] + [f"r{replicate}"]
+    return re.sub(r"[^A-Za-z0-9_.=-]+", "_", "_".join(parts))
+
+def ensemble_configs(
+    base: GenConfig,
+    grid: Optional[Mapping[str, Iterable[Any]]] = None,
+    replicates: int = 1,
+    *,
+    seed: Optional[int] = None,
+) -> List[GenConfig]:
+    """
+    One GenConfig per (grid point, replicate).
+
+    Member seeds are spawned from one SeedSequence rooted at `seed` (default
+    `base.seed`), so the streams are statistically independent and the whole
+    ensemble is reproducible from a single number.
+    """
+    if replicates < 1:
+        raise ValueError(f"replicates must be >= 1, got {replicates}")
+    combos = expand_grid(grid or {})
+    root = np.random.SeedSequence(base.seed if seed is None else seed)
+    children = iter(root.spawn(len(combos) * replicates))
+    configs = []
+    for combo in combos:
+        for r in range(replicates):
+            member_seed = int(next(children).generate_state(1, np.uint32)[0])
+            configs.append(GenConfig(
+                name=_member_name(base.name, combo, r),
+                version=base.version,
+                seed=member_seed,
+                description=base.description,
+                generator=base.generator,
+                generator_params={**(base.generator_params or {}), **combo},
+            ))
+    return configs
+
+def _ensemble_member(out_base: Path, schema_dir: Path, config: GenConfig, kwargs: Dict) -> Tuple[GenConfig, Path]:
+    ds_root = generate_and_save(out_base, schema_dir, config, update_registry_flag=False, **kwargs)
+    return config, ds_root
+
+def generate_ensemble(
+    out_base: Path,
+    schema_dir: Path,
+    base: GenConfig,
+    grid: Optional[Mapping[str, Iterable[Any]]] = None,
+    replicates: int = 1,
+    *,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    update_registry_flag: bool = False,
+    registry_path: Optional[Path] = None,
+    **kwargs: Any,
+) -> List[Path]:
+    """
+    Generate -> save -> validate every member of `ensemble_configs(base, grid, replicates)`
+    in a process pool (max_workers=1 runs in-process), then update the registry
+    once with all members. Extra keyword arguments go to `generate_and_save`.
+    Returns dataset roots in member order.
+
+    With draw_mode "background"/"deferred" the members are drawn from this
+    process once generation is done, so wait_drawings() here covers them all.
+    """
+    configs = ensemble_configs(base, grid, replicates, seed=seed)
+    draw_later = kwargs.get("draw_graph", True) and kwargs.get("draw_mode", "sync") != "sync"
+    if draw_later:
+        kwargs = {**kwargs, "draw_graph": False}
+    if max_workers == 1:
+        results = [_ensemble_member(out_base, schema_dir, c, kwargs) for c in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_ensemble_member, out_base, schema_dir, c, kwargs) for c in configs]
+            results = [f.result() for f in futures]
 
     if update_registry_flag:
-        # Update registry.json at repo root
         repo_root = Path(__file__).resolve().parents[1]
-        registry_path = repo_root / "registry.json"
-        rel = str(ds_root.relative_to(repo_root))
-        meta = {
-            "description": config.description,
-            "generator": {"type": config.generator, "params": params}
-        }
-        update_registry(registry_path, config.name, config.version, rel, meta)
-    return ds_root
+        registry_path = registry_path or repo_root / "registry.json"
+        base_dir = registry_path.resolve().parent
+        entries = []
+        for config, ds_root in results:
+            try:
+                rel = str(ds_root.resolve().relative_to(base_dir))
+            except ValueError:
+                rel = str(ds_root)
+            entries.append((config.name, config.version, rel, _registry_meta(config, _recorded_params(config))))
+        update_registry_many(registry_path, entries)
+
+    if draw_later:
+        for config, ds_root in results:
+            _dispatch_draw(
+                ds_root, config,
+                kwargs.get("graph_layout", "spring"), kwargs.get("graph_name", "graph.png"),
+                kwargs.get("graph_kwargs"),
+                mode=kwargs["draw_mode"],
+                n_edges=load_json(ds_root / "metadata.json").get("n_edges"),
+                max_edges=kwargs.get("draw_max_edges", DRAW_MAX_EDGES),
+            )
+    return [ds_root for _, ds_root in results]
+
+def _parse_grid(specs: Optional[List[str]]) -> Dict[str, List[Any]]:
+    """["n_nodes=100,200", "p=0.1"] -> {"n_nodes": [100, 200], "p": [0.1]}"""
+    grid: Dict[str, List[Any]] = {}
+    for spec in specs or []:
+        key, sep, values = spec.partition("=")
+        if not sep or not key.strip():
+            raise SystemExit(f"--grid expects key=v1,v2,..., got {spec!r}")
+        parsed = []
+        for v in values.split(","):
+            v = v.strip()
+            try:
+                parsed.append(json.loads(v))
+            except ValueError:
+                parsed.append(v)
+        grid[key.strip()] = parsed
+    return grid
+
+def _print_timings(ds_root: Path, header: Optional[str] = None) -> None:
+    # members that were up to date were not regenerated and keep their earlier timings
+    timings = load_json(ds_root / "metadata.json").get("timings")
+    if timings:
+        if header:
+            print(f"\n{header}")
+        print(format_timings(timings))
 
 def run(argv: Optional[list[str]] = None):
     """Entry point for both CLI and programmatic calls (e.g. in Jupyter)."""
@@ -450,6 +1192,7 @@ def run(argv: Optional[list[str]] = None):
     parser.add_argument("--n_nodes", type=int)
     parser.add_argument("--p", type=float)
     parser.add_argument("--p_fail", type=float, default=0.1)
+    parser.add_argument("--directed", action="store_true", help="directed edges (erdos_renyi only)")
     parser.add_argument("--seed", type=int, default=42)
     parser.add_argument("--description", default="")
     parser.add_argument("--outbase", default="generated")
@@ -458,19 +1201,41 @@ def run(argv: Optional[list[str]] = None):
     parser.add_argument("--p_ws", type=float)
     parser.add_argument("--m", type=int)
     parser.add_argument("--avg_deg", type=float)
+    parser.add_argument("--deg_seq", help='configuration degree sequence: "3,3,2,2" or "@file.txt"')
     parser.add_argument("--radius", type=float)
+    parser.add_argument("--dim", type=int, default=2, choices=[2, 3], help="rg: 2-D square or 3-D cube")
+    parser.add_argument("--compress", choices=sorted(COMPRESSIONS), default=None,
+                        help="write data files as .json.gz / .json.zst")
+    parser.add_argument("--compact", action="store_true", help="write data files without indentation")
+    parser.add_argument("--draw_mode", choices=["sync", "background", "deferred"], default="sync",
+                        help="draw before returning, in a worker process, or in one batch at the end")
+    parser.add_argument("--draw_max_edges", type=int, default=DRAW_MAX_EDGES,
+                        help="do not draw graphs with more edges than this")
+    parser.add_argument("--timings", action="store_true", help="print per-stage time and memory")
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate even if metadata.json shows an identical config")
+    parser.add_argument("--grid", action="append", metavar="KEY=V1,V2,...",
+                        help="ensemble: parameter values to sweep (repeatable)")
+    parser.add_argument("--replicates", type=int, default=1, help="ensemble: members per grid point")
+    parser.add_argument("--workers", type=int, default=None, help="ensemble: worker processes")
 
     args = parser.parse_args(argv)
 
-    # --- rest of your logic unchanged ---
+    grid = _parse_grid(args.grid)
+
+    def missing(*keys):
+        return any(params.get(k) is None and k not in grid for k in keys)
+
     g = args.type.lower()
     if g in ("grid", "lattice"):
         params = {"rows": args.rows, "cols": args.cols, "p_fail": args.p_fail}
-        if params["rows"] is None or params["cols"] is None:
+        if missing("rows", "cols"):
             raise SystemExit("--rows and --cols required for grid")
     elif g in ("erdos_renyi", "er"):
         params = {"n_nodes": args.n_nodes, "p": args.p, "p_fail": args.p_fail}
-        if params["n_nodes"] is None or params["p"] is None:
+        if args.directed:
+            params["directed"] = True
+        if missing("n_nodes", "p"):
             raise SystemExit("--n_nodes and --p required for erdos_renyi")
     elif g in ("watts_strogatz", "ws"):
         params = {"n_nodes": args.n_nodes, "k": args.k, "p_ws": args.p_ws, "p_fail": args.p_fail}
@@ -478,8 +1243,10 @@ def run(argv: Optional[list[str]] = None):
         params = {"n_nodes": args.n_nodes, "m": args.m, "p_fail": args.p_fail}
     elif g in ("configuration", "config"):
         params = {"n_nodes": args.n_nodes, "avg_deg": args.avg_deg, "p_fail": args.p_fail}
+        if args.deg_seq is not None:
+            params["deg_seq"] = args.deg_seq
     elif g in ("random_geometric", "rg"):
-        params = {"n_nodes": args.n_nodes, "radius": args.radius, "p_fail": args.p_fail}
+        params = {"n_nodes": args.n_nodes, "radius": args.radius, "dim": args.dim, "p_fail": args.p_fail}
     else:
         raise SystemExit(f"Unknown --type {args.type}")
 
@@ -497,8 +1264,29 @@ def run(argv: Optional[list[str]] = None):
     out_base = (script_root / args.outbase)
     schema_dir = repo_root / "schema"
 
-    ds_root = generate_and_save(out_base, schema_dir, cfg, draw_graph=args.draw_graph)
+    if grid or args.replicates > 1:
+        roots = generate_ensemble(
+            out_base, schema_dir, cfg, grid, args.replicates,
+            max_workers=args.workers, draw_graph=args.draw_graph, compress=args.compress,
+            compact=args.compact, force=args.force,
+            draw_mode=args.draw_mode, draw_max_edges=args.draw_max_edges,
+        )
+        wait_drawings()
+        print(f"Wrote {len(roots)} datasets to: {out_base}")
+        if args.timings:
+            for root in roots:
+                _print_timings(root, header=root.parent.name)
+        return
+
+    ds_root = generate_and_save(
+        out_base, schema_dir, cfg, draw_graph=args.draw_graph, compress=args.compress,
+        compact=args.compact, force=args.force,
+        draw_mode=args.draw_mode, draw_max_edges=args.draw_max_edges,
+    )
     print(f"Wrote dataset to: {ds_root}")
+    if args.timings:
+        _print_timings(ds_root)
+    wait_drawings()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+# ndtools/registry.py
+"""
+registry.json access that is safe under concurrent writers.
+
+Updates hold an exclusive lock on a sibling `registry.json.lock` file, read the
+current registry, apply all changes in memory (indexed by (name, version)) and
+write the result to a temporary file that atomically replaces registry.json.
+Both registry layouts are kept as found: a bare list of entries (the repo's
+registry.json) or {"datasets": [...]}.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Key = Tuple[str, str]
+
+class Registry:
+    """In-memory registry: entries in file order plus an index by (name, version)."""
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None, *, wrapped: bool = False):
+        self.entries: List[Dict[str, Any]] = list(entries or [])
+        self.wrapped = wrapped  # True -> written as {"datasets": [...]}
+        self._index: Dict[Key, int] = {}
+        self._reindex()
+
+    @staticmethod
+    def key(entry: Dict[str, Any]) -> Key:
+        return str(entry.get("name")), str(entry.get("version"))
+
+    def _reindex(self) -> None:
+        self._index = {self.key(e): i for i, e in enumerate(self.entries)}
+
+    @classmethod
+    def from_json(cls, data: Any) -> "Registry":
+        if isinstance(data, list):
+            return cls(data)
+        if isinstance(data, dict) and isinstance(data.get("datasets", []), list):
+            return cls(data.get("datasets", []), wrapped=True)
+        raise ValueError("registry must be a list of entries or {'datasets': [...]}")
+
+    @classmethod
+    def load(cls, path: Path) -> "Registry":
+        """Read registry.json (a missing file gives an empty list-style registry)."""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        return cls.from_json(json.loads(path.read_text(encoding="utf-8")))
+
+    def to_json(self) -> Any:
+        return {"datasets": self.entries} if self.wrapped else self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._index
+
+    def get(self, name: str, version: str) -> Optional[Dict[str, Any]]:
+        i = self._index.get((name, version))
+        return None if i is None else self.entries[i]
+
+    def upsert(self, entry: Dict[str, Any]) -> None:
+        """Replace the entry with the same (name, version) in place, or append it."""
+        k = self.key(entry)
+        i = self._index.get(k)
+        if i is None:
+            self._index[k] = len(self.entries)
+            self.entries.append(entry)
+        else:
+            self.entries[i] = entry
+
+    def upsert_many(self, entries: Iterable[Dict[str, Any]]) -> None:
+        for entry in entries:
+            self.upsert(entry)
+
+    def remove(self, name: str, version: str) -> bool:
+        i = self._index.get((name, version))
+        if i is None:
+            return False
+        del self.entries[i]
+        self._reindex()
+        return True
+
+    def save(self, path: Path) -> None:
+        """Write atomically: temp file in the same directory, then os.replace."""
+        path = Path(path)
+        tmp = path.with_name(f".tmp{os.getpid()}.{path.name}")
+        try:
+            tmp.write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+def _lock_file(f) -> bool:
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _unlock_file(f) -> None:
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def file_lock(path: Path, timeout: float = 30.0, poll: float = 0.02) -> Iterator[None]:
+    """Exclusive advisory lock on `path` (created if needed). Raises TimeoutError."""
+    path = Path(path)
+    deadline = time.monotonic() + timeout
+    with open(path, "a+b") as f:
+        while not _lock_file(f):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"could not lock {path} within {timeout} s")
+            time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
+@contextmanager
+def locked(registry_path: Path, timeout: float = 30.0) -> Iterator[Registry]:
+    """
+    Lock registry.json, yield it as a Registry, and write it back atomically
+    on normal exit. Other writers using `locked` wait for the lock.
+    """
+    registry_path = Path(registry_path)
+    with file_lock(registry_path.with_name(registry_path.name + ".lock"), timeout=timeout):
+        reg = Registry.load(registry_path)
+        yield reg
+        reg.save(registry_path)
+
+def upsert_entries(registry_path: Path, entries: Iterable[Dict[str, Any]], *, timeout: float = 30.0) -> None:
+    """Insert or replace entries (matched by name and version) in one locked, atomic update."""
+    with locked(registry_path, timeout=timeout) as reg:
+        reg.upsert_many(entries)
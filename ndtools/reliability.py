@@ -0,0 +1,220 @@
+# ndtools/reliability.py
+"""
+Monte Carlo estimation of the system failure probability.
+
+Component states are drawn chunk by chunk with `ndtools.sampling.StateSampler`
+(chunk i from its own (seed, i) generator) and evaluated with any system
+function of the ndtools form
+
+    sys_fun(comps_state, G_base, **fun_kwargs) -> (value, sys_state, info)
+
+Chunks are evaluated on a process pool. The parent loads the dataset once and
+publishes its compiled arrays as a `ndtools.shared.SharedDataset`; each worker
+attaches and builds its graph and sampler from those views, without parsing
+JSON. If compiling would lose attributes of the graph `sys_fun` sees (e.g.
+mixed-type attributes), the workers load the dataset themselves instead.
+Results are aggregated strictly in chunk order and the
+stopping rule is checked after each chunk, so for a given seed the estimate
+(and the number of samples used) does not depend on the number of workers.
+Only a `time_budget` stop depends on machine speed.
+
+The estimator is the failure fraction pf = n_fail / n, with coefficient of
+variation cov = sqrt((1 - pf) / (n * pf)).
+"""
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+import math
+import os
+from pathlib import Path
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from ndtools.compiled import compile_dataset
+from ndtools.graphs import build_graph_compiled
+from ndtools.io import REPO_ROOT, load_dataset
+from ndtools.sampling import StateSampler
+from ndtools.shared import SharedDataset
+
+def failed_if_state_zero(result: Any) -> bool:
+    """Default failure criterion: system state (2nd element of the result) == 0."""
+    if isinstance(result, tuple):
+        return result[1] == 0
+    return result == 0
+
+def cov_of_pf(n: int, n_fail: int) -> float:
+    """Coefficient of variation of the estimate n_fail / n (inf while no failure has been seen)."""
+    if n == 0 or n_fail == 0:
+        return math.inf
+    pf = n_fail / n
+    return math.sqrt((1.0 - pf) / (n * pf))
+
+@dataclass
+class MCResult:
+    """Outcome of `monte_carlo`; `history` holds (n_samples, pf, cov) after each chunk."""
+    pf: float
+    cov: float
+    n_samples: int
+    n_failures: int
+    n_chunks: int
+    elapsed: float
+    stopped_by: str  # "cov", "max_samples" or "time"
+    history: List[Tuple[int, float, float]] = field(default_factory=list)
+
+class _ChunkEvaluator:
+    """Graph and sampler of one process; evaluates chunks by index."""
+    def __init__(self, graph, sampler, sys_fun, fun_kwargs, failure, seed):
+        self.graph = graph
+        self.sampler = sampler
+        self.sys_fun = sys_fun
+        self.fun_kwargs = dict(fun_kwargs or {})
+        self.failure = failure
+        self.seed = seed
+
+    @classmethod
+    def from_dataset(cls, dataset, version, probs, repo_root, *args) -> "_ChunkEvaluator":
+        ds = _load(dataset, version, probs, repo_root)
+        return cls(ds.graph, StateSampler.from_probs(ds.probs), *args)
+
+    @classmethod
+    def from_shared(cls, shared: SharedDataset, *args) -> "_ChunkEvaluator":
+        return cls(build_graph_compiled(shared.dataset), StateSampler.from_compiled(shared.dataset), *args)
+
+    def run(self, index: int, size: int) -> Tuple[int, int, int]:
+        states = self.sampler.chunk(index, size, self.seed)
+        ids = self.sampler.comp_ids.tolist()
+        n_fail = 0
+        for row in states.tolist():
+            if self.failure(self.sys_fun(dict(zip(ids, row)), self.graph, **self.fun_kwargs)):
+                n_fail += 1
+        return index, size, n_fail
+
+def _load(dataset, version, probs, repo_root):
+    ds = load_dataset(dataset, version, probs, build_graph=True, repo_root=repo_root)
+    if not ds.probs:
+        raise ValueError(f"dataset {dataset!r} has no probs file")
+    return ds
+
+def _publish(ds) -> Optional[SharedDataset]:
+    """Share `ds` with the workers, or None if the compiled form would change their graph."""
+    compiled = compile_dataset(ds.nodes, ds.edges, ds.probs)
+    if not nx.utils.graphs_equal(build_graph_compiled(compiled), ds.graph):
+        return None
+    return SharedDataset.publish(compiled, csr=False)
+
+_worker: Optional[_ChunkEvaluator] = None
+
+def _init_worker(source, *args) -> None:
+    # source: an attached SharedDataset (it pickles by name) or the load_dataset arguments
+    global _worker
+    if isinstance(source, SharedDataset):
+        _worker = _ChunkEvaluator.from_shared(source, *args)
+    else:
+        _worker = _ChunkEvaluator.from_dataset(*source, *args)
+
+def _run_chunk(index: int, size: int) -> Tuple[int, int, int]:
+    return _worker.run(index, size)
+
+def monte_carlo(
+    dataset: str | Path,
+    sys_fun: Callable[..., Any],
+    *,
+    probs: Optional[str] = None,
+    version: str = "v1",
+    fun_kwargs: Optional[Dict[str, Any]] = None,
+    failure: Callable[[Any], bool] = failed_if_state_zero,
+    target_cov: float = 0.05,
+    max_samples: int = 1_000_000,
+    time_budget: Optional[float] = None,
+    chunk_size: int = 1000,
+    seed: int = 0,
+    max_workers: Optional[int] = None,
+    repo_root: Path = REPO_ROOT,
+) -> MCResult:
+    """
+    Estimate P(system failure) for a dataset and one of its probs variants.
+
+    Args:
+      dataset: registry name or path (as for `io.load_dataset`).
+      sys_fun: called as sys_fun(comps_state, G_base, **fun_kwargs); must be
+        picklable (a module-level function) when max_workers != 1.
+      probs: probs variant, e.g. 'bin' or 'mult' (None -> default probs file).
+      failure: maps a sys_fun result to True for a failed sample.
+      target_cov: stop once the estimate's coefficient of variation is at or below this.
+      max_samples: stop after this many samples.
+      time_budget: stop after the first chunk completing past this many seconds.
+      chunk_size: samples per task (and per stopping check).
+      max_workers: processes (default: CPU count); 1 evaluates in this process.
+
+    Example:
+      from ndtools.fun_binary_graph import eval_global_conn_k
+      res = monte_carlo('toynet-11edges', eval_global_conn_k, target_cov=0.02)
+      res.pf, res.cov, res.n_samples
+    """
+    if chunk_size < 1 or max_samples < 1:
+        raise ValueError("chunk_size and max_samples must be positive")
+    t0 = time.perf_counter()
+    n_chunks = -(-int(max_samples) // int(chunk_size))
+    sizes = [min(chunk_size, max_samples - i * chunk_size) for i in range(n_chunks)]
+    source = (dataset, version, probs, repo_root)
+    args = (sys_fun, fun_kwargs, failure, seed)
+
+    n = n_fail = done = 0
+    history: List[Tuple[int, float, float]] = []
+
+    def add(size: int, k: int) -> Optional[str]:
+        nonlocal n, n_fail, done
+        n, n_fail, done = n + size, n_fail + k, done + 1
+        cov = cov_of_pf(n, n_fail)
+        history.append((n, n_fail / n, cov))
+        if cov <= target_cov:
+            return "cov"
+        if done == n_chunks:
+            return "max_samples"
+        if time_budget is not None and time.perf_counter() - t0 >= time_budget:
+            return "time"
+        return None
+
+    stopped_by = None
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1:
+        evaluator = _ChunkEvaluator.from_dataset(*source, *args)
+        for i, size in enumerate(sizes):
+            _, _, k = evaluator.run(i, size)
+            stopped_by = add(size, k)
+            if stopped_by:
+                break
+    else:
+        shared = _publish(_load(*source))
+        pool = None
+        try:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(shared or source, *args))
+            in_flight: Dict[Future, int] = {}
+            finished: Dict[int, Tuple[int, int]] = {}
+            next_submit = 0
+            while stopped_by is None:
+                # keep a bounded window of chunks ahead of the aggregation point
+                while next_submit < n_chunks and len(in_flight) < 2 * workers:
+                    in_flight[pool.submit(_run_chunk, next_submit, sizes[next_submit])] = next_submit
+                    next_submit += 1
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in completed:
+                    del in_flight[fut]
+                    i, size, k = fut.result()
+                    finished[i] = (size, k)
+                # aggregate in chunk order only; later chunks wait in `finished`
+                while done in finished and stopped_by is None:
+                    stopped_by = add(*finished.pop(done))
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if shared is not None:
+                shared.close()
+                shared.unlink()
+
+    pf, cov = history[-1][1], history[-1][2]
+    return MCResult(pf=pf, cov=cov, n_samples=n, n_failures=n_fail, n_chunks=done,
+                    elapsed=time.perf_counter() - t0, stopped_by=stopped_by, history=history)
@@ -0,0 +1,143 @@
+# ndtools/sampling.py
+"""
+Vectorised component-state sampling from probs files.
+
+A probability table ({comp_id: {"<state>": {"p": ...}}}, binary or
+multi-state) is compiled once into a cumulative-probability matrix. Drawing
+N samples is then one uniform (N, n_components) draw and one comparison per
+state column (inverse-CDF sampling); the result is an (N, n_components)
+uint8 matrix of state labels, columns in `comp_ids` order.
+
+Large N can be streamed in fixed-size chunks. Chunk i is drawn from its own
+generator, seeded by (seed, i) through numpy's SeedSequence, so a chunk's
+contents depend only on the seed and its index: chunks can be drawn in any
+order or in different processes and give the same stream.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+
+from ndtools.compiled import CompiledDataset, compile_probs
+from ndtools.io import find_data_file, load_json
+
+PROB_SUM_TOL = 1e-6
+
+def chunk_rng(seed: Optional[int], index: int) -> np.random.Generator:
+    """Generator for chunk `index` of the stream identified by `seed`."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+@dataclass
+class StateSampler:
+    """
+    Compiled sampler: `cdf[i, j]` is P(state <= states[j]) for component
+    `comp_ids[i]` (the last column is 1 by construction).
+    """
+    comp_ids: np.ndarray
+    states: np.ndarray
+    cdf: np.ndarray
+
+    @property
+    def n_components(self) -> int:
+        return len(self.comp_ids)
+
+    @classmethod
+    def from_matrix(
+        cls,
+        comp_ids: Sequence[str] | np.ndarray,
+        states: Sequence[int] | np.ndarray,
+        probs: np.ndarray,
+        *,
+        tol: float = PROB_SUM_TOL,
+    ) -> "StateSampler":
+        """
+        From a dense (n_components, n_states) probability matrix. Rows must be
+        non-negative and sum to 1 (within `tol`); state labels must fit in uint8.
+        """
+        probs = np.asarray(probs, dtype=float)
+        states = np.asarray(states, dtype=np.int64)
+        comp_ids = np.asarray(comp_ids, dtype=str)
+        if probs.shape != (len(comp_ids), len(states)):
+            raise ValueError(f"probs must have shape ({len(comp_ids)}, {len(states)}), got {probs.shape}")
+        if len(states) == 0 or states.min() < 0 or states.max() > 255:
+            raise ValueError("state labels must be integers in [0, 255]")
+        if (probs < 0).any():
+            bad = comp_ids[(probs < 0).any(axis=1)][0]
+            raise ValueError(f"{bad!r}: negative probability")
+        sums = probs.sum(axis=1)
+        off = np.abs(sums - 1.0) > tol
+        if off.any():
+            i = int(np.argmax(off))
+            raise ValueError(f"{comp_ids[i]!r}: probabilities sum to {sums[i]:.9g}, not 1")
+        cdf = np.cumsum(probs, axis=1)
+        cdf[:, -1] = 1.0
+        return cls(comp_ids=comp_ids, states=states, cdf=cdf)
+
+    @classmethod
+    def from_probs(
+        cls,
+        probs: Mapping[str, Mapping[str, Any]],
+        comp_ids: Optional[Sequence[str]] = None,
+    ) -> "StateSampler":
+        """
+        From a parsed probs file. `comp_ids` selects and orders the columns
+        (e.g. `CompiledDataset.edge_ids`); default: file order. KeyError if a
+        requested component has no probabilities.
+        """
+        sampler = cls.from_matrix(*compile_probs(probs))
+        return sampler if comp_ids is None else sampler.select(comp_ids)
+
+    @classmethod
+    def from_compiled(cls, ds: CompiledDataset, comp_ids: Optional[Sequence[str]] = None) -> "StateSampler":
+        """From a CompiledDataset loaded with probabilities (e.g. `io.load_compiled`)."""
+        if ds.probs is None:
+            raise ValueError("dataset was compiled without probabilities")
+        sampler = cls.from_matrix(ds.prob_ids, ds.states, ds.probs)
+        return sampler if comp_ids is None else sampler.select(comp_ids)
+
+    @classmethod
+    def from_file(cls, path: Path, comp_ids: Optional[Sequence[str]] = None) -> "StateSampler":
+        """From a probs*.json file (compressed variants are found as well)."""
+        return cls.from_probs(load_json(find_data_file(Path(path))), comp_ids)
+
+    def select(self, comp_ids: Sequence[str] | np.ndarray) -> "StateSampler":
+        """Sampler over `comp_ids` only, in that order. KeyError for unknown components."""
+        pos = {cid: i for i, cid in enumerate(self.comp_ids.tolist())}
+        missing = [c for c in np.asarray(comp_ids).tolist() if c not in pos]
+        if missing:
+            raise KeyError(f"no probabilities for component(s) {missing[:10]}")
+        order = [pos[c] for c in np.asarray(comp_ids).tolist()]
+        return StateSampler(comp_ids=self.comp_ids[order], states=self.states, cdf=self.cdf[order])
+
+    def draw(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """(n, n_components) uint8 state matrix drawn with `rng`."""
+        u = rng.random((int(n), self.n_components))
+        idx = np.zeros(u.shape, dtype=np.uint8)
+        for j in range(self.cdf.shape[1] - 1):  # index = number of cdf steps at or below u
+            idx += u >= self.cdf[:, j]
+        if np.array_equal(self.states, np.arange(len(self.states))):
+            return idx
+        return self.states.astype(np.uint8)[idx]
+
+    def sample(self, n: int, seed: Optional[int] = None) -> np.ndarray:
+        """(n, n_components) uint8 state matrix, reproducible for a given seed."""
+        return self.draw(n, np.random.default_rng(seed))
+
+    def iter_chunks(self, n: int, chunk_size: int = 100_000, seed: Optional[int] = None
+                    ) -> Iterator[np.ndarray]:
+        """
+        Yield `n` samples as state matrices of at most `chunk_size` rows.
+        Chunk i comes from `chunk_rng(seed, i)`, so `chunk(i, ...)` rebuilds it alone.
+        """
+        for i, start in enumerate(range(0, int(n), int(chunk_size))):
+            yield self.chunk(i, min(int(chunk_size), int(n) - start), seed)
+
+    def chunk(self, index: int, size: int, seed: Optional[int] = None) -> np.ndarray:
+        """Chunk `index` of the stream `iter_chunks(..., seed=seed)` (of `size` rows)."""
+        return self.draw(size, chunk_rng(seed, index))
+
+    def state_dict(self, row: Sequence[int] | np.ndarray) -> Dict[str, int]:
+        """One sample as {comp_id: state}, the comps_state form of the system functions."""
+        return dict(zip(self.comp_ids.tolist(), np.asarray(row).tolist()))
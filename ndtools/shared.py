@@ -0,0 +1,196 @@
+# ndtools/shared.py
+"""
+Zero-copy handoff of a compiled dataset to worker processes.
+
+`SharedDataset.publish` copies the arrays of a CompiledDataset (id tables,
+endpoints, attribute columns such as lengths, probabilities) and its CSR
+adjacency into one `multiprocessing.shared_memory` block, once. Workers call
+`SharedDataset.attach(name)` (or `attached(name)`) and get numpy views on that
+block: N workers cost one copy of the graph instead of N pickled copies.
+`detach(name)` releases a worker's cached mapping.
+
+Block layout: an 8-byte magic, the byte length of a JSON manifest as a
+little-endian uint64, the manifest ({"format", "arrays": {key: {"dtype",
+"shape", "offset"}}}), then the arrays, each 64-byte aligned. For a
+file-backed equivalent use `io.load_compiled(..., mmap=True)`.
+
+On Python < 3.13 an attaching process registers the block with
+multiprocessing's resource tracker. Pool workers share their parent's
+tracker, which is harmless; an unrelated process that attaches would unlink
+the block when it exits, so keep publishing and attaching within one
+process tree there.
+"""
+from __future__ import annotations
+import json
+from multiprocessing import shared_memory
+import struct
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ndtools.compiled import CompiledDataset, csr_adjacency
+
+_MAGIC = b"NDSHM\x00\x00\x01"
+_FORMAT = 1
+_ALIGN = 64
+
+def _arrays(ds: CompiledDataset, csr: bool) -> Dict[str, np.ndarray]:
+    arrs = {"node_ids": ds.node_ids, "edge_ids": ds.edge_ids,
+            "src": ds.src, "dst": ds.dst, "directed": ds.directed}
+    arrs.update({f"node:{k}": v for k, v in ds.node_attrs.items()})
+    arrs.update({f"edge:{k}": v for k, v in ds.edge_attrs.items()})
+    if ds.probs is not None:
+        arrs.update({"prob_ids": ds.prob_ids, "states": ds.states, "probs": ds.probs})
+    if csr:
+        arrs["csr:indptr"], arrs["csr:indices"], arrs["csr:edges"] = csr_adjacency(ds)
+    out = {k: np.ascontiguousarray(v) for k, v in arrs.items()}
+    for k, v in out.items():
+        if v.dtype.hasobject:
+            raise TypeError(f"array {k!r} has dtype object and cannot be shared")
+    return out
+
+def _layout(arrs: Dict[str, np.ndarray]) -> Tuple[bytes, Dict[str, Any], int]:
+    """Manifest bytes, manifest and total block size; offsets leave room for the manifest itself."""
+    meta = {k: {"dtype": v.dtype.str, "shape": list(v.shape), "offset": 0} for k, v in arrs.items()}
+    while True:
+        manifest = {"format": _FORMAT, "arrays": meta}
+        blob = json.dumps(manifest).encode("utf-8")
+        pos = -(-(len(_MAGIC) + 8 + len(blob)) // _ALIGN) * _ALIGN
+        changed = False
+        for k, v in arrs.items():
+            if meta[k]["offset"] != pos:
+                meta[k]["offset"], changed = pos, True
+            pos = -(-(pos + v.nbytes) // _ALIGN) * _ALIGN
+        if not changed:  # offsets are part of the manifest, so iterate until its length is stable
+            return blob, manifest, max(pos, 1)
+
+def _view(shm: shared_memory.SharedMemory, m: Dict[str, Any]) -> np.ndarray:
+    # np.frombuffer holds a buffer export on shm.buf, so closing the block while
+    # views are alive raises BufferError instead of leaving dangling pointers
+    dtype, shape = np.dtype(m["dtype"]), tuple(m["shape"])
+    return np.frombuffer(shm.buf, dtype=dtype, count=int(np.prod(shape)), offset=m["offset"]).reshape(shape)
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+class SharedDataset:
+    """
+    A CompiledDataset and its CSR adjacency living in one shared-memory block.
+
+    `dataset` and `csr` ((indptr, indices, edge_pos), see
+    `compiled.csr_adjacency`, or None) are views on the block, read-only for
+    attached copies. Pickling a SharedDataset sends only its name; the
+    receiving process attaches.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, *, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        head = bytes(shm.buf[:len(_MAGIC) + 8])
+        if head[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"shared memory block {shm.name!r} does not hold an ndtools dataset")
+        (size,) = struct.unpack("<Q", head[len(_MAGIC):])
+        manifest = json.loads(bytes(shm.buf[len(_MAGIC) + 8:len(_MAGIC) + 8 + size]))
+        if manifest.get("format") != _FORMAT:
+            raise ValueError(f"unsupported shared dataset format {manifest.get('format')!r}")
+
+        arrs: Dict[str, np.ndarray] = {}
+        for key, m in manifest["arrays"].items():
+            a = _view(shm, m)
+            if not owner:
+                a.flags.writeable = False
+            arrs[key] = a
+        self.dataset: Optional[CompiledDataset] = CompiledDataset(
+            node_ids=arrs["node_ids"], edge_ids=arrs["edge_ids"],
+            src=arrs["src"], dst=arrs["dst"], directed=arrs["directed"],
+            node_attrs={k[len("node:"):]: v for k, v in arrs.items() if k.startswith("node:")},
+            edge_attrs={k[len("edge:"):]: v for k, v in arrs.items() if k.startswith("edge:")},
+            prob_ids=arrs.get("prob_ids"), states=arrs.get("states"), probs=arrs.get("probs"),
+        )
+        self.csr: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = (
+            (arrs["csr:indptr"], arrs["csr:indices"], arrs["csr:edges"]) if "csr:indptr" in arrs else None
+        )
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    @classmethod
+    def publish(cls, ds: CompiledDataset, *, name: Optional[str] = None, csr: bool = True) -> "SharedDataset":
+        """
+        Copy `ds` (and its CSR adjacency unless csr=False) into a new block.
+        The caller owns it: call `unlink()` (or use `with`) when workers are done.
+        """
+        arrs = _arrays(ds, csr)
+        blob, manifest, size = _layout(arrs)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        try:
+            shm.buf[:len(_MAGIC)] = _MAGIC
+            shm.buf[len(_MAGIC):len(_MAGIC) + 8] = struct.pack("<Q", len(blob))
+            shm.buf[len(_MAGIC) + 8:len(_MAGIC) + 8 + len(blob)] = blob
+            for key, a in arrs.items():
+                _view(shm, manifest["arrays"][key])[...] = a
+            return cls(shm, owner=True)
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedDataset":
+        """Map an existing block by name (no copy). FileNotFoundError if it does not exist."""
+        return cls(_open(name), owner=False)
+
+    def close(self) -> None:
+        """
+        Release this process's mapping. Views handed out earlier must be
+        dropped first: while one is alive this raises BufferError.
+        """
+        self.dataset = None
+        self.csr = None
+        if _attached.get(self.name) is self:
+            del _attached[self.name]
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Destroy the block (owner only); attached processes keep their mapping until they close."""
+        if not self.owner:
+            raise RuntimeError("only the publishing SharedDataset may unlink the block")
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            self.close()
+        finally:
+            if self.owner:
+                self.unlink()
+
+    def __reduce__(self):
+        return attached, (self.name,)
+
+_attached: Dict[str, SharedDataset] = {}
+
+def attached(name: str) -> SharedDataset:
+    """
+    Per-process cached `SharedDataset.attach(name)`: the first call in a
+    worker maps the block, later calls (and unpickled handles) reuse it.
+    """
+    sd = _attached.get(name)
+    if sd is None or sd.dataset is None:
+        sd = _attached[name] = SharedDataset.attach(name)
+    return sd
+
+def detach(name: str) -> None:
+    """Close and forget the cached `attached(name)` handle of this process, if any."""
+    sd = _attached.pop(name, None)
+    if sd is not None:
+        sd.close()
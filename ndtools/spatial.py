@@ -0,0 +1,347 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+
+class _CellGrid:
+    """
+    Uniform grid of cubic cells over a point cloud (2-D or 3-D).
+
+    Points are sorted by linear cell key so that the members of one cell form a
+    contiguous slice of `order`. Only occupied cells are stored, so memory stays
+    O(n) whatever the cell size.
+    """
+
+    def __init__(self, coords: np.ndarray, cell_size: float):
+        if cell_size <= 0 or not math.isfinite(cell_size):
+            raise ValueError(f"cell_size must be a positive finite number, got {cell_size}")
+        self.coords = coords
+        self.cell_size = float(cell_size)
+        self.origin = coords.min(axis=0) if len(coords) else np.zeros(coords.shape[1])
+        span = (coords.max(axis=0) - self.origin) if len(coords) else np.zeros(coords.shape[1])
+        self.shape = (np.floor(span / self.cell_size).astype(np.int64) + 1)
+
+        cells = self.cell_of(coords)
+        keys = self.key_of(cells)
+        self.order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self.order]
+        self.keys, first = np.unique(sorted_keys, return_index=True)
+        self.starts = first
+        self.ends = np.append(first[1:], len(sorted_keys)).astype(np.int64)
+        self.point_cells = cells
+
+    def cell_of(self, pts: np.ndarray) -> np.ndarray:
+        c = np.floor((pts - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(c, 0, self.shape - 1)
+
+    def key_of(self, cells: np.ndarray) -> np.ndarray:
+        key = np.zeros(len(cells), dtype=np.int64)
+        for d in range(cells.shape[1]):
+            key = key * self.shape[d] + cells[:, d]
+        return key
+
+    def lookup(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (start, end) slices into `order` for each key (empty if unoccupied)."""
+        if len(self.keys) == 0:
+            zero = np.zeros(len(keys), dtype=np.int64)
+            return zero, zero
+        pos = np.searchsorted(self.keys, keys)
+        pos_c = np.minimum(pos, len(self.keys) - 1)
+        hit = self.keys[pos_c] == keys
+        start = np.where(hit, self.starts[pos_c], 0)
+        end = np.where(hit, self.ends[pos_c], 0)
+        return start, end
+
+    def gather_box(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Indices of points in all cells overlapping the box [lo, hi]."""
+        c_lo = np.floor((lo - self.origin) / self.cell_size).astype(np.int64)
+        c_hi = np.floor((hi - self.origin) / self.cell_size).astype(np.int64)
+        if np.any(c_hi < 0) or np.any(c_lo >= self.shape):
+            return np.empty(0, dtype=np.int64)
+        c_lo = np.maximum(c_lo, 0)
+        c_hi = np.minimum(c_hi, self.shape - 1)
+        axes = [np.arange(a, b + 1) for a, b in zip(c_lo, c_hi)]
+        cells = np.stack([g.ravel() for g in np.meshgrid(*axes, indexing="ij")], axis=1)
+        start, end = self.lookup(self.key_of(cells))
+        return self.order[_expand_ranges(start, end)]
+
+
+def _expand_ranges(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Concatenate arange(start[i], end[i]) for all i without a Python loop."""
+    lens = end - start
+    total = int(lens.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    nz = lens > 0
+    start, lens = start[nz], lens[nz]
+    offsets = np.repeat(start - np.concatenate(([0], np.cumsum(lens)[:-1])), lens)
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+class SpatialIndex:
+    """
+    Grid-based spatial index over node coordinates.
+
+    Build once from `nodes.json` (or a graph) and answer batched nearest-k,
+    within-radius and bounding-box queries in roughly O(k) per query instead of
+    scanning every node. Each batch is processed with array operations over
+    the cell table, without a Python loop over the query points. Works for 2-D (x, y) and 3-D (x, y, z) coordinates.
+
+    Example:
+        idx = SpatialIndex.from_nodes(nodes)
+        dist, ids = idx.nearest_ids([[10.0, 20.0]], k=3)
+    """
+
+    def __init__(
+        self,
+        coords: Any,
+        ids: Optional[Sequence[Any]] = None,
+        *,
+        cell_size: Optional[float] = None,
+    ):
+        coords = np.asarray(coords, dtype=float)
+        if coords.ndim != 2 or coords.shape[1] not in (2, 3):
+            raise ValueError(f"coords must have shape (n, 2) or (n, 3), got {coords.shape}")
+        if not np.all(np.isfinite(coords)):
+            raise ValueError("coords must be finite")
+        self.coords = coords
+        self.ids = np.asarray(list(ids) if ids is not None else np.arange(len(coords)))
+        if len(self.ids) != len(coords):
+            raise ValueError("ids and coords must have the same length")
+
+        if cell_size is None:
+            cell_size = self._default_cell_size(coords)
+        self._grid = _CellGrid(coords, cell_size)
+        self._coarse: Dict[float, _CellGrid] = {}  # radius -> coarser grid for wide radius queries
+
+    @staticmethod
+    def _default_cell_size(coords: np.ndarray) -> float:
+        """About one point per cell on average."""
+        n, dim = coords.shape
+        if n < 2:
+            return 1.0
+        span = coords.max(axis=0) - coords.min(axis=0)
+        span = span[span > 0]
+        if span.size == 0:
+            return 1.0
+        volume = float(np.prod(span))
+        return max((volume / n) ** (1.0 / span.size), 1e-12)
+
+    @classmethod
+    def from_nodes(
+        cls,
+        nodes: Mapping[str, Mapping[str, Any]],
+        keys: Tuple[str, ...] = ("x", "y"),
+        *,
+        cell_size: Optional[float] = None,
+    ) -> "SpatialIndex":
+        """
+        Build from a nodes dict {node_id: {"x": ..., "y": ...}}.
+        Nodes with missing/null coordinates are skipped.
+        """
+        ids: List[str] = []
+        pts: List[List[float]] = []
+        for nid, attrs in nodes.items():
+            vals = [attrs.get(k) for k in keys]
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) for v in vals):
+                ids.append(nid)
+                pts.append([float(v) for v in vals])
+        coords = np.asarray(pts, dtype=float).reshape(len(pts), len(keys))
+        return cls(coords, ids, cell_size=cell_size)
+
+    @classmethod
+    def from_graph(cls, G, keys: Tuple[str, ...] = ("x", "y"), *, cell_size: Optional[float] = None) -> "SpatialIndex":
+        """Build from the node attributes of a NetworkX graph."""
+        return cls.from_nodes(dict(G.nodes(data=True)), keys, cell_size=cell_size)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    # ---------- queries ----------
+
+    def _as_points(self, points: Any) -> np.ndarray:
+        pts = np.atleast_2d(np.asarray(points, dtype=float))
+        if pts.shape[1] != self.coords.shape[1]:
+            raise ValueError(f"points must have {self.coords.shape[1]} columns, got {pts.shape[1]}")
+        return pts
+
+    def _grid_for(self, radius: float) -> _CellGrid:
+        """A grid whose cells are at least `radius` wide, so a 3^dim stencil covers the radius."""
+        if radius <= self._grid.cell_size:
+            return self._grid
+        grid = self._coarse.get(radius)
+        if grid is None:
+            if len(self._coarse) >= 8:
+                self._coarse.clear()
+            grid = self._coarse[radius] = _CellGrid(self.coords, radius)
+        return grid
+
+    def _candidates(self, pts: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        All (query, position, squared distance) triples with distance <= radius,
+        for every query point at once, sorted by query and then distance.
+        """
+        grid = self._grid_for(radius)
+        dim = self.coords.shape[1]
+        qcells = np.floor((pts - grid.origin) / grid.cell_size).astype(np.int64)
+        Q: List[np.ndarray] = []
+        P: List[np.ndarray] = []
+        for off in np.ndindex(*(3,) * dim):
+            nb = qcells + (np.array(off) - 1)
+            ok = np.all((nb >= 0) & (nb < grid.shape), axis=1)
+            start, end = grid.lookup(grid.key_of(np.where(ok[:, None], nb, 0)))
+            end = np.where(ok, end, start)
+            Q.append(np.repeat(np.arange(len(pts)), end - start))
+            P.append(grid.order[_expand_ranges(start, end)])
+        q, pos = np.concatenate(Q), np.concatenate(P)
+        d2 = np.sum((self.coords[pos] - pts[q]) ** 2, axis=1)
+        keep = d2 <= radius * radius
+        q, pos, d2 = q[keep], pos[keep], d2[keep]
+        srt = np.lexsort((pos, d2, q))
+        return q[srt], pos[srt], d2[srt]
+
+    def within_radius(self, points: Any, radius: float) -> List[np.ndarray]:
+        """
+        For each query point, return positions (into `ids`/`coords`) of all indexed
+        points within Euclidean distance `radius`, sorted by distance.
+        """
+        pts = self._as_points(points)
+        if len(self) == 0 or radius < 0:
+            return [np.empty(0, dtype=np.int64) for _ in pts]
+        q, pos, _ = self._candidates(pts, float(radius))
+        return np.split(pos, np.searchsorted(q, np.arange(1, len(pts))))
+
+    def within_radius_ids(self, points: Any, radius: float) -> List[List[Any]]:
+        """Like `within_radius` but returns node ids."""
+        return [self.ids[r].tolist() for r in self.within_radius(points, radius)]
+
+    def nearest(self, points: Any, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest indexed points for each query point.
+
+        Returns:
+            (dist, pos): arrays of shape (m, k'), k' = min(k, len(self)),
+            sorted by increasing distance; `pos` indexes into `ids`/`coords`.
+        """
+        pts = self._as_points(points)
+        k = min(int(k), len(self))
+        dist = np.empty((len(pts), k))
+        pos = np.empty((len(pts), k), dtype=np.int64)
+        if k <= 0:
+            return dist, pos
+        # Radius queries are exact, so once a query has >= k hits its k closest
+        # hits are its k nearest. Unfinished queries retry with a doubled radius,
+        # all of them in one batch per round.
+        lo, hi = self.coords.min(axis=0), self.coords.max(axis=0)
+        far = np.linalg.norm(np.maximum(np.abs(pts - lo), np.abs(pts - hi)), axis=1)
+        todo = np.arange(len(pts))
+        r = self._grid.cell_size
+        while len(todo):
+            q, cand, d2 = self._candidates(pts[todo], r)
+            first = np.searchsorted(q, np.arange(len(todo)))
+            counts = np.diff(np.append(first, len(q)))
+            done = (counts >= k) | (r >= far[todo])
+            sel = (first[done][:, None] + np.arange(k)).ravel()
+            dist[todo[done]] = np.sqrt(d2[sel]).reshape(-1, k)
+            pos[todo[done]] = cand[sel].reshape(-1, k)
+            todo = todo[~done]
+            r *= 2.0
+        return dist, pos
+
+    def nearest_ids(self, points: Any, k: int = 1) -> Tuple[np.ndarray, List[List[Any]]]:
+        """Like `nearest` but returns node ids."""
+        dist, pos = self.nearest(points, k)
+        return dist, [self.ids[row].tolist() for row in pos]
+
+    def in_bbox(self, lo: Any, hi: Any) -> List[np.ndarray]:
+        """
+        Positions of indexed points inside each axis-aligned box [lo, hi] (inclusive).
+        `lo` and `hi` may be single corners or arrays of shape (m, dim) for a batch.
+        """
+        los, his = self._as_points(lo), self._as_points(hi)
+        if len(los) != len(his):
+            raise ValueError("lo and hi must describe the same number of boxes")
+        g = self._grid
+        m = len(los)
+        if len(self) == 0:
+            return [np.empty(0, dtype=np.int64) for _ in range(m)]
+        c_lo = np.maximum(np.floor((los - g.origin) / g.cell_size).astype(np.int64), 0)
+        c_hi = np.minimum(np.floor((his - g.origin) / g.cell_size).astype(np.int64), g.shape - 1)
+        sizes = np.maximum(c_hi - c_lo + 1, 0)
+        n_cells = np.prod(sizes, axis=1)
+
+        # enumerate every cell of every box: mixed-radix unravel of a flat counter
+        box = np.repeat(np.arange(m), n_cells)
+        t = np.arange(int(n_cells.sum()), dtype=np.int64) - np.repeat(np.cumsum(n_cells) - n_cells, n_cells)
+        cells = np.empty((len(t), g.shape.size), dtype=np.int64)
+        for d in range(g.shape.size - 1, -1, -1):
+            cells[:, d] = c_lo[box, d] + t % sizes[box, d]
+            t = t // sizes[box, d]
+        start, end = g.lookup(g.key_of(cells))
+        q = np.repeat(box, end - start)
+        cand = g.order[_expand_ranges(start, end)]
+        c = self.coords[cand]
+        keep = np.all((c >= los[q]) & (c <= his[q]), axis=1)
+        q, cand = q[keep], cand[keep]
+        srt = np.lexsort((cand, q))
+        q, cand = q[srt], cand[srt]
+        return np.split(cand, np.searchsorted(q, np.arange(1, m)))
+
+    def in_bbox_ids(self, lo: Any, hi: Any) -> List[List[Any]]:
+        """Like `in_bbox` but returns node ids."""
+        return [self.ids[r].tolist() for r in self.in_bbox(lo, hi)]
+
+    def pairs_within(self, radius: float, *, chunk_size: int = 1_000_000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        All unordered pairs (i, j), i < j, of indexed points at distance <= radius.
+
+        Uses a cell list with cell size `radius`, so the expected cost is O(n) for
+        bounded point density. Returns (i, j, dist) arrays sorted by (i, j).
+        """
+        if radius <= 0 or len(self) < 2:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        grid = self._grid if math.isclose(self._grid.cell_size, radius) else _CellGrid(self.coords, radius)
+        dim = self.coords.shape[1]
+        r2 = radius * radius
+
+        # Half stencil: every neighbouring cell pair is visited exactly once.
+        offsets = [o for o in np.ndindex(*(3,) * dim)]
+        offsets = [np.array(o) - 1 for o in offsets]
+        offsets = [o for o in offsets if tuple(o) >= (0,) * dim]
+
+        pts_sorted = grid.order
+        cells_sorted = grid.point_cells[pts_sorted]
+
+        I: List[np.ndarray] = []
+        J: List[np.ndarray] = []
+        D: List[np.ndarray] = []
+        step = max(1, chunk_size)
+        for off in offsets:
+            is_self = not np.any(off)
+            for a in range(0, len(pts_sorted), step):
+                src = pts_sorted[a:a + step]
+                nb = cells_sorted[a:a + step] + off
+                ok = np.all((nb >= 0) & (nb < grid.shape), axis=1)
+                start, end = grid.lookup(grid.key_of(nb))
+                start = np.where(ok, start, 0)
+                end = np.where(ok, end, 0)
+                if is_self:
+                    # same cell: only partners later in sorted order
+                    start = np.maximum(start, np.arange(a, a + len(src)) + 1)
+                    end = np.maximum(end, start)
+                lens = end - start
+                ii = np.repeat(src, lens)
+                jj = grid.order[_expand_ranges(start, end)]
+                d2 = np.sum((self.coords[ii] - self.coords[jj]) ** 2, axis=1)
+                keep = d2 <= r2
+                I.append(ii[keep]); J.append(jj[keep]); D.append(d2[keep])
+
+        i = np.concatenate(I) if I else np.empty(0, dtype=np.int64)
+        j = np.concatenate(J) if J else np.empty(0, dtype=np.int64)
+        d = np.sqrt(np.concatenate(D)) if D else np.empty(0)
+        lo_, hi_ = np.minimum(i, j), np.maximum(i, j)
+        srt = np.lexsort((hi_, lo_))
+        return lo_[srt], hi_[srt], d[srt]
@@ -0,0 +1,255 @@
+# ndtools/validation.py
+"""
+Dataset validation: schema validators compiled once per schema file, a fast
+structural path for the repo's own schemas, and integrity checks that JSON
+Schema cannot express (edge endpoints and probability ids must exist,
+probabilities must lie in [0, 1] and sum to 1 per component).
+"""
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from ndtools.io import find_data_file, iter_json_items, load_json
+
+SCHEMA_FILES = {"nodes": "nodes.schema.json", "edges": "edges.schema.json", "probs": "probs.schema.json"}
+PROB_SUM_TOL = 1e-6
+MAX_REPORTED = 10  # integrity problems listed per file
+
+def _jsonschema():
+    """Import jsonschema on first use; it is slow to import and only needed on the slow path."""
+    try:
+        import jsonschema
+    except ImportError as e:
+        raise RuntimeError("jsonschema is required for validation: pip install jsonschema") from e
+    return jsonschema
+
+class SchemaValidator:
+    """
+    A schema compiled once. Schemas of the form {"type": "object",
+    "patternProperties": {...}} (all repo schemas) are also split into one
+    validator per pattern, so files can be checked record by record.
+    """
+    def __init__(self, schema: Mapping[str, Any]):
+        jsonschema = _jsonschema()
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        self.schema = schema
+        self.validator = cls(schema)
+        self.patterns = [(re.compile(pat), cls(sub)) for pat, sub in schema.get("patternProperties", {}).items()]
+        extra = schema.get("additionalProperties", True)
+        self.extra = extra
+        self.extra_validator = cls(extra) if isinstance(extra, dict) else None
+        self.per_record = (
+            schema.get("type") == "object"
+            and not any(k in schema for k in ("properties", "required", "minProperties", "maxProperties",
+                                              "propertyNames", "dependentRequired", "dependentSchemas",
+                                              "allOf", "anyOf", "oneOf", "not", "if", "$ref"))
+        )
+
+    def validate(self, data: Any) -> None:
+        """Validate a whole document. Raises jsonschema.ValidationError."""
+        if self.per_record and isinstance(data, Mapping):
+            for key, rec in data.items():
+                self.validate_record(key, rec)
+        else:
+            self.validator.validate(data)
+
+    def validate_record(self, key: str, rec: Any) -> None:
+        """Validate one top-level (key, value) pair. Raises jsonschema.ValidationError."""
+        matched = False
+        for rx, v in self.patterns:
+            if rx.search(key):
+                matched = True
+                v.validate(rec)
+        if not matched:
+            if self.extra is False:
+                raise _jsonschema().ValidationError(f"Additional property {key!r} is not allowed")
+            if self.extra_validator is not None:
+                self.extra_validator.validate(rec)
+
+@lru_cache(maxsize=32)
+def _compiled(path: str, mtime_ns: int) -> SchemaValidator:
+    return SchemaValidator(load_json(Path(path)))
+
+def get_validator(schema_path: Path) -> SchemaValidator:
+    """Compiled validator for a schema file, cached until the file changes."""
+    path = Path(schema_path).resolve()
+    return _compiled(str(path), path.stat().st_mtime_ns)
+
+# ---------- fast structural path (mirrors schema/*.json) ----------
+
+_STATE_KEY = re.compile(r"[0-9]+")
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+def _fast_node(rec: Any) -> bool:
+    return (
+        isinstance(rec, dict) and "x" in rec and "y" in rec
+        and (rec["x"] is None or _is_number(rec["x"]))
+        and (rec["y"] is None or _is_number(rec["y"]))
+    )
+
+def _fast_edge(rec: Any) -> bool:
+    return (
+        isinstance(rec, dict)
+        and isinstance(rec.get("from"), str)
+        and isinstance(rec.get("to"), str)
+        and isinstance(rec.get("directed"), bool)
+    )
+
+def _fast_probs_row(row: Any) -> bool:
+    if not isinstance(row, dict):
+        return False
+    for state, rec in row.items():
+        if not (_STATE_KEY.fullmatch(state) and isinstance(rec, dict) and "p" in rec):
+            return False
+        if "prob" in rec and not (_is_number(rec["prob"]) and 0.0 <= rec["prob"] <= 1.0):
+            return False
+    return True
+
+FAST_CHECKS: Dict[str, Callable[[Any], bool]] = {"nodes": _fast_node, "edges": _fast_edge, "probs": _fast_probs_row}
+
+# ---------- files ----------
+
+def _stream_items(path: Path) -> Iterator[Tuple[str, Any]]:
+    """iter_json_items, with malformed JSON / a non-object document reported as ValidationError."""
+    jsonschema = _jsonschema()
+    it = iter_json_items(path, expect="object")
+    while True:
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        except ValueError as e:
+            raise jsonschema.ValidationError(str(e)) from e
+        yield item
+
+def _items(path: Path, validator: SchemaValidator, stream: bool) -> Iterable[Tuple[str, Any]]:
+    if stream and validator.per_record:
+        return _stream_items(path)
+    data = load_json(path)
+    if not (validator.per_record and isinstance(data, Mapping)):
+        validator.validate(data)  # raises for anything the record path cannot handle
+        return data.items() if isinstance(data, Mapping) else ()
+    return data.items()
+
+def _checked(kind: str, path: Path, validator: SchemaValidator, *, fast: bool, stream: bool
+             ) -> Iterator[Tuple[str, Any]]:
+    """Yield the records of `path`, each checked by the fast path or, if that fails, by jsonschema."""
+    quick = FAST_CHECKS.get(kind) if fast else None
+    for key, rec in _items(path, validator, stream):
+        if quick is None or not quick(rec):
+            validator.validate_record(key, rec)
+        yield key, rec
+
+def _raise_integrity(path: Path, problems: List[str], total: int) -> None:
+    if problems:
+        more = f" (and {total - len(problems)} more)" if total > len(problems) else ""
+        raise ValueError(f"{path.name}: " + "; ".join(problems) + more)
+
+class _Problems:
+    def __init__(self):
+        self.shown: List[str] = []
+        self.total = 0
+
+    def add(self, msg: str) -> None:
+        self.total += 1
+        if len(self.shown) < MAX_REPORTED:
+            self.shown.append(msg)
+
+def validate_nodes(path: Path, schema_dir: Path, *, fast: bool = True, stream: bool = False) -> Set[str]:
+    """Validate a nodes file; returns the node ids."""
+    v = get_validator(schema_dir / SCHEMA_FILES["nodes"])
+    return {key for key, _ in _checked("nodes", path, v, fast=fast, stream=stream)}
+
+def validate_edges(path: Path, schema_dir: Path, node_ids: Optional[Set[str]] = None, *,
+                   fast: bool = True, stream: bool = False) -> Set[str]:
+    """
+    Validate an edges file; with `node_ids`, also check that every `from`/`to`
+    is a known node (ValueError otherwise). Returns the edge ids.
+    """
+    v = get_validator(schema_dir / SCHEMA_FILES["edges"])
+    ids: Set[str] = set()
+    bad = _Problems()
+    for key, rec in _checked("edges", path, v, fast=fast, stream=stream):
+        ids.add(key)
+        if node_ids is not None and isinstance(rec, dict):
+            for end in ("from", "to"):
+                if rec.get(end) not in node_ids:
+                    bad.add(f"edge {key!r}: '{end}' node {rec.get(end)!r} does not exist")
+    _raise_integrity(path, bad.shown, bad.total)
+    return ids
+
+def validate_probs(path: Path, schema_dir: Path, component_ids: Optional[Set[str]] = None, *,
+                   fast: bool = True, stream: bool = False, check_values: bool = True,
+                   tol: float = PROB_SUM_TOL) -> None:
+    """
+    Validate a probs file. With check_values, also check that every "p" is a
+    number in [0, 1] and that each component's probabilities sum to 1 (within
+    `tol`); with `component_ids`, that every component is a known node or edge.
+    Integrity problems raise ValueError.
+    """
+    v = get_validator(schema_dir / SCHEMA_FILES["probs"])
+    bad = _Problems()
+    for key, row in _checked("probs", path, v, fast=fast, stream=stream):
+        if component_ids is not None and key not in component_ids:
+            bad.add(f"{key!r} is neither a node nor an edge")
+        if not (check_values and isinstance(row, dict)):
+            continue
+        total = 0.0
+        for state, rec in row.items():
+            p = rec.get("p") if isinstance(rec, dict) else None
+            if not _is_number(p) or not 0.0 <= p <= 1.0:
+                bad.add(f"{key!r} state {state}: p={p!r} is not a number in [0, 1]")
+                break
+            total += p
+        else:
+            if abs(total - 1.0) > tol:
+                bad.add(f"{key!r}: probabilities sum to {total:.9g}, not 1")
+    _raise_integrity(path, bad.shown, bad.total)
+
+def check_dataset(
+    data_dir: Path,
+    schema_dir: Path,
+    *,
+    probs_files: Optional[Iterable[Path]] = None,
+    fast: bool = True,
+    stream: bool = False,
+    integrity: bool = True,
+) -> List[Tuple[Path, Exception]]:
+    """
+    Validate nodes, edges and every probs file in `data_dir` (default: all
+    `probs*.json*`). Returns one (path, exception) per failing file: a
+    jsonschema.ValidationError for schema violations, ValueError for integrity
+    problems, FileNotFoundError for missing files. Empty list -> valid.
+
+    fast=True accepts records that pass the structural checks mirroring the repo
+    schemas and only runs jsonschema on the others; use fast=False for custom
+    schemas that are stricter than schema/*.json.
+    """
+    data_dir = Path(data_dir)
+    problems: List[Tuple[Path, Exception]] = []
+    nodes_p = find_data_file(data_dir / "nodes.json")
+    edges_p = find_data_file(data_dir / "edges.json")
+    probs_files = sorted(data_dir.glob("probs*.json*")) if probs_files is None else list(probs_files)
+    if not probs_files:
+        problems.append((data_dir / "probs.json", FileNotFoundError(f"no probs*.json found in {data_dir}")))
+
+    def run(path: Path, fn: Callable[[], Any]) -> Any:
+        try:
+            return fn()
+        except Exception as e:
+            problems.append((path, e))
+            return None
+
+    node_ids = run(nodes_p, lambda: validate_nodes(nodes_p, schema_dir, fast=fast, stream=stream))
+    edge_ids = run(edges_p, lambda: validate_edges(
+        edges_p, schema_dir, node_ids if integrity else None, fast=fast, stream=stream))
+    ids = (node_ids | edge_ids) if integrity and node_ids is not None and edge_ids is not None else None
+    for probs_p in probs_files:
+        run(probs_p, lambda: validate_probs(
+            probs_p, schema_dir, ids, fast=fast, stream=stream, check_values=integrity))
+    return problems
@@ -0,0 +1,63 @@
+# tests/test_data_validate.py
+from __future__ import annotations
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("jsonschema")
+
+import data_validate
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    shutil.copytree("schema", tmp_path / "schema")
+    for src in ("toynet_11edges", "ema_highway"):
+        shutil.copytree(f"datasets/{src}/v1/data", tmp_path / "datasets" / src / "v1" / "data")
+    # a folder of several datasets, like datasets/generated
+    shutil.copytree("datasets/generated/grid_8x8", tmp_path / "datasets" / "gen" / "grid_8x8")
+    registry = [
+        {"name": "toynet", "path": "datasets/toynet_11edges/v1"},
+        {"name": "ema", "path": "datasets/ema_highway/v1"},
+        {"name": "gen", "path": "datasets/gen"},
+    ]
+    (tmp_path / "registry.json").write_text(json.dumps(registry))
+    return tmp_path
+
+
+def _run(repo: Path, capsys, *extra: str):
+    with pytest.raises(SystemExit) as exc:
+        data_validate.main(["--root", str(repo), *extra])
+    return exc.value.code, capsys.readouterr().out
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_main1(repo: Path, capsys, workers):
+    code, out = _run(repo, capsys, "--workers", workers)
+    assert code == 0
+    assert "3 validated, 0 unchanged" in out
+    assert "datasets/gen/grid_8x8/v1" in out
+
+    # unchanged datasets are skipped on the next run
+    code, out = _run(repo, capsys, "--workers", workers)
+    assert code == 0 and "0 validated, 3 unchanged" in out
+
+    # an edited file is revalidated (and caught), --force revalidates everything
+    probs = repo / "datasets" / "toynet_11edges" / "v1" / "data" / "probs.json"
+    data = json.loads(probs.read_text())
+    data["e01"]["0"]["p"] = 0.5
+    probs.write_text(json.dumps(data))
+    code, out = _run(repo, capsys, "--workers", workers)
+    assert code == 1 and "sum to" in out and "1 validated, 2 unchanged" in out
+
+    code, out = _run(repo, capsys, "--force", "--workers", workers)
+    assert code == 1 and "3 validated, 0 unchanged" in out
+
+
+def test_validate_dataset_missing_probs1(repo: Path):
+    data = repo / "datasets" / "toynet_11edges" / "v1" / "data"
+    (data / "probs.json").unlink()
+    problems = data_validate.validate_dataset(repo, "datasets/toynet_11edges/v1", repo / "schema")
+    assert problems and problems[0].startswith("Missing")
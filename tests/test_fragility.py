@@ -0,0 +1,83 @@
+# tests/test_fragility.py
+from __future__ import annotations
+import importlib.util
+import json
+import math
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+from ndtools import fragility
+
+DATA = Path("datasets/distribution_substation_liang2022/v1/data")
+SCRIPTS = DATA.parent / "scripts"
+
+
+@pytest.fixture(scope="module")
+def model() -> fragility.FragilityModel:
+    return fragility.FragilityModel.from_dataset(DATA)
+
+
+def _utils_sub():
+    pytest.importorskip("scipy")
+    spec = importlib.util.spec_from_file_location("utils_sub", SCRIPTS / "utils_sub.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_survival_matches_utils_sub1(model):
+    utils_sub = _utils_sub()
+    edges = json.loads((DATA / "edges.json").read_text())
+    mcomp = json.loads((DATA / "macrocomponents.json").read_text())
+    equip = json.loads((DATA / "equipment.json").read_text())
+    pgas = np.array([0.05, 0.2, 0.5, 1.0, 2.5])
+
+    surv = model.survival(pgas)
+    assert surv.shape == (len(pgas), len(edges))
+    for row, pga in zip(surv, pgas):
+        # the nested loops of utils_sub.get_edge_probs
+        pf = {k: utils_sub.cal_fail_prob(v, pga) for k, v in equip.items()}
+        expected = []
+        for e in edges.values():
+            ps = 1.0
+            for k, n in mcomp[e["macrocomponent_type"]]["equipment_number"].items():
+                ps *= (1.0 - pf[k]) ** n
+            expected.append(ps)
+        # (1 - pf) ** n loses digits when pf is close to 1; log space does not
+        np.testing.assert_allclose(row, expected, rtol=1e-6, atol=1e-300)
+
+
+def test_survival_limits1(model):
+    surv = model.survival([0.0, 1e3])
+    assert np.all(surv[0] == 1.0)
+    assert np.all(surv[1] < 1e-10)
+    # log space keeps the far tail instead of underflowing to -inf
+    assert np.all(np.isfinite(model.log_survival([1e3])))
+
+
+def test_log_ndtr_fallback1():
+    x = np.array([-60.0, -35.0, -10.0, -1.0, 0.0, 1.5, 8.0])
+    got = fragility._log_ndtr_fallback(x)
+    special = pytest.importorskip("scipy.special")
+    np.testing.assert_allclose(got, special.log_ndtr(x), rtol=1e-8)
+
+
+def test_log_ndtr_without_scipy1(model, monkeypatch):
+    # None in sys.modules makes the import fail, so log_ndtr takes the fallback
+    monkeypatch.setitem(sys.modules, "scipy.special", None)
+    got = fragility.log_ndtr(np.array([np.nan, -np.inf, np.inf, -1.0]))
+    assert np.isnan(got[0]) and got[1] == -np.inf and got[2] == 0.0
+    assert got[3] == pytest.approx(math.log(0.15865525393145707))
+    # NaN intensities give NaN survival, not leftover memory
+    surv = model.survival([np.nan, 0.0, 0.2])
+    assert np.all(np.isnan(surv[0])) and np.all(surv[1] == 1.0)
+
+
+def test_probs1(model):
+    probs = model.probs(0.3)
+    assert set(probs) == set(model.edge_ids.tolist())
+    for row in probs.values():
+        assert row["0"]["p"] + row["1"]["p"] == pytest.approx(1.0)
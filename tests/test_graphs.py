@@ -1,94 +1,10 @@
 from __future__ import annotations
 from pathlib import Path
-import pytest, json
-from typing import Dict, Any, Tuple
+import pytest
 
-import networkx as nx
-from ndtools import graphs
+from ndtools import graphs, io
 import numpy as np
 
-# ---------- helpers ----------
-
-def load_dataset_any(data_dir: str | Path) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
-    """
-    Load nodes/edges[/probs] from a dataset directory and NORMALISE shapes.
-
-    Accepted node formats:
-      1) Dict: { "n1": {...}, "n2": {...}, ... }
-      2) List: [ {"id":"n1", ...}, {"id":"n2", ...}, ... ]
-
-    Accepted edge formats:
-      1) Dict: { "e1": {"from":"n1","to":"n2", ...}, ... }
-      2) List: [ {"eid":"e1","source":"n1","target":"n2", ...}, ... ]
-
-    Returns:
-      nodes: {node_id: attrs}
-      edges: {eid: {"from": u, "to": v, ...}}
-      probs: {} if probs.json missing
-    """
-    data_dir = Path(data_dir)
-
-    # ---- nodes ----
-    nodes_raw = json.loads((data_dir / "nodes.json").read_text(encoding="utf-8"))
-    if isinstance(nodes_raw, dict):
-        # already {id: attrs}
-        nodes = nodes_raw
-    elif isinstance(nodes_raw, list):
-        # list of {"id": "...", ...}
-        nodes = {n["id"]: {k: v for k, v in n.items() if k != "id"} for n in nodes_raw}
-    else:
-        raise TypeError("nodes.json must be dict or list")
-
-    # ---- edges ----
-    edges_raw = json.loads((data_dir / "edges.json").read_text(encoding="utf-8"))
-    edges: Dict[str, Any] = {}
-
-    if isinstance(edges_raw, dict):
-        # already keyed by eid; ensure 'from'/'to' exist (or map source/target)
-        for eid, e in edges_raw.items():
-            if "from" in e and "to" in e:
-                edges[eid] = e
-            elif "source" in e and "target" in e:
-                edges[eid] = {"from": e["source"], "to": e["target"],
-                              **{k: v for k, v in e.items() if k not in ("source", "target")}}
-            else:
-                raise KeyError(f"Edge {eid} missing 'from'/'to' or 'source'/'target'")
-    elif isinstance(edges_raw, list):
-        # list of {"eid": "...", "source": "...", "target": "...", ...}
-        for e in edges_raw:
-            eid = e.get("eid")
-            if not eid:
-                raise KeyError("Edge entry in list missing 'eid'")
-            if "from" in e and "to" in e:
-                edges[eid] = {k: v for k, v in e.items() if k != "eid"}
-            elif "source" in e and "target" in e:
-                edges[eid] = {"from": e["source"], "to": e["target"],
-                              **{k: v for k, v in e.items() if k not in ("eid", "source", "target")}}
-            else:
-                raise KeyError(f"Edge {eid} missing 'from'/'to' or 'source'/'target'")
-    else:
-        raise TypeError("edges.json must be dict or list")
-
-    # ---- probs ----
-    probs_path = data_dir / "probs.json"
-    if probs_path.exists():
-        probs = json.loads(probs_path.read_text(encoding="utf-8"))
-    else:
-        probs = {}
-
-    return nodes, edges, probs
-
-def build_base_graph(nodes: Dict[str, Dict[str, Any]],
-                     edges: Dict[str, Dict[str, Any]]) -> nx.Graph:
-    G = nx.Graph()
-    for nid, attrs in nodes.items():
-        G.add_node(nid, **attrs)
-    for eid, e in edges.items():
-        u, v = e["from"], e["to"]
-        attr = {"eid": eid, **{k: v for k, v in e.items() if k not in ("from", "to")}}
-        G.add_edge(u, v, **attr)
-    return G
-
 # ---------- tests ----------
 
 def test_draw_graph_from_data1():
@@ -109,7 +25,8 @@ def test_draw_graph_from_data1():
     print(f"[ok] Graph created at {out_path.resolve()}")
 
 def test_compute_edge_lengths1():
-    nodes, edges, probs = load_dataset_any("datasets/toynet_11edges/v1/data")
+    ds = io.load_dataset("toynet-11edges")
+    nodes, edges = ds.nodes, ds.edges
 
     lengths = graphs.compute_edge_lengths(nodes, edges)
 
@@ -122,3 +39,14 @@ def test_compute_edge_lengths1():
         assert np.isclose(lengths[eid], val, rtol=1e-5, atol=1e-8), \
             f"{eid}: got {lengths[eid]}, expected {val}"
 
+
+def test_build_graph_from_stream1():
+    data_dir = Path("datasets/toynet_11edges/v1/data")
+    ds = io.load_dataset("toynet-11edges")
+
+    G = graphs.build_graph(io.iter_json_items(data_dir / "nodes.json"),
+                           io.iter_json_items(data_dir / "edges.json"))
+    G_ref = graphs.build_graph(ds.nodes, ds.edges)
+
+    assert set(G.nodes) == set(G_ref.nodes)
+    assert {d["eid"] for _, _, d in G.edges(data=True)} == set(ds.edges)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Heavy optional modules that must only load on first use
+LAZY = ("matplotlib", "jsonschema", "yaml")
+
+def _modules_after_import(stmt: str) -> list[str]:
+    code = f"import sys, json; {stmt}; print(json.dumps(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+# ---------- tests ----------
+
+@pytest.mark.parametrize("module", ["ndtools", "ndtools.io", "ndtools.graphs",
+                                    "ndtools.fun_binary_graph", "ndtools.network_generator"])
+def test_import_is_lightweight(module):
+    loaded = _modules_after_import(f"import {module}")
+
+    heavy = [m for m in LAZY if m in loaded]
+    assert not heavy, f"`import {module}` pulled in {heavy}"
+
+def test_lazy_modules_load_on_use():
+    loaded = _modules_after_import(
+        "from pathlib import Path; from ndtools import io; "
+        "io.load_yaml(Path('datasets/ema_highway/dataset.yaml'))")
+
+    assert "yaml" in loaded
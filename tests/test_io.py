@@ -0,0 +1,163 @@
+from __future__ import annotations
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ndtools import io
+
+# ---------- helpers ----------
+
+@pytest.fixture
+def toynet_copy(tmp_path: Path) -> Path:
+    dst = tmp_path / "data"
+    shutil.copytree("datasets/toynet_11edges/v1/data", dst)
+    return dst
+
+# ---------- tests ----------
+
+def test_load_compiled1(toynet_copy: Path):
+    ds = io.load_compiled(toynet_copy)
+
+    edges = json.loads((toynet_copy / "edges.json").read_text())
+    assert ds.edge_ids.tolist() == list(edges.keys())
+    for i, e in enumerate(edges.values()):
+        assert ds.node_ids[ds.src[i]] == e["from"]
+        assert ds.node_ids[ds.dst[i]] == e["to"]
+    assert np.allclose(ds.edge_attrs["length"], [e["length"] for e in edges.values()])
+    assert ds.states.tolist() == [0, 1]
+    assert np.allclose(ds.probs.sum(axis=1), 1.0)
+    assert (toynet_copy / io.SIDECAR_DIR / "graph" / "manifest.json").exists()
+
+def test_load_compiled_uses_sidecar(toynet_copy: Path, monkeypatch):
+    first = io.load_compiled(toynet_copy)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("JSON should not be parsed when the sidecar is valid")
+    monkeypatch.setattr(io, "_read_source", _fail)
+
+    second = io.load_compiled(toynet_copy)
+    assert isinstance(second.src, np.memmap)
+    assert np.array_equal(first.src, second.src)
+    assert np.array_equal(first.probs, second.probs)
+
+def test_load_compiled_invalidates_on_change(toynet_copy: Path):
+    io.load_compiled(toynet_copy)
+
+    probs_path = toynet_copy / "probs.json"
+    probs = json.loads(probs_path.read_text())
+    probs["e01"] = {"0": {"p": 0.5}, "1": {"p": 0.5}}
+    probs_path.write_text(json.dumps(probs))
+
+    ds = io.load_compiled(toynet_copy)
+    row = ds.prob_ids.tolist().index("e01")
+    assert np.allclose(ds.probs[row], [0.5, 0.5])
+
+def test_load_dataset1():
+    ds = io.load_dataset("toynet-11edges", build_graph=True)
+
+    assert ds.root.name == "v1"
+    assert len(ds.nodes) == 8 and len(ds.edges) == 11
+    assert set(ds.probs) == set(ds.edges)
+    assert ds.graph.number_of_edges() == 11
+
+def test_load_dataset_probs_variants():
+    ds_bin = io.load_dataset("ema-highway", probs="bin")
+    ds_mult = io.load_dataset("ema_highway", probs="mult")
+
+    assert ds_bin.probs_path.name == "probs_bin.json"
+    assert ds_mult.probs_path.name == "probs_mult.json"
+    assert set(ds_mult.probs["e0001"]) == {"0", "1", "2"}
+    with pytest.raises(KeyError):
+        io.load_dataset("ema-highway", probs="nonexistent")
+
+def test_load_dataset_cached():
+    io.clear_dataset_cache()
+    first = io.load_dataset("grid_8x8")
+    second = io.load_dataset("grid_8x8")
+
+    assert first is second
+    with pytest.raises(FileNotFoundError):
+        io.load_dataset("no-such-dataset")
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_iter_json_items1(chunk_size):
+    path = Path("datasets/ema_highway/v1/data/probs_mult.json")
+    expected = json.loads(path.read_text())
+
+    got = list(io.iter_json_items(path, chunk_size=chunk_size))
+    assert got == list(expected.items())
+
+def test_iter_json_items_array(tmp_path: Path):
+    path = tmp_path / "edges.json"
+    path.write_text('[{"eid": "e0", "from": "n0", "to": "n1"}, 12.5e1 , "s"]')
+
+    assert list(io.iter_json_items(path, chunk_size=3)) == [
+        (0, {"eid": "e0", "from": "n0", "to": "n1"}), (1, 125.0), (2, "s")]
+    with pytest.raises(ValueError):
+        list(io.iter_json_items(path, expect="object"))
+
+@pytest.mark.parametrize("obj", [
+    {},
+    {"n0": {"x": 1, "y": None, "tags": ["a", {"b": []}], "name": "Zürich\nline"}, "n1": {}},
+])
+def test_write_json_items1(tmp_path: Path, obj):
+    path = tmp_path / "nodes.json"
+    io.write_json_items(path, iter(obj.items()))
+    assert path.read_text() == json.dumps(obj, indent=2)
+
+    io.write_json_items(path, obj, indent=None)
+    assert path.read_text() == json.dumps(obj, separators=(",", ":"))
+
+    gz = tmp_path / "nodes.json.gz"
+    io.write_json_items(gz, obj, indent=None)
+    assert io.load_json(gz) == obj
+
+def test_write_json_items_atomic1(tmp_path: Path):
+    path = tmp_path / "edges.json"
+    path.write_text('{"old": 1}')
+
+    def records():
+        yield "e0", {"from": "n0"}
+        raise RuntimeError("killed")
+
+    with pytest.raises(RuntimeError):
+        io.write_json_items(path, records())
+    # the old file is untouched and no temporary file is left behind
+    assert json.loads(path.read_text()) == {"old": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["edges.json"]
+
+def test_load_datasets1():
+    roots = io.list_datasets()
+    assert any(r.parent.name == "grid_8x8" for r in roots)
+
+    results = dict(io.load_datasets(roots + ["ema-highway"], max_workers=3))
+
+    assert len(results) == len(roots) + 1
+    ema = results["ema-highway"]
+    assert set(ema.all_probs) == {"probs_bin", "probs_mult"}
+    assert ema.probs == io.load_dataset("ema-highway").probs
+    for root in roots:
+        ds = results[root]
+        assert ds.edges == io.load_dataset(root).edges
+
+
+def test_read_source_stats_before_reading(tmp_path: Path, monkeypatch):
+    path = tmp_path / "nodes.json"
+    path.write_text('{"n0": {"x": 0, "y": 0}}')
+    real_read = Path.read_bytes
+
+    def read_then_modify(self):
+        raw = real_read(self)
+        self.write_text('{"n0": {"x": 1, "y": 1}, "n1": {"x": 2, "y": 2}}')  # concurrent writer
+        return raw
+    monkeypatch.setattr(Path, "read_bytes", read_then_modify)
+    data, meta = io._read_source(path)
+
+    # the stamp describes the file as it was before the read, so it no longer
+    # matches and the next load rebuilds instead of trusting stale content
+    assert data == {"n0": {"x": 0, "y": 0}}
+    assert meta["size"] != path.stat().st_size
+
@@ -166,3 +166,401 @@ def test_random_geometric1(tmp_out: Path, no_validate):
         assert 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0
     # Some edges should exist (radius not too small)
     assert len(edges) > 0
+
+
+def test_validate_stream1(tmp_out: Path):
+    jsonschema = pytest.importorskip("jsonschema")
+    schema_dir = Path("schema")
+    cfg = ng.GenConfig(name="grid_3x3", generator="grid",
+                       generator_params={"rows": 3, "cols": 3}, seed=None)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=schema_dir, config=cfg, draw_graph=False)
+    ng.validate(ds_root, schema_dir, stream=True)
+
+    edges_path = ds_root / "data" / "edges.json"
+    edges = json.loads(edges_path.read_text())
+    edges["e0"]["from"] = 0
+    edges_path.write_text(json.dumps(edges))
+    with pytest.raises(jsonschema.ValidationError):
+        ng.validate(ds_root, schema_dir, stream=True)
+
+
+@pytest.mark.parametrize("compress", ["gz", "zst"])
+def test_compressed_dataset1(tmp_out: Path, compress):
+    if compress == "zst":
+        pytest.importorskip("zstandard")
+    from ndtools import io
+    schema_dir = Path("schema")
+    cfg = ng.GenConfig(name=f"er_{compress}", generator="er",
+                       generator_params={"n_nodes": 30, "p": 0.2}, seed=3)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=schema_dir, config=cfg,
+                                   draw_graph=False, compress=compress)
+
+    data_dir = ds_root / "data"
+    assert (data_dir / f"edges.json.{compress}").exists()
+    assert not (data_dir / "edges.json").exists()
+    ng.validate(ds_root, schema_dir)
+
+    ds = io.load_dataset(ds_root)
+    assert len(ds.nodes) == 30
+    assert set(ds.probs) == set(ds.edges)
+    assert ds.edges == dict(io.iter_json_items(data_dir / "edges.json"))
+
+
+def test_erdos_renyi_edge_distribution1():
+    n, p = 200, 0.05
+    counts = [len(ng.generate_erdos_renyi(n, p, seed=s)[1]) for s in range(20)]
+    expected = p * n * (n - 1) / 2
+    # mean of 20 binomial draws: sd ~ sqrt(expected*(1-p)/20) ~ 6.7
+    assert abs(sum(counts) / len(counts) - expected) < 35
+
+    nodes, edges = ng.generate_erdos_renyi(n, p, seed=1)
+    pairs = [(e["from"], e["to"]) for e in edges.values()]
+    assert len(set(pairs)) == len(pairs)
+    assert all(int(u[1:]) < int(v[1:]) for u, v in pairs)
+    assert ng.generate_erdos_renyi(n, p, seed=1) == (nodes, edges)
+
+
+def test_erdos_renyi_directed1(tmp_out: Path, no_validate):
+    cfg = ng.GenConfig(
+        name="er_dir",
+        generator="er",
+        generator_params={"n_nodes": 30, "p": 0.2, "directed": True},
+        seed=5,
+    )
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+    nodes, edges, _ = _read_dataset(ds_root)
+
+    assert all(e["directed"] is True for e in edges.values())
+    assert all(e["from"] != e["to"] for e in edges.values())
+    assert 0 < len(edges) <= 30 * 29
+
+
+@pytest.mark.parametrize("gen, args", [
+    (ng.generate_grid, (4, 5)),
+    (ng.generate_erdos_renyi, (40, 0.1)),
+    (ng.generate_watts_strogatz, (40, 4, 0.3)),
+    (ng.generate_barabasi_albert, (40, 2)),
+    (ng.generate_random_geometric, (40, 0.3)),
+    (ng.generate_configuration, (40, 3.0)),
+])
+def test_as_arrays1(gen, args):
+    graph = gen(*args, as_arrays=True)
+    nodes, edges = gen(*args)
+
+    assert isinstance(graph, ng.GraphArrays)
+    assert len(graph.src) == len(graph.dst) == len(edges)
+    assert list(nodes) == [f"n{i}" for i in range(graph.n_nodes)]
+    # simple graph: no self-loops, no duplicate undirected edges
+    pairs = {(min(u, v), max(u, v)) for u, v in zip(graph.src.tolist(), graph.dst.tolist())}
+    assert len(pairs) == graph.n_edges
+    assert all(u != v for u, v in pairs)
+
+
+def test_grid_matches_baseline1():
+    # dicts as built by the original pure-Python generate_grid
+    rows, cols = 3, 4
+    nodes = {f"n{i}": {"x": i % cols, "y": i // cols} for i in range(rows * cols)}
+    edges, eid = {}, 0
+    for i in range(rows):
+        for j in range(cols):
+            u = f"n{i * cols + j}"
+            if j + 1 < cols:
+                edges[f"e{eid}"] = {"from": u, "to": f"n{i * cols + j + 1}", "directed": False}
+                eid += 1
+            if i + 1 < rows:
+                edges[f"e{eid}"] = {"from": u, "to": f"n{(i + 1) * cols + j}", "directed": False}
+                eid += 1
+    assert ng.generate_grid(rows, cols) == (nodes, edges)
+
+
+@pytest.mark.parametrize("gen, args, n_edges, top_degrees", [
+    (ng.generate_watts_strogatz, (40, 4, 0.3), 80, [7, 7, 6, 5, 5, 5, 5, 5]),
+    (ng.generate_barabasi_albert, (40, 2), 76, [9, 9, 8, 7, 7, 7, 7, 7]),
+])
+def test_fixed_seed_output1(gen, args, n_edges, top_degrees):
+    nodes, edges = gen(*args, seed=42)
+    deg = {n: 0 for n in nodes}
+    for e in edges.values():
+        deg[e["from"]] += 1
+        deg[e["to"]] += 1
+    assert len(edges) == n_edges
+    assert sum(deg.values()) == 2 * n_edges
+    assert sorted(deg.values(), reverse=True)[:8] == top_degrees
+
+
+@pytest.mark.parametrize("n_nodes, m", [(1, 1), (0, 1), (10, 0)])
+def test_barabasi_albert_invalid1(n_nodes, m):
+    with pytest.raises(ValueError):
+        ng.generate_barabasi_albert(n_nodes, m)
+
+
+def test_grid_arrays1():
+    graph = ng.generate_grid(3, 4, as_arrays=True)
+
+    assert graph.coords.tolist()[5] == [1, 1]
+    # node 5 (x=1, y=1): right neighbour 6, down neighbour 9
+    out = sorted(graph.dst[graph.src == 5].tolist())
+    assert out == [6, 9]
+
+
+def _degrees(graph: ng.GraphArrays):
+    import numpy as np
+    return np.bincount(np.concatenate([graph.src, graph.dst]), minlength=graph.n_nodes).tolist()
+
+
+def test_configuration_deg_seq1(tmp_path: Path):
+    seq = [3, 3, 2, 2, 2, 1, 1]
+    graph = ng.generate_configuration(deg_seq=seq, seed=3, as_arrays=True)
+    assert _degrees(graph) == seq
+
+    # same sequence via the CLI string formats
+    f = tmp_path / "deg.txt"
+    f.write_text("\n".join(map(str, seq)) + "\n")
+    assert _degrees(ng.generate_configuration(deg_seq=f"@{f}", as_arrays=True)) == seq
+    assert _degrees(ng.generate_configuration(deg_seq="3,3,2,2,2,1,1", as_arrays=True)) == seq
+
+
+def test_configuration_deg_seq2():
+    with pytest.raises(ValueError):
+        ng.generate_configuration(deg_seq=[3, 3, 3, 1])  # not graphical
+    with pytest.raises(ValueError):
+        ng.generate_configuration(5, deg_seq=[1, 1])  # length mismatch
+
+
+def test_configuration_dense1():
+    # near-complete graphs need many repairs; degrees must still be exact
+    seq = ng._synthesize_degree_sequence(25, 20.0, seed=1)
+    graph = ng.generate_configuration(deg_seq=seq, seed=1, as_arrays=True)
+    assert _degrees(graph) == seq
+    pairs = {(min(u, v), max(u, v)) for u, v in zip(graph.src.tolist(), graph.dst.tolist())}
+    assert len(pairs) == graph.n_edges
+
+
+def test_synthesize_capped1():
+    # near-complete targets fail Erdős–Gallai after the sum fix; the repair caps
+    # the degrees at the largest graphical level in one step
+    import numpy as np
+    seq = ng._synthesize_degree_sequence(10, 8.6, seed=2)
+    assert ng._is_graphical(np.asarray(seq))
+    assert sum(seq) % 2 == 0
+    assert max(seq) == 8  # the uncapped draw had degree-9 nodes
+
+
+def test_configuration_dense_draw_refills1(monkeypatch):
+    # the Havel-Hakimi fallback interleaves edge draws and flip bits; buffered
+    # draws must survive the interleaving (one refill per 4096 draws per bound,
+    # 4 draws per swap attempt)
+    pools = []
+
+    class Recording(ng._Pool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(ng, "_Pool", Recording)
+    seq = [190] * 200
+    graph = ng.generate_configuration(deg_seq=seq, seed=1, as_arrays=True)
+    assert _degrees(graph) == seq
+    m = graph.n_edges
+    assert pools and pools[0].refills <= 2 * (4 * ng._HH_SWAPS_PER_EDGE * m // 4096 + 1)
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+def test_random_geometric_lengths1(dim):
+    import numpy as np
+    graph = ng.generate_random_geometric(300, 0.15, seed=4, dim=dim, as_arrays=True)
+
+    assert graph.coords.shape == (300, dim)
+    length = graph.edge_attrs["length"]
+    expected = np.linalg.norm(graph.coords[graph.src] - graph.coords[graph.dst], axis=1)
+    assert np.allclose(length, expected)
+    assert np.all(length <= 0.15)
+
+    # brute force: every pair within the radius is an edge
+    diff = graph.coords[:, None, :] - graph.coords[None, :, :]
+    close = np.triu(np.linalg.norm(diff, axis=2) <= 0.15, k=1)
+    assert close.sum() == graph.n_edges
+
+    _, edges = graph.to_dicts()
+    assert edges["e0"]["length"] == pytest.approx(float(length[0]))
+
+
+def test_ensemble_configs1():
+    base = ng.GenConfig(name="er", generator="er", generator_params={"p": 0.1, "p_fail": 0.2}, seed=11)
+    configs = ng.ensemble_configs(base, {"n_nodes": [10, 20], "p": [0.1, 0.3]}, replicates=3)
+
+    assert len(configs) == 12
+    assert configs[0].generator_params == {"p": 0.1, "p_fail": 0.2, "n_nodes": 10}
+    assert len({c.seed for c in configs}) == 12
+    assert len({c.name for c in configs}) == 12
+    # reproducible from the root seed
+    again = ng.ensemble_configs(base, {"n_nodes": [10, 20], "p": [0.1, 0.3]}, replicates=3)
+    assert [c.seed for c in again] == [c.seed for c in configs]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_ensemble1(tmp_out: Path, workers):
+    pytest.importorskip("jsonschema")
+    registry = tmp_out / "registry.json"
+    base = ng.GenConfig(name="ens", generator="er", generator_params={"p": 0.2}, seed=3)
+    roots = ng.generate_ensemble(
+        tmp_out, Path("schema"), base, {"n_nodes": [10, 15]}, replicates=2,
+        max_workers=workers, draw_graph=False, update_registry_flag=True, registry_path=registry,
+    )
+
+    assert len(roots) == 4
+    for root, n in zip(roots, [10, 10, 15, 15]):
+        nodes, _, _ = _read_dataset(root)
+        assert len(nodes) == n
+    reg = json.loads(registry.read_text())
+    assert [d["path"] for d in reg] == [str(r.relative_to(tmp_out)) for r in roots]
+    seeds = {d["metadata"]["generator"]["params"]["seed"] for d in reg}
+    assert len(seeds) == 4
+
+
+def test_parse_grid1():
+    assert ng._parse_grid(["n_nodes=10,20", "p=0.5", "gen=a"]) == {
+        "n_nodes": [10, 20], "p": [0.5], "gen": ["a"],
+    }
+    with pytest.raises(SystemExit):
+        ng._parse_grid(["n_nodes"])
+
+
+def test_skip_up_to_date1(tmp_out: Path, no_validate, monkeypatch):
+    cfg = ng.GenConfig(name="er_skip", generator="er", generator_params={"n_nodes": 20, "p": 0.2}, seed=1)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+    meta = json.loads((ds_root / "metadata.json").read_text())
+    assert meta["config_hash"] == ng.config_hash(cfg)
+    assert meta["ndtools_version"] == ng.__version__
+    assert set(meta["files"]) == {"data/nodes.json", "data/edges.json", "data/probs.json"}
+
+    calls = []
+    real = ng._generate
+    monkeypatch.setattr(ng, "_generate", lambda *a: calls.append(a) or real(*a))
+
+    # unchanged config -> skipped
+    ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+    assert calls == []
+
+    # tampered data file -> regenerated
+    (ds_root / "data" / "edges.json").write_text("{}")
+    ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+    assert len(calls) == 1
+    assert json.loads((ds_root / "data" / "edges.json").read_text())
+
+    # changed seed or force -> regenerated
+    cfg.seed = 2
+    ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+    ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False, force=True)
+    assert len(calls) == 3
+
+
+def test_config_hash1():
+    a = ng.GenConfig(name="x", generator="er", generator_params={"n_nodes": 5, "p": 0.1}, seed=1)
+    b = ng.GenConfig(name="x", generator="er", generator_params={"p": 0.1, "n_nodes": 5}, seed=1)
+    assert ng.config_hash(a) == ng.config_hash(b)
+    assert ng.config_hash(a) != ng.config_hash(a, compress="gz")
+    b.generator_params["p"] = 0.2
+    assert ng.config_hash(a) != ng.config_hash(b)
+
+
+def test_skip_up_to_date_deg_seq_file1(tmp_path: Path, tmp_out: Path, no_validate, monkeypatch):
+    seq_file = tmp_path / "degs.txt"
+    seq_file.write_text("2\n2\n2\n2\n")
+    cfg = ng.GenConfig(name="cm_file", generator="config",
+                       generator_params={"deg_seq": f"@{seq_file}"}, seed=1)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+
+    calls = []
+    real = ng._generate
+    monkeypatch.setattr(ng, "_generate", lambda *a: calls.append(a) or real(*a))
+    ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+    assert calls == []
+
+    # same path, new contents -> regenerated
+    seq_file.write_text("3\n3\n3\n3\n")
+    ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False)
+    assert len(calls) == 1
+    assert len(json.loads((ds_root / "data" / "edges.json").read_text())) == 6
+
+
+def test_compact1(tmp_out: Path, no_validate):
+    cfg = ng.GenConfig(name="grid_compact", generator="grid", generator_params={"rows": 3, "cols": 3}, seed=None)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False, compact=True)
+    text = (ds_root / "data" / "edges.json").read_text()
+
+    assert "\n" not in text and ": " not in text
+    assert json.loads(text) == ng.generate_grid(3, 3)[1]
+
+
+def test_timings1(tmp_out: Path, no_validate):
+    cfg = ng.GenConfig(name="ws_t", generator="ws", generator_params={"n_nodes": 30, "k": 4, "p_ws": 0.1}, seed=2)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_graph=False, trace_memory=True)
+    timings = json.loads((ds_root / "metadata.json").read_text())["timings"]
+
+    assert [r["stage"] for r in timings["stages"]] == ["generate", "save", "validate"]
+    for r in timings["stages"]:
+        assert r["wall_s"] >= 0 and r["cpu_s"] >= 0 and r["peak_alloc_mb"] >= 0
+        assert r["rss_peak_growth_mb"] is None or r["rss_peak_growth_mb"] >= 0
+    assert timings["total_wall_s"] == pytest.approx(sum(r["wall_s"] for r in timings["stages"]), abs=1e-5)
+    assert "generate" in ng.format_timings(timings)
+
+
+def test_stage_timer_rss_growth1():
+    # the process high-water mark never falls: a stage below it reports no growth
+    pytest.importorskip("resource")
+    import numpy as np
+    timer = ng.StageTimer()
+    with timer.stage("big"):  # touch more pages than the process has ever held
+        np.ones(int((ng._peak_rss_mb() + 32) * (1 << 20)), dtype=np.uint8).sum()
+    with timer.stage("small"):
+        pass
+    big, small = timer.stages
+    assert big["rss_peak_growth_mb"] > 0 and small["rss_peak_growth_mb"] == 0
+
+
+def test_run_timings1(tmp_path: Path, monkeypatch, capsys):
+    pytest.importorskip("jsonschema")
+    monkeypatch.chdir(tmp_path)
+    ng.run(["--type", "grid", "--name", "g", "--rows", "2", "--cols", "3",
+            "--draw_graph", "", "--timings"])
+    out = capsys.readouterr().out
+    assert "validate" in out and "total" in out
+
+
+def test_run_timings_grid1(tmp_path: Path, monkeypatch, capsys):
+    pytest.importorskip("jsonschema")
+    monkeypatch.chdir(tmp_path)
+    ng.run(["--type", "grid", "--name", "g", "--rows", "2", "--grid", "cols=2,3",
+            "--workers", "1", "--draw_graph", "", "--timings"])
+    out = capsys.readouterr().out
+    assert "g_cols-2_r0" in out and "g_cols-3_r0" in out
+    assert out.count("validate") == 2
+
+
+@pytest.mark.parametrize("mode", ["background", "deferred"])
+def test_draw_mode1(tmp_out: Path, no_validate, mode):
+    pytest.importorskip("matplotlib")
+    cfg = ng.GenConfig(name=f"grid_{mode}", generator="grid", generator_params={"rows": 2, "cols": 2}, seed=None)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_mode=mode)
+    png = ds_root / "data" / "graph.png"
+
+    if mode == "deferred":
+        assert ng.draw_future(ds_root) is None and not png.exists()
+    else:
+        assert ng.draw_future(ds_root) is not None
+    stages = [r["stage"] for r in json.loads((ds_root / "metadata.json").read_text())["timings"]["stages"]]
+    assert stages[-1] == "draw_submit"
+    done = ng.wait_drawings(timeout=60)
+    assert done == {ds_root.resolve(): png}
+    assert png.exists()
+    assert ng.draw_future(ds_root) is None
+    assert ng._draw_pool is None  # workers are shut down once nothing is pending
+
+
+def test_draw_max_edges1(tmp_out: Path, no_validate):
+    cfg = ng.GenConfig(name="grid_big", generator="grid", generator_params={"rows": 3, "cols": 3}, seed=None)
+    ds_root = ng.generate_and_save(tmp_out, schema_dir=tmp_out, config=cfg, draw_max_edges=5)
+
+    assert not (ds_root / "data" / "graph.png").exists()
+    assert json.loads((ds_root / "metadata.json").read_text())["n_edges"] == 12
@@ -0,0 +1,68 @@
+# tests/test_registry.py
+from __future__ import annotations
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from ndtools import registry
+
+
+def _entry(name: str, version: str = "v1", **extra):
+    return {"name": name, "version": version, "path": f"datasets/{name}", **extra}
+
+
+@pytest.mark.parametrize("wrapped", [False, True])
+def test_upsert_entries1(tmp_path: Path, wrapped):
+    path = tmp_path / "registry.json"
+    entries = [_entry("a"), _entry("b")]
+    path.write_text(json.dumps({"datasets": entries} if wrapped else entries))
+
+    registry.upsert_entries(path, [_entry("a", summary="new"), _entry("c"), _entry("a", "v2")])
+
+    data = json.loads(path.read_text())
+    assert isinstance(data, dict) is wrapped
+    got = data["datasets"] if wrapped else data
+    # replaced in place, new entries appended in order
+    assert [(e["name"], e["version"]) for e in got] == [("a", "v1"), ("b", "v1"), ("c", "v1"), ("a", "v2")]
+    assert got[0]["summary"] == "new"
+    assert not list(tmp_path.glob(".tmp*"))
+
+
+def test_registry_index1():
+    reg = registry.Registry([_entry("a"), _entry("b")])
+    assert ("b", "v1") in reg and reg.get("b", "v1")["path"] == "datasets/b"
+    assert reg.remove("a", "v1") and not reg.remove("a", "v1")
+    assert reg.get("b", "v1") is reg.entries[0]
+    with pytest.raises(ValueError):
+        registry.Registry.from_json({"datasets": {}})
+
+
+def _register_batch(path: str, worker: int) -> None:
+    registry.upsert_entries(Path(path), [_entry(f"w{worker}_{i}") for i in range(20)])
+
+
+def test_upsert_entries_concurrent1(tmp_path: Path):
+    path = tmp_path / "registry.json"
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_register_batch, [str(path)] * 8, range(8)))
+
+    names = {e["name"] for e in json.loads(path.read_text())}
+    assert len(names) == 8 * 20
+
+
+def test_file_lock_timeout1(tmp_path: Path):
+    lock = tmp_path / "registry.json.lock"
+    with registry.file_lock(lock):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            fut = pool.submit(_try_lock, str(lock))
+            assert fut.result() == "timeout"
+
+
+def _try_lock(path: str) -> str:
+    try:
+        with registry.file_lock(Path(path), timeout=0.1):
+            return "locked"
+    except TimeoutError:
+        return "timeout"
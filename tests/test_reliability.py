@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pytest
+
+import networkx as nx
+
+from ndtools import io, reliability
+from ndtools.fun_binary_graph import eval_global_conn_k
+from ndtools.graphs import build_graph_compiled
+from ndtools.reliability import cov_of_pf, monte_carlo
+from ndtools.sampling import StateSampler
+
+# ---------- tests ----------
+
+def test_monte_carlo_matches_direct_sampling1():
+    res = monte_carlo("toynet-11edges", eval_global_conn_k, max_samples=1000, chunk_size=300,
+                      target_cov=0.0, seed=5, max_workers=1)
+    assert res.stopped_by == "max_samples"
+    assert (res.n_samples, res.n_chunks) == (1000, 4)
+
+    ds = io.load_dataset("toynet-11edges", build_graph=True)
+    sampler = StateSampler.from_probs(ds.probs)
+    n_fail = 0
+    for chunk in sampler.iter_chunks(1000, chunk_size=300, seed=5):
+        for row in chunk:
+            k, _, _ = eval_global_conn_k(sampler.state_dict(row), ds.graph)
+            n_fail += k == 0
+    assert res.n_failures == n_fail
+    assert res.pf == n_fail / 1000
+    assert res.cov == cov_of_pf(1000, n_fail)
+
+def test_monte_carlo_independent_of_workers1():
+    kw = dict(max_samples=4000, chunk_size=200, target_cov=0.06, seed=1)
+    serial = monte_carlo("toynet-11edges", eval_global_conn_k, max_workers=1, **kw)
+    parallel = monte_carlo("toynet-11edges", eval_global_conn_k, max_workers=2, **kw)
+    assert serial.stopped_by == parallel.stopped_by == "cov"
+    assert serial.cov <= 0.06
+    assert (serial.pf, serial.n_samples, serial.history) == (parallel.pf, parallel.n_samples, parallel.history)
+
+def test_publish1():
+    ds = reliability._load("toynet-11edges", "v1", None, io.REPO_ROOT)
+    shared = reliability._publish(ds)
+    try:
+        # workers rebuild exactly the graph load_dataset gives
+        assert nx.utils.graphs_equal(build_graph_compiled(shared.dataset), ds.graph)
+        assert StateSampler.from_compiled(shared.dataset).comp_ids.tolist() == list(ds.probs)
+    finally:
+        shared.close()
+        shared.unlink()
+
+    # mixed-type node attributes do not survive compiling: workers load JSON instead
+    sub = reliability._load("distribution_substation_liang2022", "v1", None, io.REPO_ROOT)
+    assert reliability._publish(sub) is None
+
+def test_monte_carlo_unshared_independent_of_workers1():
+    kw = dict(max_samples=600, chunk_size=200, target_cov=0.0, seed=3)
+    serial = monte_carlo("distribution_substation_liang2022", eval_global_conn_k, max_workers=1, **kw)
+    parallel = monte_carlo("distribution_substation_liang2022", eval_global_conn_k, max_workers=2, **kw)
+    assert serial.history == parallel.history
+
+def test_monte_carlo_time_budget1():
+    res = monte_carlo("toynet-11edges", eval_global_conn_k, max_samples=10**6, chunk_size=50,
+                      target_cov=0.0, time_budget=0.0, max_workers=1)
+    assert res.stopped_by == "time"
+    assert res.n_samples == 50
+
+def test_monte_carlo_rejects_bad_sizes1():
+    with pytest.raises(ValueError):
+        monte_carlo("toynet-11edges", eval_global_conn_k, chunk_size=0)
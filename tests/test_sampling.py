@@ -0,0 +1,62 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ndtools import io
+from ndtools.sampling import StateSampler, chunk_rng
+
+EMA = Path("datasets/ema_highway/v1/data")
+
+# ---------- tests ----------
+
+def test_sample_frequencies_mult1():
+    probs = json.loads((EMA / "probs_mult.json").read_text())
+    sampler = StateSampler.from_probs(probs)
+    assert sampler.states.tolist() == [0, 1, 2]
+
+    x = sampler.sample(200_000, seed=3)
+    assert x.dtype == np.uint8 and x.shape == (200_000, len(probs))
+    cid = sampler.comp_ids.tolist()[0]
+    freq = np.bincount(x[:, 0], minlength=3) / len(x)
+    expected = [probs[cid][s]["p"] for s in ("0", "1", "2")]
+    assert np.allclose(freq, expected, atol=0.005)
+
+def test_sample_reproducible1():
+    sampler = StateSampler.from_file(EMA / "probs_bin.json")
+    assert np.array_equal(sampler.sample(1000, seed=7), sampler.sample(1000, seed=7))
+    assert not np.array_equal(sampler.sample(1000, seed=7), sampler.sample(1000, seed=8))
+
+def test_iter_chunks1():
+    sampler = StateSampler.from_file(EMA / "probs_bin.json")
+    chunks = list(sampler.iter_chunks(2500, chunk_size=1000, seed=11))
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+    # each chunk depends only on (seed, index)
+    assert np.array_equal(chunks[1], sampler.chunk(1, 1000, seed=11))
+    assert np.array_equal(chunks[2], sampler.draw(500, chunk_rng(11, 2)))
+    assert np.array_equal(np.concatenate(chunks), np.concatenate(list(sampler.iter_chunks(2500, 1000, seed=11))))
+
+def test_labels_and_zero_probability1():
+    sampler = StateSampler.from_probs({
+        "a": {"0": {"p": 0.0}, "3": {"p": 1.0}},
+        "b": {"0": {"p": 0.5}, "7": {"p": 0.5}},
+    })
+    x = sampler.sample(5000, seed=0)
+    assert set(x[:, 0].tolist()) == {3}
+    assert set(x[:, 1].tolist()) == {0, 7}
+    assert sampler.state_dict(x[0])["a"] == 3
+
+def test_component_order1():
+    ds = io.load_compiled(EMA, "probs_bin.json", use_cache=False)
+    sampler = StateSampler.from_compiled(ds, ds.edge_ids[::-1])
+    assert sampler.comp_ids.tolist() == ds.edge_ids[::-1].tolist()
+    with pytest.raises(KeyError):
+        sampler.select(["no-such-edge"])
+
+def test_invalid_probs1():
+    with pytest.raises(ValueError, match="sum to"):
+        StateSampler.from_probs({"a": {"0": {"p": 0.2}, "1": {"p": 0.7}}})
+    with pytest.raises(ValueError, match="\\[0, 255\\]"):
+        StateSampler.from_probs({"a": {"0": {"p": 0.5}, "300": {"p": 0.5}}})
@@ -0,0 +1,85 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+import pickle
+
+import numpy as np
+import pytest
+
+from ndtools import io
+from ndtools.compiled import csr_adjacency
+from ndtools.shared import SharedDataset, _attached, attached, detach
+
+# ---------- helpers ----------
+
+@pytest.fixture
+def toynet():
+    return io.load_compiled("datasets/toynet_11edges/v1/data", use_cache=False)
+
+def _total_length(handle: SharedDataset) -> float:
+    # runs in a worker: `handle` arrives by name and is attached there
+    return float(handle.dataset.edge_attrs["length"].sum())
+
+def _degree(name: str) -> list:
+    indptr, _, _ = attached(name).csr
+    return np.diff(indptr).tolist()
+
+# ---------- tests ----------
+
+def test_publish_attach1(toynet):
+    with SharedDataset.publish(toynet) as pub:
+        sd = SharedDataset.attach(pub.name)
+        ds = sd.dataset
+        assert ds.node_ids.tolist() == toynet.node_ids.tolist()
+        assert ds.edge_ids.tolist() == toynet.edge_ids.tolist()
+        for key in ("src", "dst", "directed", "probs", "states"):
+            assert np.array_equal(getattr(ds, key), getattr(toynet, key))
+        assert np.array_equal(ds.edge_attrs["length"], toynet.edge_attrs["length"])
+        for got, want in zip(sd.csr, csr_adjacency(toynet)):
+            assert np.array_equal(got, want)
+
+        # views on the block, not copies; read-only for attached handles
+        assert np.shares_memory(ds.src, np.frombuffer(sd._shm.buf, dtype=np.uint8))
+        with pytest.raises(ValueError):
+            ds.src[0] = 1
+        del ds, got
+        sd.close()
+
+def test_workers_attach_by_name1(toynet):
+    with SharedDataset.publish(toynet) as pub:
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            totals = list(pool.map(_total_length, [pub] * 4))
+            degrees = list(pool.map(_degree, [pub.name] * 2))
+        assert totals == [float(toynet.edge_attrs["length"].sum())] * 4
+        assert degrees[0] == np.diff(csr_adjacency(toynet)[0]).tolist()
+    with pytest.raises(FileNotFoundError):
+        SharedDataset.attach(pub.name)
+
+def test_pickle_sends_name_only1(toynet):
+    with SharedDataset.publish(toynet) as pub:
+        assert len(pickle.dumps(pub)) < 200
+        assert pickle.loads(pickle.dumps(pub)).dataset.n_edges == toynet.n_edges
+        # unpickling in this process cached a second mapping; release it
+        assert pub.name in _attached
+        detach(pub.name)
+        assert pub.name not in _attached
+
+def test_close_with_live_view_raises1(toynet):
+    pub = SharedDataset.publish(toynet)
+    src = pub.dataset.src
+    with pytest.raises(BufferError):
+        with pub:
+            pass
+    # the block is destroyed anyway, and the kept view is still valid memory
+    with pytest.raises(FileNotFoundError):
+        SharedDataset.attach(pub.name)
+    assert src.tolist() == toynet.src.tolist()
+    del src
+    pub.close()
+
+def test_csr_adjacency1(toynet):
+    indptr, indices, edges = csr_adjacency(toynet)
+    n_arcs = toynet.n_edges + int((~toynet.directed).sum())
+    assert indptr[-1] == len(indices) == len(edges) == n_arcs
+    for u in range(toynet.n_nodes):
+        for v, k in zip(indices[indptr[u]:indptr[u + 1]], edges[indptr[u]:indptr[u + 1]]):
+            assert {u, v} == {toynet.src[k], toynet.dst[k]}
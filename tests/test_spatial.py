@@ -0,0 +1,88 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ndtools.spatial import SpatialIndex
+
+# ---------- helpers ----------
+
+def load_nodes(data_dir: str | Path):
+    return json.loads((Path(data_dir) / "nodes.json").read_text(encoding="utf-8"))
+
+def brute_dists(coords: np.ndarray, p) -> np.ndarray:
+    return np.linalg.norm(coords - np.asarray(p, dtype=float), axis=1)
+
+# ---------- tests ----------
+
+def test_from_nodes_skips_null_coords():
+    nodes = {"n0": {"x": 0.0, "y": 0.0}, "n1": {"x": None, "y": None}, "n2": {"x": 1, "y": 2}}
+    idx = SpatialIndex.from_nodes(nodes)
+
+    assert len(idx) == 2
+    assert idx.ids.tolist() == ["n0", "n2"]
+
+def test_nearest_ids1():
+    nodes = load_nodes("datasets/ema_highway/v1/data")
+    idx = SpatialIndex.from_nodes(nodes)
+
+    queries = np.array([[40.0, 60.0], [62.0, 75.0], [0.0, 0.0]])
+    dist, ids = idx.nearest_ids(queries, k=4)
+
+    for q, d_row, id_row in zip(queries, dist, ids):
+        expected = np.sort(brute_dists(idx.coords, q))[:4]
+        assert np.allclose(d_row, expected)
+        assert len(id_row) == 4
+
+    assert ids[1][0] == "n1", f"Expected nearest node n1, got {ids[1][0]}"
+
+def test_within_radius_and_bbox1():
+    nodes = load_nodes("datasets/ema_highway/v1/data")
+    idx = SpatialIndex.from_nodes(nodes)
+
+    q = [45.0, 65.0]
+    got = set(idx.within_radius_ids([q], 8.0)[0])
+    expected = {nid for nid, d in zip(idx.ids, brute_dists(idx.coords, q)) if d <= 8.0}
+    assert got == expected
+
+    got_box = set(idx.in_bbox_ids([40.0, 60.0], [50.0, 70.0])[0])
+    expected_box = {nid for nid, (x, y) in zip(idx.ids, idx.coords) if 40 <= x <= 50 and 60 <= y <= 70}
+    assert got_box == expected_box
+
+@pytest.mark.parametrize("dim", [2, 3])
+def test_pairs_within1(dim):
+    rng = np.random.default_rng(7)
+    coords = rng.random((300, dim))
+    idx = SpatialIndex(coords)
+
+    i, j, d = idx.pairs_within(0.12)
+
+    full = np.linalg.norm(coords[:, None] - coords[None], axis=2)
+    bi, bj = np.nonzero(np.triu(full <= 0.12, k=1))
+    assert set(zip(i.tolist(), j.tolist())) == set(zip(bi.tolist(), bj.tolist()))
+    assert np.allclose(d, full[i, j])
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+def test_batch_queries_match_brute_force1(dim):
+    rng = np.random.default_rng(dim)
+    pts = rng.random((500, dim))
+    idx = SpatialIndex(pts)
+    queries = rng.random((60, dim)) * 1.4 - 0.2  # some queries outside the data range
+    d = np.linalg.norm(queries[:, None, :] - pts[None, :, :], axis=2)
+
+    for r, got in zip(d, idx.within_radius(queries, 0.12)):
+        assert sorted(got.tolist()) == np.flatnonzero(r <= 0.12).tolist()
+    # a radius much larger than the cell size goes through a coarser grid
+    assert [len(g) for g in idx.within_radius(queries, 0.9)] == (d <= 0.9).sum(axis=1).tolist()
+
+    dist, pos = idx.nearest(queries, k=5)
+    assert np.allclose(dist, np.sort(d, axis=1)[:, :5])
+    assert np.allclose(np.take_along_axis(d, pos, axis=1), dist)
+
+    lo, hi = queries - 0.1, queries + 0.15
+    for a, b, got in zip(lo, hi, idx.in_bbox(lo, hi)):
+        inside = np.flatnonzero(np.all((pts >= a) & (pts <= b), axis=1))
+        assert got.tolist() == inside.tolist()
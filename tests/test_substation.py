@@ -0,0 +1,99 @@
+# tests/test_substation.py
+from __future__ import annotations
+import importlib.util
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ndtools import substation
+
+DATA = Path("datasets/distribution_substation_liang2022/v1/data")
+SCRIPTS = DATA.parent / "scripts"
+
+
+@pytest.fixture(scope="module")
+def utils_sub():
+    pytest.importorskip("scipy")  # utils_sub imports scipy.stats
+    spec = importlib.util.spec_from_file_location("utils_sub", SCRIPTS / "utils_sub.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def tables():
+    nodes = json.loads((DATA / "nodes.json").read_text())
+    edges = json.loads((DATA / "edges.json").read_text())
+    return nodes, edges
+
+
+def _states(edges, n_samples: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ids = list(edges)
+    yield {k: 1 for k in ids}
+    yield {k: 0 for k in ids}
+    for p in np.linspace(0.05, 0.95, n_samples):
+        yield dict(zip(ids, (rng.random(len(ids)) < p).astype(int).tolist()))
+
+
+def test_node_groups1(utils_sub, tables):
+    nodes, _ = tables
+    assert substation.node_groups(nodes) == utils_sub.process_nodes(nodes)
+
+
+def test_evaluate_matches_sys_fun1(utils_sub, tables):
+    nodes, edges = tables
+    groups = utils_sub.process_nodes(nodes)
+    model = substation.SubstationModel.from_dataset(DATA)
+
+    for comps_st in _states(edges, 200):
+        expected = utils_sub.sys_fun(comps_st, edges, nodes, groups, return_details=True)
+        assert model.evaluate(comps_st, return_details=True) == expected
+        assert model.evaluate(comps_st) == expected["System capacity"]
+        # array form, in edge order
+        assert model.evaluate([comps_st[k] for k in model.edge_ids]) == expected["System capacity"]
+
+
+def test_evaluate_bad_length1(tables):
+    model = substation.SubstationModel(*tables)
+    with pytest.raises(ValueError):
+        model.evaluate([1, 1])
+
+
+def test_evaluate_batch_matches_sys_fun1(utils_sub, tables):
+    nodes, edges = tables
+    groups = utils_sub.process_nodes(nodes)
+    model = substation.SubstationModel(nodes, edges)
+    samples = list(_states(edges, 300, seed=1))
+    states = np.asarray([[st[k] for k in model.edge_ids] for st in samples], dtype=np.uint8)
+
+    # chunk_size smaller than the batch: several chunks, the last one partial
+    got = model.evaluate_batch(states, return_details=True, chunk_size=128)
+    assert got["System capacity"].shape == (len(samples),)
+    for i, comps_st in enumerate(samples):
+        expected = utils_sub.sys_fun(comps_st, edges, nodes, groups, return_details=True)
+        for key in ("System capacity", "Total input", "Total output", "Total transmission"):
+            assert got[key][i] == expected[key]
+        for key in ("Input breakdowns", "Output breakdowns", "Transmission breakdowns"):
+            assert got[key][i].tolist() == expected[key]
+    np.testing.assert_array_equal(model.evaluate_batch(states), got["System capacity"])
+
+
+def test_evaluate_batch_cycle1():
+    # a cycle needs more than one sweep; reachability must still reach a fixpoint
+    nodes = {
+        "s": {"type": "source", "group_name": "", "capacity": ""},
+        "a": {"type": "input", "group_name": "I", "capacity": 10},
+        "b": {"type": "transmission", "group_name": "T", "capacity": 5},
+        "o": {"type": "output", "group_name": "O", "capacity": 7},
+    }
+    edges = {
+        "e1": {"from": "s", "to": "b"}, "e2": {"from": "b", "to": "a"},
+        "e3": {"from": "a", "to": "b"}, "e4": {"from": "a", "to": "o"},
+    }
+    model = substation.SubstationModel(nodes, edges)
+    states = np.array(list(np.ndindex(2, 2, 2, 2)), dtype=np.uint8)
+    expected = [model.evaluate(st) for st in states]
+    assert model.evaluate_batch(states).tolist() == expected
@@ -0,0 +1,86 @@
+# tests/test_validation.py
+from __future__ import annotations
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+jsonschema = pytest.importorskip("jsonschema")
+
+from ndtools import validation
+
+SCHEMA_DIR = Path("schema")
+
+
+@pytest.fixture
+def toynet(tmp_path: Path) -> Path:
+    dst = tmp_path / "data"
+    shutil.copytree("datasets/toynet_11edges/v1/data", dst)
+    return dst
+
+
+def _edit(path: Path, fn):
+    data = json.loads(path.read_text())
+    fn(data)
+    path.write_text(json.dumps(data))
+
+
+def test_get_validator_cached1(tmp_path: Path):
+    schema = tmp_path / "nodes.schema.json"
+    shutil.copy(SCHEMA_DIR / "nodes.schema.json", schema)
+    v = validation.get_validator(schema)
+    assert validation.get_validator(schema) is v
+
+    # a changed schema file is recompiled
+    st = schema.stat()
+    os.utime(schema, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert validation.get_validator(schema) is not v
+
+
+@pytest.mark.parametrize("fast", [True, False])
+@pytest.mark.parametrize("stream", [True, False])
+def test_check_dataset1(toynet: Path, fast, stream):
+    assert validation.check_dataset(toynet, SCHEMA_DIR, fast=fast, stream=stream) == []
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_check_dataset_schema1(toynet: Path, fast):
+    _edit(toynet / "edges.json", lambda e: e[next(iter(e))].update({"from": 0}))
+
+    problems = validation.check_dataset(toynet, SCHEMA_DIR, fast=fast)
+    assert [p.name for p, _ in problems] == ["edges.json"]
+    assert isinstance(problems[0][1], jsonschema.ValidationError)
+
+
+def test_check_dataset_integrity1(toynet: Path):
+    _edit(toynet / "edges.json", lambda e: e[next(iter(e))].update({"to": "nowhere"}))
+
+    problems = validation.check_dataset(toynet, SCHEMA_DIR)
+    assert [p.name for p, _ in problems] == ["edges.json"]
+    assert isinstance(problems[0][1], ValueError)
+    assert "'nowhere' does not exist" in str(problems[0][1])
+
+
+def test_check_dataset_integrity2(toynet: Path):
+    def break_probs(probs):
+        first, second = list(probs)[:2]
+        probs[first]["0"]["p"] = 0.7          # row no longer sums to 1
+        probs[second]["1"]["p"] = 1.5         # out of range
+        probs["ghost"] = {"0": {"p": 0.0}, "1": {"p": 1.0}}
+    _edit(toynet / "probs.json", break_probs)
+
+    problems = validation.check_dataset(toynet, SCHEMA_DIR, stream=True)
+    assert [p.name for p, _ in problems] == ["probs.json"]
+    msg = str(problems[0][1])
+    assert "sum to" in msg and "not a number in [0, 1]" in msg and "'ghost'" in msg
+
+    # integrity=False only checks the schemas
+    assert validation.check_dataset(toynet, SCHEMA_DIR, integrity=False) == []
+
+
+def test_check_dataset_missing1(tmp_path: Path):
+    problems = validation.check_dataset(tmp_path, SCHEMA_DIR)
+    assert len(problems) == 3
+    assert all(isinstance(e, FileNotFoundError) for _, e in problems)